@@ -1,52 +1,231 @@
-from app.database import get_products
+from sqlalchemy import text
+from app.database import init_db, get_engine, get_data_version, Product, PRODUCT_COLUMNS_SQL
 import numpy as np
+import copy
 import logging
+import threading
+import time
 
-def get_analytics(db_path="amazon.db"):
-    products = get_products(db_path)
-    if not products:
-        return {
-            "avg_price": 0.0,
-            "avg_reviews": 0,
-            "max_discount": 0.0,
-            "max_discount_product": None,
-            "top_by_rating": [],
-            "top_by_price": [],
-            "price_distribution": {"labels": [], "values": []}
-        }
-
-    high_rated = [p for p in products if p.rating >= 4.0]
-    avg_price = sum(p.price for p in high_rated) / len(high_rated) if high_rated else 0.0
-    avg_reviews = sum(p.reviews for p in high_rated) / len(high_rated) if high_rated else 0
-
-    discounts = [p.original_price - p.price for p in products if p.original_price > p.price]
-    max_discount = max(discounts) if discounts else 0.0
-    max_discount_product = next((p for p in products if p.original_price - p.price == max_discount), None)
-
-    top_by_rating = sorted(products, key=lambda x: x.rating, reverse=True)[:3]
-    top_by_price = sorted(products, key=lambda x: x.price)[:3]
-
-    prices = [p.price for p in products if p.price > 0]
-    if prices:
-        hist, bin_edges = np.histogram(prices, bins=10)
-        price_distribution = {
-            "labels": [f"${int(bin_edges[i])}-${int(bin_edges[i + 1])}" for i in range(len(bin_edges) - 1)],
-            "values": hist.tolist()
-        }
-    else:
-        price_distribution = {"labels": [], "values": []}
 
-    # Конвертуємо Product у словники для серіалізації
-    max_discount_product_dict = max_discount_product._asdict() if max_discount_product else None
-    top_by_rating_dicts = [p._asdict() for p in top_by_rating]
-    top_by_price_dicts = [p._asdict() for p in top_by_price]
+class AnalyticsCache:
+    """Кеш знімків аналітики, прив'язаних до лічильника змін таблиці products.
+
+    Будь-який запис у products (ProductWriter, save_to_db, clear_db або інший процес) збільшує
+    лічильник у table_versions, тож знімок інвалідується автоматично. Між записами
+    get_analytics коштує один запит лічильника за первинним ключем.
+
+    Поки скрапер пише, застарілий знімок віддається ще до max_staleness секунд від його розрахунку:
+    не частіше ніж раз на refresh_interval секунд він перераховується у фоновому потоці, тож часті
+    запити під час запису не запускають перерахунок кожен. Старіший знімок перераховується одразу.
+    """
+
+    def __init__(self, refresh_interval=1.0, max_staleness=10.0, clock=time.monotonic):
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.clock = clock
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._compute_locks = {}
+        self._refreshes = {}
+
+    def get(self, db_path, version):
+        with self._lock:
+            snapshot = self._snapshots.get(db_path)
+            if snapshot is not None and snapshot[0] == version:
+                self.hits += 1
+                return copy.deepcopy(snapshot[1])
+            return None
+
+    def get_stale(self, db_path):
+        """Застарілий знімок і його вік у секундах або None, якщо знімка немає чи він старший за max_staleness."""
+        with self._lock:
+            snapshot = self._snapshots.get(db_path)
+            if snapshot is None:
+                return None
+            age = self.clock() - snapshot[2]
+            if age >= self.max_staleness:
+                return None
+            self.stale_hits += 1
+            return copy.deepcopy(snapshot[1]), age
+
+    def put(self, db_path, version, analytics):
+        with self._lock:
+            # Кожен перерахунок знімка рахується як промах кешу
+            self.misses += 1
+            current = self._snapshots.get(db_path)
+            if current is None or current[0] <= version:
+                self._snapshots[db_path] = (version, copy.deepcopy(analytics), self.clock())
+
+    def compute_lock(self, db_path):
+        """Блокування, що не дає паралельним запитам перераховувати один і той самий знімок."""
+        with self._lock:
+            return self._compute_locks.setdefault(db_path, threading.Lock())
+
+    def refresh(self, db_path, recompute):
+        """Запускає recompute() у фоновому потоці, якщо знімок db_path зараз не перераховується."""
+        lock = self.compute_lock(db_path)
+        if not lock.acquire(blocking=False):
+            return None
+
+        def run():
+            try:
+                recompute()
+            except Exception as e:
+                logging.error(f"Помилка фонового перерахунку аналітики для {db_path}: {e}")
+            finally:
+                lock.release()
+
+        thread = threading.Thread(target=run, name="analytics-refresh", daemon=True)
+        with self._lock:
+            self._refreshes[db_path] = thread
+        thread.start()
+        return thread
+
+    def join(self, timeout=None):
+        """Чекає завершення фонових перерахунків."""
+        with self._lock:
+            threads = list(self._refreshes.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "versions": {db_path: snapshot[0] for db_path, snapshot in self._snapshots.items()}
+            }
+
+    def clear(self):
+        self.join()
+        with self._lock:
+            self._snapshots.clear()
+            self._refreshes.clear()
+            self.hits = 0
+            self.stale_hits = 0
+            self.misses = 0
+
+
+analytics_cache = AnalyticsCache()
+
+
+def _empty_analytics():
+    return {
+        "avg_price": 0.0,
+        "avg_reviews": 0,
+        "max_discount": 0.0,
+        "max_discount_product": None,
+        "top_by_rating": [],
+        "top_by_price": [],
+        "price_distribution": {"labels": [], "values": []}
+    }
 
+
+def _price_distribution(connection, bins=10):
+    """Будує гістограму цін діапазонними COUNT-запитами по індексу цін, не завантажуючи колонку в пам'ять.
+
+    Межі кошиків ті самі, що й у np.histogram (вони залежать лише від мінімуму і максимуму),
+    а кошики так само напіввідкриті, крім останнього, тож результат збігається з np.histogram.
+    Нижня межа першого кошика — мінімальна додатна ціна, тож нульові ціни не враховуються.
+    """
+    low = connection.execute(text("SELECT MIN(price) FROM products WHERE price > 0")).scalar()
+    if low is None:
+        return {"labels": [], "values": []}
+    high = connection.execute(text("SELECT MAX(price) FROM products WHERE price > 0")).scalar()
+    bin_edges = np.histogram_bin_edges(np.array([low, high]), bins=bins)
+
+    values = []
+    for i in range(len(bin_edges) - 1):
+        upper = "<=" if i == len(bin_edges) - 2 else "<"
+        values.append(connection.execute(
+            text(f"SELECT COUNT(*) FROM products WHERE price >= :lower AND price {upper} :upper"),
+            {"lower": float(bin_edges[i]), "upper": float(bin_edges[i + 1])}
+        ).scalar())
+    return {
+        "labels": [f"${int(bin_edges[i])}-${int(bin_edges[i + 1])}" for i in range(len(bin_edges) - 1)],
+        "values": values
+    }
+
+
+def get_analytics(db_path="amazon.db", use_cache=True):
+    """Повертає аналітику з кешу, якщо таблиця products не змінювалась з моменту останнього розрахунку.
+
+    Після змін повертається ще не надто старий знімок, а свіжий рахується у фоні (див. AnalyticsCache).
+    """
+    db_path = init_db(db_path)
+    if not use_cache:
+        return _compute_analytics(db_path)
+    version = get_data_version(db_path)
+    cached = analytics_cache.get(db_path, version)
+    if cached is not None:
+        return cached
+    stale = analytics_cache.get_stale(db_path)
+    if stale is not None:
+        analytics, age = stale
+        if age >= analytics_cache.refresh_interval:
+            analytics_cache.refresh(db_path, lambda: _recompute(db_path))
+        return analytics
+    with analytics_cache.compute_lock(db_path):
+        # Інший запит міг уже перерахувати знімок, поки ми чекали на блокування
+        cached = analytics_cache.get(db_path, get_data_version(db_path))
+        if cached is not None:
+            return cached
+        return _recompute(db_path)
+
+
+def _recompute(db_path):
+    """Рахує і кешує знімок; викликається під compute_lock(db_path)."""
+    version = get_data_version(db_path)
+    analytics = _compute_analytics(db_path)
+    analytics_cache.put(db_path, version, analytics)
+    return analytics
+
+
+def get_analytics_cache_stats():
+    """Повертає лічильники влучань і промахів кешу аналітики."""
+    return analytics_cache.stats()
+
+
+def _compute_analytics(db_path):
+    """Рахує аналітику засобами SQL: середні, максимальну знижку і топ-3 без завантаження всієї таблиці."""
+    with get_engine(db_path).connect() as connection:
+        if not connection.execute(text("SELECT EXISTS (SELECT 1 FROM products)")).scalar():
+            return _empty_analytics()
+
+        # Середні для товарів з рейтингом >= 4.0 (покривається індексом idx_products_rating)
+        avg_price, avg_reviews = connection.execute(text(
+            "SELECT AVG(price), AVG(reviews) FROM products WHERE rating >= 4.0"
+        )).one()
+
+        # Рівні значення впорядковуються за rowid, як у стабільному сортуванні за порядком таблиці
+        max_discount_row = connection.execute(text(
+            f"SELECT {PRODUCT_COLUMNS_SQL} FROM products WHERE original_price - price > 0 "
+            "ORDER BY original_price - price DESC, rowid LIMIT 1"
+        )).fetchone()
+        top_by_rating = connection.execute(text(
+            f"SELECT {PRODUCT_COLUMNS_SQL} FROM products ORDER BY rating DESC, rowid LIMIT 3"
+        )).fetchall()
+        top_by_price = connection.execute(text(
+            f"SELECT {PRODUCT_COLUMNS_SQL} FROM products ORDER BY price, rowid LIMIT 3"
+        )).fetchall()
+
+        price_distribution = _price_distribution(connection)
+
+    max_discount_product = Product(*max_discount_row) if max_discount_row else None
+    max_discount = max_discount_product.original_price - max_discount_product.price if max_discount_product else 0.0
+    logging.debug(f"Аналітику розраховано для {db_path}")
+
+    # Конвертуємо Product у словники для серіалізації
     return {
-        "avg_price": round(avg_price, 2),
-        "avg_reviews": round(avg_reviews, 0),
+        "avg_price": round(avg_price or 0.0, 2),
+        "avg_reviews": round(avg_reviews or 0, 0),
         "max_discount": round(max_discount, 2),
-        "max_discount_product": max_discount_product_dict,
-        "top_by_rating": top_by_rating_dicts,
-        "top_by_price": top_by_price_dicts,
+        "max_discount_product": max_discount_product._asdict() if max_discount_product else None,
+        "top_by_rating": [Product(*row)._asdict() for row in top_by_rating],
+        "top_by_price": [Product(*row)._asdict() for row in top_by_price],
         "price_distribution": price_distribution
-    }
\ No newline at end of file
+    }
@@ -1,9 +1,12 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 import logging
-import pandas as pd
-import sqlite3
+import csv
+import io
 from collections import namedtuple
+import hashlib
 import os
+import threading
+import time
 
 # Налаштування логування
 logging.basicConfig(
@@ -15,41 +18,280 @@ logging.basicConfig(
     ]
 )
 
+Product = namedtuple("Product",
+                     ["asin", "title", "price", "original_price", "rating", "reviews", "delivery", "seller", "url"])
+PRODUCT_COLUMNS_SQL = ", ".join(Product._fields)
+SORTABLE_COLUMNS = ("asin", "price", "rating", "reviews")
+
+# Налаштування SQLite, що застосовуються до кожного нового з'єднання з пулу
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # читачі не блокуються записом фонових задач скрапінгу
+    "synchronous": "NORMAL",  # у режимі WAL безпечно і без fsync на кожну транзакцію
+    "mmap_size": 268435456,  # 256 МБ
+    "cache_size": -65536,  # 64 МБ (від'ємне значення — у кілобайтах)
+    "temp_store": "MEMORY",
+}
+
+# Міграції схеми: (версія, опис, SQL-інструкції). Версія бази зберігається в PRAGMA user_version,
+# тож існуючі файли amazon.db оновлюються на місці. Нові міграції додаються лише в кінець списку.
+MIGRATIONS = [
+    (1, "таблиця products", [
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            asin TEXT PRIMARY KEY,
+            title TEXT,
+            price REAL,
+            original_price REAL,
+            rating REAL,
+            reviews INTEGER,
+            delivery TEXT,
+            seller TEXT,
+            url TEXT
+        )
+        """,
+    ]),
+    (2, "індекси для фільтрів і сортування products", [
+        "CREATE INDEX IF NOT EXISTS idx_products_rating ON products (rating, price, reviews)",
+        "CREATE INDEX IF NOT EXISTS idx_products_price ON products (price, rating, reviews)",
+        "CREATE INDEX IF NOT EXISTS idx_products_reviews ON products (reviews, rating, price)",
+    ]),
+    (3, "індекс за розміром знижки для аналітики", [
+        "CREATE INDEX IF NOT EXISTS idx_products_discount ON products (original_price - price)",
+    ]),
+    (4, "лічильник змін таблиці products для кешів", [
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR IGNORE INTO table_versions (name, version) VALUES ('products', 0)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_products_version_insert AFTER INSERT ON products BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'products';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_products_version_update AFTER UPDATE ON products BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'products';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_products_version_delete AFTER DELETE ON products BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'products';
+        END
+        """,
+    ]),
+    (5, "фронтир обходу для відновлення задач скрапінгу", [
+        """
+        CREATE TABLE IF NOT EXISTS crawl_tasks (
+            task_key TEXT PRIMARY KEY,
+            query TEXT NOT NULL,
+            pages INTEGER NOT NULL,
+            next_page INTEGER NOT NULL DEFAULT 1,
+            status TEXT NOT NULL DEFAULT 'running',
+            task_id TEXT,
+            updated_at REAL NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS crawl_frontier (
+            task_key TEXT NOT NULL,
+            asin TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            card TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (task_key, asin)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_crawl_frontier_page ON crawl_frontier (task_key, page, state, position)",
+    ]),
+    (6, "час повного скрапінгу і хеш вмісту продукту", [
+        "ALTER TABLE products ADD COLUMN scraped_at REAL",
+        "ALTER TABLE products ADD COLUMN content_hash TEXT",
+        f"UPDATE products SET content_hash = content_hash({PRODUCT_COLUMNS_SQL})",
+        "CREATE INDEX IF NOT EXISTS idx_products_scraped_at ON products (scraped_at, asin)",
+    ]),
+    (7, "стійка черга задач скрапінгу", [
+        """
+        CREATE TABLE IF NOT EXISTS scrape_jobs (
+            id TEXT PRIMARY KEY,
+            query TEXT NOT NULL,
+            pages INTEGER NOT NULL,
+            options TEXT NOT NULL DEFAULT '{}',
+            status TEXT NOT NULL DEFAULT 'queued',
+            message TEXT,
+            current_page INTEGER NOT NULL DEFAULT 0,
+            total_products INTEGER NOT NULL DEFAULT 0,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            worker_id TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            heartbeat_at REAL,
+            finished_at REAL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scrape_jobs_status ON scrape_jobs (status, created_at)",
+    ]),
+    (8, "журнал подій задач скрапінгу", [
+        """
+        CREATE TABLE IF NOT EXISTS scrape_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scrape_events_created_at ON scrape_events (created_at)",
+    ]),
+    (9, "фронтир URL сторінок результатів", [
+        """
+        CREATE TABLE IF NOT EXISTS crawl_pages (
+            task_key TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (task_key, page)
+        )
+        """,
+    ]),
+    (10, "пакетні задачі з пріоритетом і зв'язок запитів з продуктами", [
+        "ALTER TABLE scrape_jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE scrape_jobs ADD COLUMN batch_id TEXT",
+        "DROP INDEX IF EXISTS idx_scrape_jobs_status",
+        "CREATE INDEX IF NOT EXISTS idx_scrape_jobs_status ON scrape_jobs (status, priority DESC, created_at)",
+        """
+        CREATE TABLE IF NOT EXISTS query_products (
+            query TEXT NOT NULL,
+            asin TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            first_seen_at REAL NOT NULL,
+            last_seen_at REAL NOT NULL,
+            PRIMARY KEY (query, asin)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_query_products_asin ON query_products (asin)",
+    ]),
+    (11, "історія цін продуктів (інтервали незмінних спостережень)", [
+        """
+        CREATE TABLE IF NOT EXISTS price_observations (
+            asin TEXT NOT NULL,
+            ts REAL NOT NULL,
+            last_ts REAL NOT NULL,
+            price REAL NOT NULL,
+            original_price REAL NOT NULL,
+            rating REAL NOT NULL,
+            reviews INTEGER NOT NULL,
+            observations INTEGER NOT NULL DEFAULT 1,
+            prev_price REAL,
+            price_drop REAL,
+            PRIMARY KEY (asin, ts)
+        ) WITHOUT ROWID
+        """,
+        # Лише інтервали, що почались зниженням ціни: пошук найбільших знижень не читає решту історії
+        """
+        CREATE INDEX IF NOT EXISTS idx_price_observations_drops ON price_observations (ts, price_drop)
+        WHERE price_drop IS NOT NULL
+        """,
+        # Поточні значення наявних продуктів стають першим інтервалом їхньої історії
+        """
+        INSERT OR IGNORE INTO price_observations (asin, ts, last_ts, price, original_price, rating, reviews)
+        SELECT asin, COALESCE(scraped_at, (julianday('now') - 2440587.5) * 86400.0),
+            COALESCE(scraped_at, (julianday('now') - 2440587.5) * 86400.0),
+            COALESCE(price, 0), COALESCE(original_price, 0), COALESCE(rating, 0), COALESCE(reviews, 0)
+        FROM products
+        """,
+    ]),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Реєстр engine-ів і ініціалізованих баз, спільний для всього процесу (ключ — абсолютний шлях)
+_engines = {}
+_initialized_paths = set()
+_registry_lock = threading.RLock()
+
+
+def _reset_registry_after_fork():
+    """Скидає реєстр у дочірньому процесі, щоб не ділити SQLite-з'єднання між процесами."""
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    _engines.clear()
+    _initialized_paths.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_registry_after_fork)
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def content_hash(*values):
+    """Хеш вмісту рядка products (значення колонок Product); той самий доступний у SQL як content_hash(...)."""
+    return hashlib.sha1("\x1f".join(map(str, values)).encode("utf-8")).hexdigest()
+
+
+def _register_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function("content_hash", len(Product._fields), content_hash, deterministic=True)
+
+
+def get_engine(db_path="amazon.db"):
+    """Повертає спільний engine з пулом з'єднань для бази даних, створюючи його один раз на процес."""
+    db_path = os.path.abspath(db_path)
+    engine = _engines.get(db_path)
+    if engine is None:
+        with _registry_lock:
+            engine = _engines.get(db_path)
+            if engine is None:
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                engine = create_engine(f"sqlite:///{db_path}")
+                event.listen(engine, "connect", _apply_pragmas)
+                event.listen(engine, "connect", _register_functions)
+                _engines[db_path] = engine
+                logging.debug(f"Створено engine для бази даних: {db_path}")
+    return engine
+
+
+def dispose_engines():
+    """Закриває всі пуловані з'єднання і очищає реєстр (для завершення роботи та тестів)."""
+    with _registry_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _initialized_paths.clear()
+
 
 def init_db(db_path="amazon.db"):
-    """Ініціалізує базу даних і створює таблицю products, якщо вона не існує."""
+    """Ініціалізує базу даних: створює або мігрує схему до SCHEMA_VERSION.
+
+    Схема перевіряється лише один раз для кожного шляху в межах процесу.
+    """
+    # Перетворення на абсолютний шлях
+    db_path = os.path.abspath(db_path)
+    if db_path in _initialized_paths:
+        return db_path
     try:
-        # Перетворення на абсолютний шлях
-        db_path = os.path.abspath(db_path)
-        logging.info(f"Ініціалізація бази даних: {db_path}")
-
-        # Перевірка існування директорії
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-
-        engine = create_engine(f"sqlite:///{db_path}")
-        with engine.connect() as connection:
-            # Перевірка, чи таблиця існує
-            result = connection.execute(
-                text("SELECT name FROM sqlite_master WHERE type='table' AND name='products'")).fetchone()
-            if not result:
-                logging.info("Таблиця 'products' не існує, створюємо...")
-                connection.execute(text("""
-                    CREATE TABLE products (
-                        asin TEXT PRIMARY KEY,
-                        title TEXT,
-                        price REAL,
-                        original_price REAL,
-                        rating REAL,
-                        reviews INTEGER,
-                        delivery TEXT,
-                        seller TEXT,
-                        url TEXT
-                    )
-                """))
-                connection.commit()
-                logging.info("Таблиця 'products' успішно створена")
-            else:
-                logging.debug("Таблиця 'products' уже існує")
+        with _registry_lock:
+            if db_path in _initialized_paths:
+                return db_path
+            logging.info(f"Ініціалізація бази даних: {db_path}")
+            _init_schema(get_engine(db_path))
+            _initialized_paths.add(db_path)
         logging.info(f"База даних ініціалізована: {db_path}")
         return db_path
     except Exception as e:
@@ -57,67 +299,361 @@ def init_db(db_path="amazon.db"):
         raise
 
 
-def save_to_db(product_data, db_path="amazon.db"):
-    """Зберігає дані продукту в базу даних."""
+def _init_schema(engine):
+    """Застосовує до бази даних усі міграції, новіші за її PRAGMA user_version.
+
+    Міграції виконуються в одній транзакції BEGIN IMMEDIATE разом із user_version: збій посередині
+    не лишає доданих колонок без нової версії, а процеси (веб-застосунок і воркери), що
+    ініціалізують ту саму базу одночасно, застосовують міграції по черзі, а не двічі.
+    """
+    # pysqlite не відкриває транзакцію для DDL сам, тож транзакцією керуємо явно в режимі autocommit
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        current_version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+        if current_version >= SCHEMA_VERSION:
+            logging.debug(f"Схема бази даних актуальна (версія {current_version})")
+            return
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            # Версію перечитуємо під блокуванням запису: інший процес міг уже мігрувати базу
+            current_version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+            for version, description, statements in MIGRATIONS:
+                if version <= current_version:
+                    continue
+                logging.info(f"Міграція схеми до версії {version}: {description}")
+                for statement in statements:
+                    connection.execute(text(statement))
+                connection.exec_driver_sql(f"PRAGMA user_version = {version}")
+            connection.exec_driver_sql("COMMIT")
+        except BaseException:
+            connection.exec_driver_sql("ROLLBACK")
+            raise
+        if current_version < SCHEMA_VERSION:
+            logging.info(f"Схему бази даних оновлено з версії {current_version} до {SCHEMA_VERSION}")
+
+
+_UPSERT_PRODUCT_SQL = text("""
+    INSERT OR REPLACE INTO products (
+        asin, title, price, original_price, rating, reviews, delivery, seller, url, scraped_at, content_hash
+    ) VALUES (
+        :asin, :title, :price, :original_price, :rating, :reviews, :delivery, :seller, :url, :scraped_at,
+        :content_hash
+    )
+""")
+
+# Оновлення з картки результатів пошуку: лише ціна, рейтинг і відгуки (NULL — значення не відоме з картки).
+# Рядок не перезаписується, якщо вміст не змінився, тож лічильник змін products і кеші аналітики не скидаються.
+_REFRESH_CARD_VALUES = ("asin, title, COALESCE(:price, price), original_price, COALESCE(:rating, rating), "
+                        "COALESCE(:reviews, reviews), delivery, seller, url")
+_REFRESH_PRODUCT_SQL = text(f"""
+    UPDATE products SET
+        price = COALESCE(:price, price),
+        rating = COALESCE(:rating, rating),
+        reviews = COALESCE(:reviews, reviews),
+        content_hash = content_hash({_REFRESH_CARD_VALUES})
+    WHERE asin = :asin AND content_hash IS NOT content_hash({_REFRESH_CARD_VALUES})
+""")
+
+
+# Історія цін (price_observations) — інтервали незмінних значень: спостереження з тими самими ціною,
+# оригінальною ціною, рейтингом і відгуками, що й останній інтервал ASIN, лише продовжує його (last_ts),
+# інакше починається новий інтервал зі зниженням ціни відносно попереднього (price_drop).
+# Значення беруться з уже оновленого рядка products, тож оновлення з картки (NULL) не губить поля.
+_EXTEND_OBSERVATION_SQL = text("""
+    UPDATE price_observations SET last_ts = :ts, observations = observations + 1
+    WHERE asin = :asin
+        AND ts = (SELECT MAX(ts) FROM price_observations WHERE asin = :asin)
+        AND last_ts < :ts
+        AND (price, original_price, rating, reviews) = (
+            SELECT price, original_price, rating, reviews FROM products WHERE asin = :asin)
+""")
+_APPEND_OBSERVATION_SQL = text("""
+    INSERT OR IGNORE INTO price_observations (
+        asin, ts, last_ts, price, original_price, rating, reviews, prev_price, price_drop
+    )
+    SELECT p.asin, :ts, :ts, p.price, p.original_price, p.rating, p.reviews, priced.price,
+        CASE WHEN p.price > 0 AND priced.price > p.price THEN priced.price - p.price END
+    FROM products p
+    LEFT JOIN (
+        SELECT last_ts FROM price_observations WHERE asin = :asin ORDER BY ts DESC LIMIT 1
+    ) AS last ON 1
+    -- Зниження рахується від останньої відомої ціни: нульова (невдалий скрапінг) його не ховає
+    LEFT JOIN (
+        SELECT price FROM price_observations WHERE asin = :asin AND price > 0 ORDER BY ts DESC LIMIT 1
+    ) AS priced ON 1
+    WHERE p.asin = :asin AND (last.last_ts IS NULL OR last.last_ts < :ts)
+""")
+
+
+def record_observations(connection, asins, ts):
+    """Додає спостереження поточних значень products для asins у час ts до історії цін."""
+    params = [{"asin": asin, "ts": ts} for asin in asins]
+    if params:
+        connection.execute(_EXTEND_OBSERVATION_SQL, params)
+        connection.execute(_APPEND_OBSERVATION_SQL, params)
+
+
+def normalize_product(product_data):
+    """Приводить дані продукту до формату рядка таблиці products."""
+    return {
+        "asin": product_data.get("asin", ""),
+        "title": product_data.get("title", "N/A")[:255],
+        "price": float(product_data.get("price", 0.0)) or 0.0,
+        "original_price": float(product_data.get("original_price", 0.0)) or 0.0,
+        "rating": float(product_data.get("rating", 0.0)) or 0.0,
+        "reviews": int(product_data.get("reviews", 0)) or 0,
+        "delivery": product_data.get("delivery", "N/A")[:255],
+        "seller": product_data.get("seller", "N/A")[:255],
+        "url": product_data.get("url", "N/A")[:1024]
+    }
+
+
+def product_row(product_data, scraped_at=None):
+    """Рядок для запису в products: нормалізовані дані, час повного скрапінгу і хеш вмісту.
+
+    scraped_at=None означає, що сторінку товару не завантажено (лише картка або помилка),
+    і такий продукт не вважається свіжим.
+    """
+    row = normalize_product(product_data)
+    row["scraped_at"] = scraped_at
+    row["content_hash"] = content_hash(*(row[field] for field in Product._fields))
+    return row
+
+
+def card_refresh_row(card_data):
+    """Параметри оновлення з картки пошуку; нульові значення картки не перезаписують збережені."""
+    return {
+        "asin": card_data["asin"],
+        "price": float(card_data.get("price") or 0.0) or None,
+        "rating": float(card_data.get("rating") or 0.0) or None,
+        "reviews": int(card_data.get("reviews") or 0) or None,
+    }
+
+
+# Значення scraped_at за замовчуванням для save_to_db: час запису, якщо сторінку товару завантажено
+FETCHED_NOW = object()
+
+
+def save_to_db(product_data, db_path="amazon.db", scraped_at=FETCHED_NOW):
+    """Зберігає дані продукту в базу даних.
+
+    scraped_at — час завантаження сторінки товару, як у ProductWriter.add(); за замовчуванням
+    поточний, якщо в даних є назва зі сторінки товару, інакше None (запис не вважається свіжим).
+    """
     try:
-        db_path = init_db(db_path)  # Ініціалізація перед збереженням
-        engine = create_engine(f"sqlite:///{db_path}")
-        with engine.connect() as connection:
-            product_data = {
-                "asin": product_data.get("asin", ""),
-                "title": product_data.get("title", "N/A")[:255],
-                "price": float(product_data.get("price", 0.0)) or 0.0,
-                "original_price": float(product_data.get("original_price", 0.0)) or 0.0,
-                "rating": float(product_data.get("rating", 0.0)) or 0.0,
-                "reviews": int(product_data.get("reviews", 0)) or 0,
-                "delivery": product_data.get("delivery", "N/A")[:255],
-                "seller": product_data.get("seller", "N/A")[:255],
-                "url": product_data.get("url", "N/A")[:1024]
-            }
-            connection.execute(
-                text("""
-                    INSERT OR REPLACE INTO products (
-                        asin, title, price, original_price, rating, reviews, delivery, seller, url
-                    ) VALUES (
-                        :asin, :title, :price, :original_price, :rating, :reviews, :delivery, :seller, :url
-                    )
-                """), product_data
-            )
-            connection.commit()
+        db_path = init_db(db_path)  # Ініціалізація виконується лише один раз на процес
+        now = time.time()
+        if scraped_at is FETCHED_NOW:
+            scraped_at = now if product_data.get("title", "N/A") != "N/A" else None
+        product_data = product_row(product_data, scraped_at)
+        with get_engine(db_path).begin() as connection:
+            connection.execute(_UPSERT_PRODUCT_SQL, product_data)
+            record_observations(connection, [product_data["asin"]], now)
         logging.debug(f"Збережено продукт в базу даних: {product_data['asin']}")
     except Exception as e:
         logging.error(f"Помилка збереження в базу даних {db_path}: {e}")
         raise
 
 
-def get_products(db_path="amazon.db", min_rating=None, max_price=None, min_reviews=None):
-    """Отримує продукти з бази даних із застосуванням фільтрів."""
+class ProductWriter:
+    """Буферизований запис продуктів у базу даних.
+
+    Накопичує нормалізовані рядки і записує їх через executemany однією транзакцією —
+    при виклику flush() (наприклад, після кожної сторінки результатів), при досягненні
+    batch_size рядків і при виході з контекстного менеджера, зокрема через помилку
+    або скасування скрапінгу. refresh() буферизує дешеві оновлення з карток пошуку
+    для продуктів, сторінки яких не завантажувались. У тій самій транзакції кожен
+    записаний продукт додає спостереження до історії цін (price_observations).
+    """
+
+    def __init__(self, db_path="amazon.db", batch_size=100, clock=time.time):
+        if batch_size < 1:
+            raise ValueError("Розмір пакета має бути більшим за 0")
+        self.db_path = init_db(db_path)
+        self.batch_size = batch_size
+        self.clock = clock
+        self.total_written = 0
+        self._rows = {}
+        self._refreshes = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.flush()
+        except Exception:
+            # Не приховуємо початкову помилку (наприклад, скасування) помилкою запису
+            if exc_type is None:
+                raise
+        return False
+
+    def __len__(self):
+        return len(self._rows) + len(self._refreshes)
+
+    def add(self, product_data, scraped_at=None):
+        """Додає продукт до буфера; повторний ASIN у межах пакета замінює попередній.
+
+        scraped_at — час завантаження сторінки товару (None, якщо її не завантажено).
+        """
+        row = product_row(product_data, scraped_at)
+        with self._lock:
+            self._refreshes.pop(row["asin"], None)
+            self._rows[row["asin"]] = row
+            should_flush = len(self) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def refresh(self, card_data):
+        """Додає до буфера оновлення ціни, рейтингу і відгуків наявного продукту з картки пошуку."""
+        row = card_refresh_row(card_data)
+        with self._lock:
+            if row["asin"] in self._rows:
+                return
+            self._refreshes[row["asin"]] = row
+            should_flush = len(self) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Записує всі накопичені рядки однією транзакцією і повертає їх кількість."""
+        with self._lock:
+            if not self._rows and not self._refreshes:
+                return 0
+            rows = list(self._rows.values())
+            refreshes = list(self._refreshes.values())
+            try:
+                with get_engine(self.db_path).begin() as connection:
+                    if rows:
+                        connection.execute(_UPSERT_PRODUCT_SQL, rows)
+                    if refreshes:
+                        connection.execute(_REFRESH_PRODUCT_SQL, refreshes)
+                    record_observations(connection, [row["asin"] for row in rows + refreshes], self.clock())
+            except Exception as e:
+                # Рядки лишаються в буфері, щоб наступний flush() міг повторити запис
+                logging.error(f"Помилка пакетного збереження {len(rows) + len(refreshes)} продуктів "
+                              f"у {self.db_path}: {e}")
+                raise
+            self._rows.clear()
+            self._refreshes.clear()
+            self.total_written += len(rows) + len(refreshes)
+        logging.debug(f"Пакетно збережено {len(rows)} продуктів і {len(refreshes)} оновлень з карток у базу даних")
+        return len(rows) + len(refreshes)
+
+
+class FreshnessIndex:
+    """Перевірка свіжості записів products для задачі скрапінгу.
+
+    Продукт свіжий, якщо його сторінку товару завантажено не раніше ніж ttl секунд тому;
+    для таких ASIN скрапер оновлює лише дані з картки пошуку без завантаження сторінки.
+    fresh() перевіряє картки однієї сторінки результатів запитами IN (...) по первинному ключу
+    (не більше BATCH ASIN за запит), тож у пам'яті лишаються лише ASIN, завантажені цією задачею.
+    """
+
+    BATCH = 500
+
+    def __init__(self, db_path="amazon.db", ttl=0, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self.db_path = init_db(db_path) if ttl > 0 else db_path
+        self._scraped_at = {}
+
+    def fresh(self, asins):
+        """Множина свіжих ASIN серед asins."""
+        if self.ttl <= 0:
+            return set()
+        cutoff = self.clock() - self.ttl
+        asins = list(dict.fromkeys(asins))
+        fresh = {asin for asin in asins if self._scraped_at.get(asin, cutoff - 1) >= cutoff}
+        unknown = [asin for asin in asins if asin not in fresh]
+        with get_engine(self.db_path).connect() as connection:
+            for start in range(0, len(unknown), self.BATCH):
+                chunk = unknown[start:start + self.BATCH]
+                params = {f"a{i}": asin for i, asin in enumerate(chunk)}
+                rows = connection.execute(text(
+                    f"SELECT asin FROM products WHERE asin IN ({', '.join(':' + key for key in params)}) "
+                    "AND scraped_at >= :cutoff"), {**params, "cutoff": cutoff}).fetchall()
+                fresh.update(row.asin for row in rows)
+        return fresh
+
+    def is_fresh(self, asin):
+        return asin in self.fresh([asin])
+
+    def add(self, asin, scraped_at):
+        """Позначає ASIN щойно завантаженим, щоб інші сторінки цієї задачі його пропускали
+        ще до запису буфера ProductWriter у базу."""
+        if self.ttl > 0:
+            self._scraped_at[asin] = scraped_at
+
+
+def _build_filters(min_rating=None, max_price=None, min_reviews=None):
+    """Будує WHERE-умову і параметри для фільтрів продуктів."""
+    query = "WHERE 1=1"
+    params = {}
+    if min_rating is not None:
+        if min_rating < 0:
+            raise ValueError("Мінімальний рейтинг не може бути від’ємним")
+        query += " AND rating >= :min_rating"
+        params["min_rating"] = min_rating
+    if max_price is not None:
+        if max_price < 0:
+            raise ValueError("Максимальна ціна не може бути від’ємною")
+        query += " AND price <= :max_price"
+        params["max_price"] = max_price
+    if min_reviews is not None:
+        if min_reviews < 0:
+            raise ValueError("Мінімальна кількість відгуків не може бути від’ємною")
+        query += " AND reviews >= :min_reviews"
+        params["min_reviews"] = min_reviews
+    return query, params
+
+
+def get_products(db_path="amazon.db", min_rating=None, max_price=None, min_reviews=None,
+                 limit=None, offset=None, order_by=None, after=None):
+    """Отримує продукти з бази даних із застосуванням фільтрів.
+
+    limit/offset повертають лише одну сторінку. order_by — одна з колонок SORTABLE_COLUMNS
+    (з префіксом "-" для спадання); рівні значення впорядковуються за asin.
+    after=(значення order_by, asin) вмикає keyset-пагінацію: повертаються рядки строго після
+    цього курсора, тож вартість запиту не залежить від номера сторінки.
+    """
     try:
-        db_path = init_db(db_path)  # Ініціалізація перед запитом
-        engine = create_engine(f"sqlite:///{db_path}")
-        query = "SELECT * FROM products WHERE 1=1"
-        params = {}
-        if min_rating is not None:
-            if min_rating < 0:
-                raise ValueError("Мінімальний рейтинг не може бути від’ємним")
-            query += " AND rating >= :min_rating"
-            params["min_rating"] = min_rating
-        if max_price is not None:
-            if max_price < 0:
-                raise ValueError("Максимальна ціна не може бути від’ємною")
-            query += " AND price <= :max_price"
-            params["max_price"] = max_price
-        if min_reviews is not None:
-            if min_reviews < 0:
-                raise ValueError("Мінімальна кількість відгуків не може бути від’ємною")
-            query += " AND reviews >= :min_reviews"
-            params["min_reviews"] = min_reviews
-
-        with engine.connect() as connection:
+        db_path = init_db(db_path)  # Ініціалізація виконується лише один раз на процес
+        where, params = _build_filters(min_rating, max_price, min_reviews)
+        query = f"SELECT {PRODUCT_COLUMNS_SQL} FROM products {where}"
+
+        if order_by is not None or limit is not None or after is not None:
+            descending = bool(order_by) and order_by.startswith("-")
+            column = (order_by or "asin").lstrip("-")
+            if column not in SORTABLE_COLUMNS:
+                raise ValueError(f"Недопустима колонка сортування: {column}")
+            direction = "DESC" if descending else "ASC"
+            if after is not None:
+                comparison = "<" if descending else ">"
+                if column == "asin":
+                    query += f" AND asin {comparison} :after_asin"
+                    params["after_asin"] = after[-1]
+                else:
+                    query += f" AND ({column}, asin) {comparison} (:after_value, :after_asin)"
+                    params["after_value"], params["after_asin"] = after
+            if column == "asin":
+                query += f" ORDER BY asin {direction}"
+            else:
+                query += f" ORDER BY {column} {direction}, asin {direction}"
+
+        if limit is not None:
+            if limit < 0:
+                raise ValueError("Ліміт не може бути від’ємним")
+            query += " LIMIT :limit"
+            params["limit"] = limit
+            if offset:
+                if offset < 0:
+                    raise ValueError("Зсув не може бути від’ємним")
+                query += " OFFSET :offset"
+                params["offset"] = offset
+
+        with get_engine(db_path).connect() as connection:
             result = connection.execute(text(query), params).fetchall()
-            Product = namedtuple("Product",
-                                 ["asin", "title", "price", "original_price", "rating", "reviews", "delivery", "seller",
-                                  "url"])
             logging.debug(f"Отримано {len(result)} продуктів з бази даних")
             return [Product(*row) for row in result]
     except Exception as e:
@@ -125,26 +661,95 @@ def get_products(db_path="amazon.db", min_rating=None, max_price=None, min_revie
         return []
 
 
-def export_to_csv(products, db_path="amazon.db"):
-    """Експортує продукти в CSV-файл."""
+def count_products(db_path="amazon.db", min_rating=None, max_price=None, min_reviews=None):
+    """Повертає кількість продуктів, що відповідають тим самим фільтрам, що й get_products."""
+    try:
+        db_path = init_db(db_path)
+        where, params = _build_filters(min_rating, max_price, min_reviews)
+        with get_engine(db_path).connect() as connection:
+            return connection.execute(text(f"SELECT COUNT(*) FROM products {where}"), params).scalar()
+    except Exception as e:
+        logging.error(f"Помилка підрахунку продуктів у {db_path}: {e}")
+        return 0
+
+
+def get_data_version(db_path="amazon.db"):
+    """Повертає лічильник змін таблиці products; він зростає з кожним записом з будь-якого процесу."""
+    db_path = init_db(db_path)
+    with get_engine(db_path).connect() as connection:
+        return connection.execute(
+            text("SELECT version FROM table_versions WHERE name = 'products'")).scalar()
+
+
+def iter_product_chunks(db_path="amazon.db", min_rating=None, max_price=None, min_reviews=None,
+                        chunk_size=1000):
+    """Повертає генератор продуктів порціями по chunk_size через курсор (fetchmany).
+
+    Фільтри перевіряються одразу, а не при першій ітерації, тож помилки в параметрах
+    можна повернути клієнту до початку відповіді.
+    """
+    db_path = init_db(db_path)
+    where, params = _build_filters(min_rating, max_price, min_reviews)
+    query = text(f"SELECT {PRODUCT_COLUMNS_SQL} FROM products {where}")
+    return _iter_product_chunks(db_path, query, params, chunk_size)
+
+
+def _iter_product_chunks(db_path, query, params, chunk_size):
+    with get_engine(db_path).connect() as connection:
+        result = connection.execution_options(stream_results=True).execute(query, params)
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [Product(*row) for row in rows]
+
+
+def _csv_text(rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(Product._fields)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def iter_csv_chunks(db_path="amazon.db", min_rating=None, max_price=None, min_reviews=None, chunk_size=1000):
+    """Повертає генератор закодованих у UTF-8 фрагментів CSV: спочатку заголовок, далі по одному на порцію."""
+    chunks = iter_product_chunks(db_path, min_rating, max_price, min_reviews, chunk_size)
+    return _iter_csv_chunks(chunks)
+
+
+def _iter_csv_chunks(chunks):
+    yield _csv_text([], header=True).encode("utf-8")
+    for chunk in chunks:
+        yield _csv_text(chunk).encode("utf-8")
+
+
+def export_to_csv(products=None, db_path="amazon.db", csv_file="products_export.csv", chunk_size=1000, **filters):
+    """Експортує продукти в CSV-файл.
+
+    Якщо products не передано, продукти читаються з бази порціями з урахуванням фільтрів
+    тим самим шляхом, що й потоковий експорт /export.
+    """
     try:
-        if not products:
+        if products is not None:
+            if not products:
+                logging.warning("Немає продуктів для експорту")
+                return None
+            chunks = [products]
+        else:
+            chunks = iter_product_chunks(db_path, chunk_size=chunk_size, **filters)
+        exported = 0
+        with open(csv_file, "w", encoding="utf-8", newline="") as f:
+            f.write(_csv_text([], header=True))
+            for chunk in chunks:
+                f.write(_csv_text(chunk))
+                exported += len(chunk)
+        if not exported:
+            os.remove(csv_file)
             logging.warning("Немає продуктів для експорту")
             return None
-        df = pd.DataFrame([{
-            "asin": p.asin,
-            "title": p.title,
-            "price": p.price,
-            "original_price": p.original_price,
-            "rating": p.rating,
-            "reviews": p.reviews,
-            "delivery": p.delivery,
-            "seller": p.seller,
-            "url": p.url
-        } for p in products])
-        csv_file = "products_export.csv"
-        df.to_csv(csv_file, index=False, encoding="utf-8")
-        logging.info(f"Дані експортовано до {csv_file}")
+        logging.info(f"Дані експортовано до {csv_file} ({exported} продуктів)")
         return csv_file
     except Exception as e:
         logging.error(f"Помилка експорту в CSV: {e}")
@@ -154,12 +759,10 @@ def export_to_csv(products, db_path="amazon.db"):
 def clear_db(db_path="amazon.db"):
     """Очищає таблицю products у базі даних."""
     try:
-        db_path = init_db(db_path)  # Ініціалізація перед очищенням
-        conn = sqlite3.connect(db_path)
-        c = conn.cursor()
-        c.execute("DELETE FROM products")
-        conn.commit()
-        conn.close()
+        db_path = init_db(db_path)  # Ініціалізація виконується лише один раз на процес
+        with get_engine(db_path).connect() as connection:
+            connection.execute(text("DELETE FROM products"))
+            connection.commit()
         logging.info(f"База даних {db_path} очищена")
     except Exception as e:
         logging.error(f"Помилка очищення бази даних {db_path}: {e}")
@@ -0,0 +1,220 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import text
+from app.database import init_db, get_engine
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+# Події задачі скрапінгу: перехід на сторінку результатів, збережений продукт, повторна спроба,
+# очікування CAPTCHA, початок і завершення задачі
+STARTED, PAGE, PRODUCT, RETRY, CAPTCHA, FINISHED = "started", "page", "product", "retry", "captcha", "finished"
+# Події, з яких підписнику потрібен лише останній стан: нова замінює ще не доставлену попередню
+COALESCED = (PAGE, PRODUCT)
+
+
+class Subscription:
+    """Черга подій одного підписника з об'єднанням оновлень і обмеженим розміром.
+
+    Події COALESCED об'єднуються з ще не доставленою подією того самого типу і задачі, тож
+    повільний підписник отримує останній стан, а не всю історію. Якщо і так недоставлених
+    подій більше max_pending, відкидаються найстаріші з них COALESCED (лічильник dropped):
+    публікація ніколи не блокується через підписника, а повторні спроби, CAPTCHA і завершення
+    задачі не губляться. Підписник на всі теми отримує ID задачі в полі task_id.
+    """
+
+    def __init__(self, bus, topic=None, max_pending=100):
+        self.bus = bus
+        self.topic = topic
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._loop = None
+        self._ready = None
+
+    def put(self, topic, event):
+        if self.topic is None:
+            event = {**event, "task_id": topic}
+        key = (topic, event["type"]) if event["type"] in COALESCED else next(self._ids)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._pending[key] = event
+            if len(self._pending) > self.max_pending:
+                # Прогрес наступна подія однаково перекриє, решту подій підписник має отримати
+                droppable = [k for k, e in self._pending.items() if e["type"] in COALESCED]
+                for k in droppable[:len(self._pending) - self.max_pending]:
+                    del self._pending[k]
+                    self.dropped += 1
+            self._condition.notify_all()
+            loop, ready = self._loop, self._ready
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # Цикл подій уже закрито: підписник відключився
+                pass
+
+    def drain(self):
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending.clear()
+        return events
+
+    def get(self, timeout=None):
+        """Чекає події до timeout секунд і повертає всі накопичені (список може бути порожнім)."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending, timeout)
+        return self.drain()
+
+    async def next_batch(self, timeout=None):
+        """Асинхронний варіант get() для циклу подій веб-застосунку."""
+        if self._ready is None:
+            self._loop = asyncio.get_running_loop()
+            self._ready = asyncio.Event()
+        events = self.drain()
+        if events:
+            return events
+        self._ready.clear()
+        # Подія могла надійти між drain() і clear()
+        events = self.drain()
+        if events:
+            return events
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.drain()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class EventBus:
+    """Потокобезпечна шина подій задач скрапінгу (тема — ID задачі)."""
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+    @property
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def subscribe(self, topic=None):
+        """Підписка на події теми topic (None — на всі)."""
+        subscription = Subscription(self, topic, self.max_pending)
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def publish(self, topic, event_type, **data):
+        self.publish_event(topic, {"type": event_type, "time": time.time(), **data})
+
+    def publish_event(self, topic, event):
+        # Список підписок замінюється цілком при змінах, тож ітерація не потребує блокування
+        for subscription in self._subscriptions:
+            if subscription.topic is None or subscription.topic == topic:
+                subscription.put(topic, event)
+
+
+class EventStore:
+    """Журнал подій задач у таблиці scrape_events: міст між процесами-воркерами і веб-застосунком."""
+
+    def __init__(self, db_path="amazon.db"):
+        self.db_path = init_db(db_path)
+
+    def _engine(self):
+        return get_engine(self.db_path)
+
+    def append(self, job_id, events):
+        """Записує пакет подій задачі однією транзакцією."""
+        if not events:
+            return
+        with self._engine().begin() as connection:
+            connection.execute(text("""
+                INSERT INTO scrape_events (job_id, type, data, created_at) VALUES (:job_id, :type, :data, :created_at)
+            """), [{"job_id": job_id, "type": event["type"], "data": json.dumps(event, ensure_ascii=False),
+                    "created_at": event["time"]} for event in events])
+
+    def last_id(self):
+        with self._engine().connect() as connection:
+            return connection.execute(text("SELECT COALESCE(MAX(id), 0) FROM scrape_events")).scalar()
+
+    def read_after(self, last_id, limit=500):
+        """Події з id > last_id: список (id, ID задачі, подія)."""
+        with self._engine().connect() as connection:
+            rows = connection.execute(text("""
+                SELECT id, job_id, data FROM scrape_events WHERE id > :last_id ORDER BY id LIMIT :limit
+            """), {"last_id": last_id, "limit": limit}).fetchall()
+        return [(row.id, row.job_id, json.loads(row.data)) for row in rows]
+
+
+class EventRelay:
+    """Потік веб-процесу, що передає нові події з EventStore у локальну EventBus.
+
+    Журнал читається одним запитом за poll_interval для всіх підписників разом, тож
+    навантаження на базу не залежить від кількості відкритих дашбордів. Без підписників
+    лише запам'ятовується позиція кінця журналу: підписник отримає всі події, записані
+    після його підписки, а накопичене раніше він бачить у знімку стану з scrape_jobs.
+    """
+
+    def __init__(self, bus, store, poll_interval=0.5):
+        self.bus = bus
+        self.store = store
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Позиція фіксується до запуску потоку: події, записані після start(), не пропускаються
+        last_id = self.store.last_id()
+        self._thread = threading.Thread(target=self._run, args=(last_id,), name="event-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, last_id):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                if not self.bus.has_subscribers:
+                    # Позиція читається до повторної перевірки: підписка, що з'явиться після неї,
+                    # отримає всі події з більшим id
+                    position = self.store.last_id()
+                    if not self.bus.has_subscribers:
+                        last_id = position
+                        continue
+                for event_id, job_id, event in self.store.read_after(last_id):
+                    self.bus.publish_event(job_id, event)
+                    last_id = event_id
+            except Exception as e:
+                logging.error(f"Помилка читання подій задач: {e}")
@@ -0,0 +1,141 @@
+import io
+import json
+import logging
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.database import iter_product_chunks, iter_csv_chunks
+
+# Типізована схема таблиці products; seller і delivery мають мало унікальних значень,
+# тому зберігаються як словникові колонки
+PRODUCTS_SCHEMA = pa.schema([
+    ("asin", pa.string()),
+    ("title", pa.string()),
+    ("price", pa.float64()),
+    ("original_price", pa.float64()),
+    ("rating", pa.float64()),
+    ("reviews", pa.int64()),
+    ("delivery", pa.dictionary(pa.int32(), pa.string())),
+    ("seller", pa.dictionary(pa.int32(), pa.string())),
+    ("url", pa.string()),
+])
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файловий об'єкт лише для запису, що накопичує байти до виклику drain().
+
+    Дозволяє віддавати Parquet і Arrow IPC частинами: tell() рахує всі записані байти,
+    тож зміщення у футері Parquet лишаються коректними після кожного drain().
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _record_batch(chunk):
+    """Перетворює порцію Product у RecordBatch за схемою PRODUCTS_SCHEMA."""
+    columns = list(zip(*chunk))
+    arrays = []
+    for field, values in zip(PRODUCTS_SCHEMA, columns):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=PRODUCTS_SCHEMA)
+
+
+def _iter_columnar(chunks, open_writer, write_batch):
+    sink = _ChunkSink()
+    output = pa.PythonFile(sink, mode="w")
+    writer = open_writer(output)
+    try:
+        for chunk in chunks:
+            write_batch(writer, _record_batch(chunk))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+        output.close()
+    yield sink.drain()
+
+
+def iter_parquet_chunks(db_path="amazon.db", row_group_size=65536, compression="zstd", **filters):
+    """Повертає генератор байтів Parquet-файлу; кожна порція з бази стає окремою row group."""
+    chunks = iter_product_chunks(db_path, chunk_size=row_group_size, **filters)
+    return _iter_columnar(
+        chunks,
+        lambda output: pq.ParquetWriter(output, PRODUCTS_SCHEMA, compression=compression,
+                                        use_dictionary=["delivery", "seller"]),
+        lambda writer, batch: writer.write_batch(batch, row_group_size=row_group_size)
+    )
+
+
+def iter_arrow_chunks(db_path="amazon.db", chunk_size=65536, **filters):
+    """Повертає генератор байтів у потоковому форматі Arrow IPC (по одному RecordBatch на порцію)."""
+    chunks = iter_product_chunks(db_path, chunk_size=chunk_size, **filters)
+    return _iter_columnar(
+        chunks,
+        lambda output: pa.ipc.new_stream(output, PRODUCTS_SCHEMA),
+        lambda writer, batch: writer.write_batch(batch)
+    )
+
+
+def iter_ndjson_chunks(db_path="amazon.db", chunk_size=1000, **filters):
+    """Повертає генератор байтів NDJSON: один JSON-об'єкт продукту на рядок."""
+    chunks = iter_product_chunks(db_path, chunk_size=chunk_size, **filters)
+    return _iter_ndjson(chunks)
+
+
+def _iter_ndjson(chunks):
+    for chunk in chunks:
+        yield "".join(json.dumps(product._asdict(), ensure_ascii=False) + "\n" for product in chunk).encode("utf-8")
+
+
+def iter_export_chunks(export_format="csv", db_path="amazon.db", **filters):
+    """Повертає генератор байтів експорту таблиці products у вказаному форматі."""
+    if export_format == "csv":
+        return iter_csv_chunks(db_path, **filters)
+    if export_format == "parquet":
+        return iter_parquet_chunks(db_path, **filters)
+    if export_format == "arrow":
+        return iter_arrow_chunks(db_path, **filters)
+    if export_format == "ndjson":
+        return iter_ndjson_chunks(db_path, **filters)
+    raise ValueError(f"Непідтримуваний формат експорту: {export_format}")
+
+
+def export_to_file(output_path, export_format="parquet", db_path="amazon.db", **filters):
+    """Записує таблицю products у файл у вказаному форматі і повертає кількість записаних байтів."""
+    written = 0
+    with open(output_path, "wb") as f:
+        for data in iter_export_chunks(export_format, db_path, **filters):
+            f.write(data)
+            written += len(data)
+    logging.info(f"Дані експортовано до {output_path} (формат {export_format}, {written} байтів)")
+    return written
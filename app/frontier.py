@@ -0,0 +1,265 @@
+import json
+import logging
+import os
+import re
+import socket
+import time
+import uuid
+from sqlalchemy import text
+from app.database import init_db, get_engine
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+QUEUED, IN_FLIGHT, DONE = "queued", "in_flight", "done"
+# Стан сторінки результатів, якої немає (результати пошуку закінчились раніше)
+MISSING = "missing"
+
+
+class FrontierBusyError(Exception):
+    """Обхід того самого запиту вже виконує інша жива задача."""
+
+
+def _local_owner():
+    return f"local-{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def _owner_alive(owner):
+    """Чи живий власник обходу: процес без task_id на цьому хості перевіряється за PID,
+    власник без ID (запис старішої версії) вважається завершеним."""
+    if not owner:
+        return False
+    match = re.fullmatch(r"local-(.+)-(\d+)-[0-9a-f]{6}", owner)
+    if match is None or match.group(1) != socket.gethostname():
+        return True
+    try:
+        os.kill(int(match.group(2)), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def crawl_key(query):
+    """Ключ задачі обходу: повторно надісланий той самий запит продовжує попередній обхід."""
+    return " ".join(query.lower().split())
+
+
+class CrawlFrontier:
+    """Стійкий фронтир обходу в SQLite поруч із таблицею products.
+
+    Для кожної задачі (ключ — нормалізований пошуковий запит) зберігає курсор сторінки
+    результатів (next_page) і картки товарів зі станом queued / in_flight / done.
+    Картка стає done лише після того, як її рядок записано в products, тож після збою
+    або скасування повторний запуск пропускає завершену роботу і продовжує з місця зупинки.
+
+    Сторінки результатів з прямими URL пошуку (plan_pages) зберігаються окремо, зі станом
+    queued / in_flight / done / missing: їх можна завантажувати незалежно і паралельно,
+    а claim_pages() віддає кожну сторінку лише одному завантажувачу.
+
+    Обхід запиту одночасно веде лише одна задача (task_id; без нього — ID процесу на хості):
+    кожна зміна фронтиру продовжує її оренду (crawl_tasks.updated_at), і resume() іншої задачі
+    відмовляє з FrontierBusyError, доки оренда не старша за lease_ttl секунд, а процес-власник
+    на цьому хості живий.
+    """
+
+    def __init__(self, query, pages, db_path="amazon.db", task_id=None, lease_ttl=600.0, clock=time.time):
+        self.db_path = init_db(db_path)
+        self.key = crawl_key(query)
+        self.query = query
+        self.pages = pages
+        self.task_id = task_id or _local_owner()
+        self.lease_ttl = lease_ttl
+        self.clock = clock
+
+    def _engine(self):
+        return get_engine(self.db_path)
+
+    def _renew_lease(self, connection):
+        connection.execute(text("""
+            UPDATE crawl_tasks SET updated_at = :now WHERE task_key = :key AND task_id = :task_id
+        """), {"key": self.key, "task_id": self.task_id, "now": self.clock()})
+
+    def resume(self, fresh=False):
+        """Готує задачу до запуску і повертає сторінку результатів, з якої слід продовжити.
+
+        Завершена задача (або fresh=True) починається заново; у незавершеній картки,
+        що були in_flight на момент збою, повертаються в чергу. FrontierBusyError, якщо обхід
+        запиту зараз веде інша задача.
+        """
+        now = self.clock()
+        with self._engine().begin() as connection:
+            # Запис першим оператором бере блокування бази до читання стану: дві задачі,
+            # що відновлюють той самий обхід, не побачать його вільним одночасно
+            connection.execute(text("UPDATE crawl_tasks SET updated_at = updated_at WHERE task_key = :key"),
+                               {"key": self.key})
+            task = connection.execute(text(
+                "SELECT next_page, status, task_id, updated_at FROM crawl_tasks WHERE task_key = :key"
+            ), {"key": self.key}).first()
+            if (task is not None and task.status == "running" and task.task_id != self.task_id
+                    and task.updated_at > now - self.lease_ttl and _owner_alive(task.task_id)):
+                raise FrontierBusyError(f"Обхід '{self.query}' уже виконує задача {task.task_id}")
+            if task is None or task.status == DONE or fresh:
+                connection.execute(text("DELETE FROM crawl_frontier WHERE task_key = :key"), {"key": self.key})
+                connection.execute(text("DELETE FROM crawl_pages WHERE task_key = :key"), {"key": self.key})
+                connection.execute(text("""
+                    INSERT OR REPLACE INTO crawl_tasks (task_key, query, pages, next_page, status, task_id, updated_at)
+                    VALUES (:key, :query, :pages, 1, 'running', :task_id, :now)
+                """), {"key": self.key, "query": self.query, "pages": self.pages, "task_id": self.task_id,
+                       "now": now})
+                return 1
+            requeued = connection.execute(text("""
+                UPDATE crawl_frontier SET state = 'queued', updated_at = :now
+                WHERE task_key = :key AND state = 'in_flight'
+            """), {"key": self.key, "now": now}).rowcount
+            connection.execute(text("""
+                UPDATE crawl_pages SET state = 'queued', updated_at = :now
+                WHERE task_key = :key AND state = 'in_flight'
+            """), {"key": self.key, "now": now})
+            connection.execute(text("""
+                UPDATE crawl_tasks SET pages = :pages, status = 'running', task_id = :task_id, updated_at = :now
+                WHERE task_key = :key
+            """), {"key": self.key, "pages": self.pages, "task_id": self.task_id, "now": now})
+        logging.info(f"Відновлення обходу '{self.query}' зі сторінки {task.next_page} "
+                     f"(повернуто в чергу: {requeued})")
+        return task.next_page
+
+    def plan_pages(self, urls):
+        """Додає сторінки результатів {номер: URL пошуку} у чергу; вже відомі сторінки не змінюються."""
+        now = self.clock()
+        rows = [{"key": self.key, "page": page, "url": url, "now": now} for page, url in urls.items()]
+        if not rows:
+            return
+        with self._engine().begin() as connection:
+            connection.execute(text("""
+                INSERT OR IGNORE INTO crawl_pages (task_key, page, url, updated_at) VALUES (:key, :page, :url, :now)
+            """), rows)
+
+    def claim_pages(self, pages):
+        """Забирає сторінки з черги (queued -> in_flight) і повертає ті, що дісталися цьому виклику.
+
+        Оновлення умовне, тож паралельні завантажувачі не отримують ту саму сторінку.
+        """
+        claimed = []
+        now = self.clock()
+        with self._engine().begin() as connection:
+            for page in pages:
+                if connection.execute(text("""
+                    UPDATE crawl_pages SET state = 'in_flight', attempts = attempts + 1, updated_at = :now
+                    WHERE task_key = :key AND page = :page AND state = 'queued'
+                """), {"key": self.key, "page": page, "now": now}).rowcount:
+                    claimed.append(page)
+            self._renew_lease(connection)
+        return claimed
+
+    def page_state(self, page):
+        """Стан сторінки результатів page або None, якщо її не заплановано."""
+        with self._engine().connect() as connection:
+            return connection.execute(text("SELECT state FROM crawl_pages WHERE task_key = :key AND page = :page"),
+                                      {"key": self.key, "page": page}).scalar()
+
+    def set_page_state(self, page, state):
+        """Змінює стан сторінки; missing позначає також усі наступні сторінки."""
+        with self._engine().begin() as connection:
+            connection.execute(text(f"""
+                UPDATE crawl_pages SET state = :state, updated_at = :now
+                WHERE task_key = :key AND page {">=" if state == MISSING else "="} :page
+            """), {"key": self.key, "page": page, "state": state, "now": self.clock()})
+            self._renew_lease(connection)
+
+    def add_page(self, page, cards):
+        """Зберігає картки завантаженої сторінки результатів і позначає її done."""
+        added = self.enqueue(page, cards)
+        self.set_page_state(page, DONE)
+        return added
+
+    def has_page(self, page):
+        """Чи вже збережено картки сторінки результатів page."""
+        with self._engine().connect() as connection:
+            return connection.execute(text(
+                "SELECT 1 FROM crawl_frontier WHERE task_key = :key AND page = :page LIMIT 1"
+            ), {"key": self.key, "page": page}).first() is not None
+
+    def enqueue(self, page, cards):
+        """Додає картки сторінки page у чергу; картки, вже відомі задачі, пропускаються.
+
+        Заодно записує зв'язок запиту з продуктами (query_products): його фронтир не очищає.
+        """
+        now = self.clock()
+        rows = [{"key": self.key, "asin": card.asin, "page": page, "position": position, "url": card.url,
+                 "card": json.dumps(card._asdict(), ensure_ascii=False), "now": now}
+                for position, card in enumerate(cards)]
+        if not rows:
+            return 0
+        with self._engine().begin() as connection:
+            connection.execute(text("""
+                INSERT INTO query_products (query, asin, page, position, first_seen_at, last_seen_at)
+                VALUES (:key, :asin, :page, :position, :now, :now)
+                ON CONFLICT (query, asin) DO UPDATE SET page = excluded.page, position = excluded.position,
+                    last_seen_at = excluded.last_seen_at
+            """), rows)
+            return connection.execute(text("""
+                INSERT OR IGNORE INTO crawl_frontier (task_key, asin, page, position, url, card, updated_at)
+                VALUES (:key, :asin, :page, :position, :url, :card, :now)
+            """), rows).rowcount
+
+    def pending(self, page, card_type):
+        """Незавершені картки сторінки page у порядку на сторінці, відновлені як card_type(**поля)."""
+        with self._engine().connect() as connection:
+            rows = connection.execute(text("""
+                SELECT card FROM crawl_frontier
+                WHERE task_key = :key AND page = :page AND state != 'done'
+                ORDER BY position
+            """), {"key": self.key, "page": page}).fetchall()
+        return [card_type(**json.loads(row.card)) for row in rows]
+
+    def _set_state(self, asins, state, extra=""):
+        if not asins:
+            return
+        now = self.clock()
+        with self._engine().begin() as connection:
+            connection.execute(text(f"""
+                UPDATE crawl_frontier SET state = :state, updated_at = :now{extra}
+                WHERE task_key = :key AND asin = :asin
+            """), [{"key": self.key, "asin": asin, "state": state, "now": now} for asin in asins])
+            self._renew_lease(connection)
+
+    def mark_in_flight(self, asins):
+        self._set_state(asins, IN_FLIGHT, ", attempts = attempts + 1")
+
+    def mark_done(self, asins):
+        """Позначає картки завершеними; викликається лише після запису їхніх рядків у products."""
+        self._set_state(asins, DONE)
+
+    def advance(self, next_page):
+        """Пересуває курсор сторінок результатів: сторінки до next_page оброблено повністю."""
+        with self._engine().begin() as connection:
+            connection.execute(text("""
+                UPDATE crawl_tasks SET next_page = :next_page, updated_at = :now
+                WHERE task_key = :key AND task_id = :task_id
+            """), {"key": self.key, "task_id": self.task_id, "next_page": next_page, "now": self.clock()})
+
+    def finish(self, status=DONE):
+        """Завершує задачу зі статусом done, failed або cancelled."""
+        with self._engine().begin() as connection:
+            connection.execute(text("""
+                UPDATE crawl_tasks SET status = :status, updated_at = :now WHERE task_key = :key AND task_id = :task_id
+            """), {"key": self.key, "task_id": self.task_id, "status": status, "now": self.clock()})
+
+    def stats(self):
+        """Кількість карток задачі за станами."""
+        with self._engine().connect() as connection:
+            rows = connection.execute(text("""
+                SELECT state, COUNT(*) AS count FROM crawl_frontier WHERE task_key = :key GROUP BY state
+            """), {"key": self.key}).fetchall()
+        counts = {QUEUED: 0, IN_FLIGHT: 0, DONE: 0}
+        counts.update({row.state: row.count for row in rows})
+        return counts
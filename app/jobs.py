@@ -0,0 +1,230 @@
+import json
+import logging
+import time
+import uuid
+from sqlalchemy import text
+from app.database import init_db, get_engine
+from app.events import EventStore, FINISHED as FINISHED_EVENT
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+_JOB_COLUMNS = ("id, query, pages, options, status, message, current_page, total_products, cancel_requested, "
+                "worker_id, attempts, priority, batch_id, created_at, started_at, heartbeat_at, finished_at")
+
+
+def parse_queries(lines):
+    """Розбирає список запитів пакета: рядок "запит" або "запит | пріоритет"; # — коментар.
+
+    Повторні запити (з точністю до регістру і пробілів) об'єднуються з найвищим пріоритетом.
+    Повертає [(запит, пріоритет)] від найвищого пріоритету, за однакового — у порядку списку.
+    """
+    queries = {}
+    for number, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        query, _, priority = line.partition("|")
+        query = " ".join(query.split())
+        try:
+            priority = int(priority) if priority.strip() else 0
+        except ValueError:
+            raise ValueError(f"Рядок {number}: пріоритет має бути цілим числом: {priority.strip()}")
+        key = query.lower()
+        if key not in queries or priority > queries[key][1]:
+            queries[key] = (queries[key][0] if key in queries else query, priority)
+    return sorted(queries.values(), key=lambda item: -item[1])
+
+
+def _job(row):
+    job = dict(row._mapping)
+    job["options"] = json.loads(job["options"])
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+class JobQueue:
+    """Стійка черга задач скрапінгу в SQLite (таблиця scrape_jobs).
+
+    Веб-застосунок лише додає задачі і читає їхній стан, виконують їх процеси-воркери
+    (app/worker.py): воркер забирає задачу, поки вона виконується, періодично пише heartbeat
+    з прогресом і записує результат. Задачі переживають перезапуск і доступні всім процесам.
+    Задачу воркера без heartbeat довше stale_after повертає в чергу requeue_stale() (не більше
+    max_attempts спроб), а завершені задачі видаляє evict() після закінчення TTL.
+    """
+
+    def __init__(self, db_path="amazon.db", clock=time.time):
+        self.db_path = init_db(db_path)
+        self.clock = clock
+
+    def _engine(self):
+        return get_engine(self.db_path)
+
+    def submit(self, query, pages, priority=0, batch_id=None, **options):
+        """Додає задачу в чергу і повертає її ID; options передаються в AmazonScraper.
+
+        Воркери забирають задачі з вищим priority першими.
+        """
+        job_id = str(uuid.uuid4())
+        with self._engine().begin() as connection:
+            connection.execute(text("""
+                INSERT INTO scrape_jobs (id, query, pages, options, status, message, priority, batch_id, created_at)
+                VALUES (:id, :query, :pages, :options, 'queued', 'Задача в черзі', :priority, :batch_id, :now)
+            """), {"id": job_id, "query": query, "pages": pages, "options": json.dumps(options),
+                   "priority": priority, "batch_id": batch_id, "now": self.clock()})
+        logging.info(f"Задачу {job_id} ('{query}', сторінок: {pages}) додано в чергу")
+        return job_id
+
+    def submit_batch(self, queries, pages, **options):
+        """Додає пакет задач [(запит, пріоритет)] зі спільним ID пакета; повертає (ID пакета, [ID задач])."""
+        batch_id = str(uuid.uuid4())
+        job_ids = [self.submit(query, pages, priority=priority, batch_id=batch_id, **options)
+                   for query, priority in queries]
+        logging.info(f"Пакет {batch_id}: додано в чергу {len(job_ids)} запитів")
+        return batch_id, job_ids
+
+    def get(self, job_id):
+        with self._engine().connect() as connection:
+            row = connection.execute(text(f"SELECT {_JOB_COLUMNS} FROM scrape_jobs WHERE id = :id"),
+                                     {"id": job_id}).first()
+        return _job(row) if row is not None else None
+
+    def list(self, limit=100):
+        """Останні задачі, від найновішої."""
+        with self._engine().connect() as connection:
+            rows = connection.execute(text(f"SELECT {_JOB_COLUMNS} FROM scrape_jobs ORDER BY created_at DESC "
+                                           "LIMIT :limit"), {"limit": limit}).fetchall()
+        return [_job(row) for row in rows]
+
+    def claim(self, worker_id):
+        """Забирає з черги задачу з найвищим пріоритетом (серед них — найстаршу); None, якщо черга порожня.
+
+        Оновлення умовне (status = 'queued'), тож задачу отримує лише один з воркерів, що змагаються.
+        """
+        while True:
+            with self._engine().begin() as connection:
+                job_id = connection.execute(text(
+                    "SELECT id FROM scrape_jobs WHERE status = 'queued' ORDER BY priority DESC, created_at LIMIT 1"
+                )).scalar()
+                if job_id is None:
+                    return None
+                now = self.clock()
+                claimed = connection.execute(text("""
+                    UPDATE scrape_jobs SET status = 'running', worker_id = :worker_id, attempts = attempts + 1,
+                        started_at = :now, heartbeat_at = :now, message = 'Скрапінг розпочато'
+                    WHERE id = :id AND status = 'queued'
+                """), {"id": job_id, "worker_id": worker_id, "now": now}).rowcount
+            if claimed:
+                logging.info(f"Воркер {worker_id} забрав задачу {job_id}")
+                return self.get(job_id)
+
+    def heartbeat(self, job_id, worker_id, current_page=0, total_products=0):
+        """Оновлює heartbeat і прогрес задачі; True, якщо воркер має зупинити її виконання.
+
+        Зупинка потрібна, коли задачу скасовано або вона вже не належить воркеру
+        (наприклад, повернута в чергу через пропущені heartbeat).
+        """
+        with self._engine().begin() as connection:
+            updated = connection.execute(text("""
+                UPDATE scrape_jobs SET heartbeat_at = :now, current_page = :current_page,
+                    total_products = :total_products
+                WHERE id = :id AND worker_id = :worker_id AND status = 'running'
+            """), {"id": job_id, "worker_id": worker_id, "current_page": current_page,
+                   "total_products": total_products, "now": self.clock()}).rowcount
+            if not updated:
+                return True
+            return bool(connection.execute(text("SELECT cancel_requested FROM scrape_jobs WHERE id = :id"),
+                                           {"id": job_id}).scalar())
+
+    def finish(self, job_id, worker_id, status, message, current_page=None, total_products=None):
+        """Записує результат задачі воркера (completed, failed або cancelled)."""
+        with self._engine().begin() as connection:
+            connection.execute(text("""
+                UPDATE scrape_jobs SET status = :status, message = :message, finished_at = :now,
+                    heartbeat_at = :now, current_page = COALESCE(:current_page, current_page),
+                    total_products = COALESCE(:total_products, total_products)
+                WHERE id = :id AND worker_id = :worker_id AND status = 'running'
+            """), {"id": job_id, "worker_id": worker_id, "status": status, "message": message,
+                   "current_page": current_page, "total_products": total_products, "now": self.clock()})
+
+    def release(self, job_id, worker_id):
+        """Повертає задачу в чергу (зупинка воркера); інший воркер продовжить її з фронтиру обходу."""
+        with self._engine().begin() as connection:
+            # Зупинка воркера не є невдалою спробою: лічильник attempts повертається назад
+            connection.execute(text("""
+                UPDATE scrape_jobs SET status = 'queued', worker_id = NULL, message = 'Задачу повернуто в чергу',
+                    attempts = MAX(attempts - 1, 0)
+                WHERE id = :id AND worker_id = :worker_id AND status = 'running'
+            """), {"id": job_id, "worker_id": worker_id})
+
+    def cancel(self, job_id):
+        """Скасовує задачу: з черги — одразу, виконувану — через прапорець, який воркер бачить у heartbeat."""
+        with self._engine().begin() as connection:
+            connection.execute(text("""
+                UPDATE scrape_jobs SET status = 'cancelled', message = 'Скрапінг скасовано', finished_at = :now
+                WHERE id = :id AND status = 'queued'
+            """), {"id": job_id, "now": self.clock()})
+            connection.execute(text("""
+                UPDATE scrape_jobs SET cancel_requested = 1, message = 'Скасування...'
+                WHERE id = :id AND status = 'running'
+            """), {"id": job_id})
+        return self.get(job_id)
+
+    def requeue_stale(self, stale_after=60.0, max_attempts=3):
+        """Повертає в чергу задачі, воркер яких не надсилав heartbeat довше stale_after секунд.
+
+        Задача, що втратила воркера вже на max_attempts спробі (сторінка, на якій процес падає
+        через брак пам'яті чи зависання Chromium), позначається failed замість нового кола.
+        """
+        now = self.clock()
+        params = {"cutoff": now - stale_after, "max_attempts": max_attempts, "now": now}
+        message = f"Воркер не відповідає: спроб {max_attempts}, задачу зупинено"
+        with self._engine().begin() as connection:
+            failed = connection.execute(text("""
+                SELECT id, current_page, total_products FROM scrape_jobs
+                WHERE status = 'running' AND heartbeat_at < :cutoff AND attempts >= :max_attempts
+            """), params).fetchall()
+            connection.execute(text("""
+                UPDATE scrape_jobs SET status = 'failed', worker_id = NULL, message = :message, finished_at = :now
+                WHERE status = 'running' AND heartbeat_at < :cutoff AND attempts >= :max_attempts
+            """), {**params, "message": message})
+            requeued = connection.execute(text("""
+                UPDATE scrape_jobs SET status = 'queued', worker_id = NULL,
+                    message = 'Воркер не відповідає, задачу повернуто в чергу'
+                WHERE status = 'running' AND heartbeat_at < :cutoff
+            """), params).rowcount
+        if requeued:
+            logging.warning(f"Повернуто в чергу задач без heartbeat: {requeued}")
+        if failed:
+            logging.error(f"Задачі без heartbeat після {max_attempts} спроб позначено failed: "
+                          f"{', '.join(row.id for row in failed)}")
+            # Подія завершення закриває потоки прогресу цих задач
+            store = EventStore(self.db_path)
+            for row in failed:
+                store.append(row.id, [{"type": FINISHED_EVENT, "time": time.time(), "status": FAILED,
+                                       "message": message, "current_page": row.current_page,
+                                       "total_products": row.total_products}])
+        return requeued
+
+    def evict(self, ttl=24 * 3600, events_ttl=3600):
+        """Видаляє завершені задачі, старші за ttl секунд, і події задач, старші за events_ttl."""
+        with self._engine().begin() as connection:
+            evicted = connection.execute(text("""
+                DELETE FROM scrape_jobs WHERE status IN ('completed', 'failed', 'cancelled') AND finished_at < :cutoff
+            """), {"cutoff": self.clock() - ttl}).rowcount
+            connection.execute(text("DELETE FROM scrape_events WHERE created_at < :cutoff"),
+                               {"cutoff": self.clock() - events_ttl})
+        if evicted:
+            logging.info(f"Видалено завершених задач: {evicted}")
+        return evicted
@@ -1,21 +1,43 @@
 import asyncio
-import uuid
+import json
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Form, Request
 from fastapi.responses import HTMLResponse, StreamingResponse, RedirectResponse, FileResponse, Response
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from app.database import get_products, clear_db, init_db
-from app.scraper.amazon_scraper import AmazonScraper
-from app.analytics import get_analytics
-import pandas as pd
-import io
+from app.database import get_products, count_products, clear_db, init_db
+from app.exporters import iter_export_chunks, EXPORT_FORMATS
+from app.scraper.fetchers import FETCHERS, NAVIGATION_MODES
+from app.jobs import JobQueue, ACTIVE, RUNNING, parse_queries
+from app.events import EventBus, EventRelay, EventStore, FINISHED
+from app.worker import WorkerPool
+from app.analytics import get_analytics, get_analytics_cache_stats
+from app.price_history import get_price_series, get_largest_drops, get_price_stats, DROP_ORDERS
+from starlette.concurrency import iterate_in_threadpool
 import logging
 import os
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Скрапінг виконують окремі процеси-воркери. SCRAPER_WORKERS=0 вимикає вбудований пул,
+    # якщо воркери запущено окремо (python -m app.worker) або процесів веб-застосунку кілька
+    workers = int(os.environ.get("SCRAPER_WORKERS", 1))
+    pool = WorkerPool(workers) if workers > 0 else None
+    if pool is not None:
+        pool.start()
+    # Події задач надходять від воркерів через журнал scrape_events; один потік на процес
+    # передає їх усім підпискам /scrape/events і /scrape/{task_id}/events
+    relay = EventRelay(event_bus, EventStore())
+    relay.start()
+    yield
+    await asyncio.to_thread(relay.stop)
+    if pool is not None:
+        await asyncio.to_thread(pool.stop)
+
+
+app = FastAPI(lifespan=lifespan)
 templates = Jinja2Templates(directory="app/templates")
-scrape_tasks = {}
-scrape_tasks_lock = asyncio.Lock()
 
 # Налаштування логування
 logging.basicConfig(
@@ -29,6 +51,11 @@ logging.basicConfig(
 
 # Ініціалізація бази даних при запуску програми
 init_db()
+job_queue = JobQueue()
+event_bus = EventBus()
+
+# Інтервал коментаря keep-alive у потоці подій, щоб проксі не закривали неактивне з'єднання
+EVENTS_KEEPALIVE = 15
 
 
 class ScrapeRequest(BaseModel):
@@ -37,79 +64,74 @@ class ScrapeRequest(BaseModel):
     headless: bool = True
 
 
-async def run_scraper(scraper, task_id):
-    try:
-        await asyncio.to_thread(scraper.run, task_id)
-        async with scrape_tasks_lock:
-            scrape_tasks[task_id]["status"] = "completed"
-            scrape_tasks[task_id]["message"] = f"Скрапінг завершено: зібрано {scraper.total_products} продуктів"
-    except Exception as e:
-        logging.error(f"Помилка в run_scraper (task_id={task_id}): {e}")
-        async with scrape_tasks_lock:
-            scrape_tasks[task_id]["status"] = "failed"
-            scrape_tasks[task_id]["message"] = f"Помилка скрапінгу: {str(e)}"
-    finally:
-        async with scrape_tasks_lock:
-            if task_id in scrape_tasks:
-                scraper.cancel()
-                scrape_tasks[task_id]["scraper"] = None
+def list_scrape_tasks():
+    """Задачі скрапінгу з черги у вигляді {ID: задача}."""
+    return {job.pop("id"): job for job in job_queue.list()}
 
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request, min_rating: float = None, max_price: float = None, min_reviews: int = None,
-                message: str = None, page: int = 1, per_page: int = 10):
+                message: str = None, page: int = 1, per_page: int = 10, after: str = None):
+    next_cursor = None
     try:
         # Конвертуємо параметри, якщо вони передані як рядки "None"
         min_rating = float(min_rating) if min_rating is not None and min_rating != "None" else None
         max_price = float(max_price) if max_price is not None and max_price != "None" else None
         min_reviews = int(min_reviews) if min_reviews is not None and min_reviews != "None" else None
+        page = max(page, 1)
+        per_page = min(max(per_page, 1), 100)
 
-        products = get_products(min_rating=min_rating, max_price=max_price, min_reviews=min_reviews)
-        total_products = len(products)
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated_products = products[start:end]
+        filters = {"min_rating": min_rating, "max_price": max_price, "min_reviews": min_reviews}
+        total_products = count_products(**filters)
+        # Посилання "Наступна" передає ASIN останнього рядка (keyset), інакше — LIMIT/OFFSET за номером сторінки
+        if after:
+            paginated_products = get_products(**filters, limit=per_page, after=(after,))
+        else:
+            paginated_products = get_products(**filters, limit=per_page, offset=(page - 1) * per_page)
+        if paginated_products:
+            next_cursor = paginated_products[-1].asin
     except Exception as e:
         logging.error(f"Помилка при отриманні продуктів: {e}")
         paginated_products = []
         total_products = 0
-    async with scrape_tasks_lock:
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "products": paginated_products,
-                "scrape_tasks": scrape_tasks,
-                "min_rating": min_rating,
-                "max_price": max_price,
-                "min_reviews": min_reviews,
-                "message": message or "База даних порожня або ще не створена. Почніть скрапінг.",
-                "current_page": page,
-                "total_pages": (total_products + per_page - 1) // per_page
-            }
-        )
+    return templates.TemplateResponse(
+        "index.html",
+        {
+            "request": request,
+            "products": paginated_products,
+            "scrape_tasks": list_scrape_tasks(),
+            "min_rating": min_rating,
+            "max_price": max_price,
+            "min_reviews": min_reviews,
+            "message": message or "База даних порожня або ще не створена. Почніть скрапінг.",
+            "current_page": page,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "total_pages": (total_products + per_page - 1) // per_page
+        }
+    )
 
 
-@app.post("/scrape", response_class=RedirectResponse)
-async def start_scrape(query: str = Form(...), pages: int = Form(...), headless: bool = Form(True)):
+def validate_scrape_options(pages, engine, concurrency, navigation):
     if pages < 1:
         raise HTTPException(status_code=400, detail="Кількість сторінок має бути більшою за 0")
+    if engine not in FETCHERS:
+        raise HTTPException(status_code=400, detail=f"Невідомий рушій завантаження: {engine}")
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="Кількість паралельних завантажень має бути більшою за 0")
+    if navigation not in NAVIGATION_MODES:
+        raise HTTPException(status_code=400, detail=f"Невідомий режим навігації: {navigation}")
 
-    task_id = str(uuid.uuid4())
-    scraper = AmazonScraper(query=query, pages=pages, headless=headless)
-
-    async with scrape_tasks_lock:
-        scrape_tasks[task_id] = {
-            "query": query,
-            "pages": pages,
-            "status": "running",
-            "current_page": 0,
-            "total_products": 0,
-            "message": "Скрапінг розпочато",
-            "scraper": scraper
-        }
 
-    asyncio.create_task(run_scraper(scraper, task_id))
+@app.post("/scrape", response_class=RedirectResponse)
+async def start_scrape(query: str = Form(...), pages: int = Form(...), headless: bool = Form(True),
+                       engine: str = Form("selenium"), concurrency: int = Form(1),
+                       navigation: str = Form("direct"), priority: int = Form(0)):
+    validate_scrape_options(pages, engine, concurrency, navigation)
+
+    # Задачу виконає вільний воркер; веб-процес лише записує її в чергу
+    task_id = job_queue.submit(query, pages, priority=priority, headless=headless, fetch_engine=engine,
+                               concurrency=concurrency, navigation=navigation)
 
     return RedirectResponse(
         url=f"/?message=Скрапінг розпочато для запиту '{query}' (ID: {task_id})",
@@ -117,31 +139,124 @@ async def start_scrape(query: str = Form(...), pages: int = Form(...), headless:
     )
 
 
+@app.post("/scrape/batch", response_class=RedirectResponse)
+async def start_batch_scrape(queries: str = Form(...), pages: int = Form(...), headless: bool = Form(True),
+                             engine: str = Form("selenium"), concurrency: int = Form(1),
+                             navigation: str = Form("direct")):
+    """Пакет запитів (по одному в рядку, "запит | пріоритет"): окрема задача черги на кожен запит."""
+    validate_scrape_options(pages, engine, concurrency, navigation)
+    try:
+        parsed = parse_queries(queries.splitlines())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="Список запитів порожній")
+
+    batch_id, task_ids = job_queue.submit_batch(parsed, pages, headless=headless, fetch_engine=engine,
+                                                concurrency=concurrency, navigation=navigation)
+    return RedirectResponse(
+        url=f"/?message=Пакет з {len(task_ids)} запитів додано в чергу (ID: {batch_id})",
+        status_code=303
+    )
+
+
 @app.post("/scrape/cancel/{task_id}")
 async def cancel_scrape(task_id: str):
-    async with scrape_tasks_lock:
-        if task_id not in scrape_tasks:
-            raise HTTPException(status_code=404, detail="Задача не знайдена")
-        if scrape_tasks[task_id]["status"] != "running":
-            raise HTTPException(status_code=400, detail="Задача не виконується")
+    job = job_queue.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не знайдена")
+    if job["status"] not in ACTIVE:
+        raise HTTPException(status_code=400, detail="Задача не виконується")
 
-        scraper = scrape_tasks[task_id]["scraper"]
-        scraper.cancel()
-        scrape_tasks[task_id]["status"] = "cancelled"
-        scrape_tasks[task_id]["message"] = "Скрапінг скасовано"
-        scrape_tasks[task_id]["scraper"] = None
-        return {"message": f"Скрапінг (ID: {task_id}) скасовано"}
+    job = job_queue.cancel(task_id)
+    if job["status"] == RUNNING:
+        return {"message": f"Скасування скрапінгу (ID: {task_id}) надіслано воркеру"}
+    return {"message": f"Скрапінг (ID: {task_id}) скасовано"}
 
 
 @app.get("/scrape/all")
 async def get_scrape_tasks():
-    async with scrape_tasks_lock:
-        tasks_for_response = {}
-        for task_id, task in scrape_tasks.items():
-            task_copy = task.copy()
-            task_copy.pop("scraper", None)
-            tasks_for_response[task_id] = task_copy
-        return tasks_for_response
+    return list_scrape_tasks()
+
+
+def sse(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/scrape/events")
+async def scrape_events(request: Request):
+    """Спільний потік прогресу всіх задач (Server-Sent Events) для дашборду.
+
+    Одне з'єднання замість окремого на кожну задачу: браузер відкриває не більше шести
+    з'єднань з хостом (HTTP/1.1), тож потоки для пакета задач заблокували б решту запитів.
+    Спершу надсилається знімок задач, далі події воркерів з ID задачі в полі task_id.
+    """
+    # Підписка до читання знімка: подія, що надійде між ними, не загубиться
+    subscription = event_bus.subscribe()
+    tasks = list_scrape_tasks()
+
+    async def stream_events():
+        try:
+            yield sse("snapshot", tasks)
+            while not await request.is_disconnected():
+                events = await subscription.next_batch(EVENTS_KEEPALIVE)
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in events:
+                    yield sse(event["type"], event)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/scrape/{task_id}")
+async def get_scrape_task(task_id: str):
+    job = job_queue.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не знайдена")
+    return job
+
+
+@app.get("/scrape/{task_id}/events")
+async def scrape_task_events(task_id: str, request: Request):
+    """Потік прогресу задачі (Server-Sent Events): знімок стану, далі події воркера до завершення."""
+    # Підписка до читання знімка: подія, що надійде між ними, не загубиться
+    subscription = event_bus.subscribe(task_id)
+    job = job_queue.get(task_id)
+    if job is None:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="Задача не знайдена")
+
+    async def stream_events():
+        try:
+            yield sse("snapshot", job)
+            if job["status"] not in ACTIVE:
+                yield sse(FINISHED, {"type": FINISHED, "status": job["status"], "message": job["message"],
+                                     "current_page": job["current_page"], "total_products": job["total_products"]})
+                return
+            while not await request.is_disconnected():
+                events = await subscription.next_batch(EVENTS_KEEPALIVE)
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in events:
+                    yield sse(event["type"], event)
+                if any(event["type"] == FINISHED for event in events):
+                    return
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.post("/clear_db")
@@ -155,21 +270,34 @@ async def clear_database():
 
 
 @app.get("/export")
-async def export_csv():
+async def export_products(format: str = "csv", min_rating: float = None, max_price: float = None,
+                          min_reviews: int = None):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Непідтримуваний формат експорту: {format}")
     try:
-        products = get_products()
-        df = pd.DataFrame(products)
-        stream = io.StringIO()
-        df.to_csv(stream, index=False)
-        return StreamingResponse(
-            io.BytesIO(stream.getvalue().encode('utf-8')),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=products.csv"}
-        )
+        chunks = iter_export_chunks(format, min_rating=min_rating, max_price=max_price, min_reviews=min_reviews)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logging.error(f"Помилка експорту CSV: {e}")
+        logging.error(f"Помилка експорту ({format}): {e}")
         raise HTTPException(status_code=500, detail="Помилка експорту даних")
 
+    async def stream_export():
+        # Читання з SQLite виконується в пулі потоків, щоб не блокувати цикл подій
+        try:
+            async for chunk in iterate_in_threadpool(chunks):
+                yield chunk
+        finally:
+            # Повертаємо з'єднання в пул і тоді, коли клієнт перервав завантаження
+            chunks.close()
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=products.{extension}"}
+    )
+
 
 @app.get("/analytics", response_class=HTMLResponse)
 async def analytics(request: Request):
@@ -193,6 +321,28 @@ async def analytics(request: Request):
         })
 
 
+@app.get("/analytics/cache")
+async def analytics_cache_stats():
+    return get_analytics_cache_stats()
+
+
+@app.get("/prices/drops")
+async def price_drops(start: float = None, end: float = None, limit: int = 10, order: str = "amount"):
+    if order not in DROP_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Недопустимий порядок знижень: {order}")
+    return [drop._asdict() for drop in get_largest_drops(start, end, min(max(limit, 1), 100), order)]
+
+
+@app.get("/prices/{asin}")
+async def price_history(asin: str, start: float = None, end: float = None):
+    stats = get_price_stats([asin], start, end).get(asin)
+    return {
+        "asin": asin,
+        "series": [point._asdict() for point in get_price_series(asin, start, end)],
+        "stats": stats._asdict() if stats is not None else None
+    }
+
+
 @app.get("/favicon.ico")
 async def favicon():
     favicon_path = "app/static/favicon.ico"
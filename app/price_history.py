@@ -0,0 +1,86 @@
+import logging
+from collections import namedtuple
+from sqlalchemy import text
+from app.database import init_db, get_engine
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+# Інтервал незмінних значень: з ts до last_ts зроблено observations спостережень
+PricePoint = namedtuple("PricePoint", ["ts", "last_ts", "price", "original_price", "rating", "reviews",
+                                       "observations"])
+PriceDrop = namedtuple("PriceDrop", ["asin", "title", "ts", "prev_price", "price", "drop", "drop_pct"])
+PriceStats = namedtuple("PriceStats", ["min_price", "max_price", "avg_price", "observations", "first_ts", "last_ts"])
+
+DROP_ORDERS = {"amount": "price_drop", "percent": "price_drop / prev_price"}
+
+# Межа None — без обмеження; COALESCE лишає межу константою, тож SQLite звужує діапазон індексу
+_START_SQL = "COALESCE(:start, -1e300)"
+_END_SQL = "COALESCE(:end, 1e300)"
+# Інтервали, що перетинають [start, end]: ts <= end звужує первинний ключ (asin, ts),
+# last_ts >= start відсікає інтервали, що закінчились раніше
+_RANGE_SQL = f"ts <= {_END_SQL} AND last_ts >= {_START_SQL}"
+
+
+def get_price_series(asin, start=None, end=None, db_path="amazon.db"):
+    """Історія ASIN як список PricePoint у порядку часу (інтервали, що перетинають [start, end])."""
+    db_path = init_db(db_path)
+    with get_engine(db_path).connect() as connection:
+        rows = connection.execute(text(f"""
+            SELECT ts, last_ts, price, original_price, rating, reviews, observations
+            FROM price_observations WHERE asin = :asin AND {_RANGE_SQL}
+            ORDER BY ts
+        """), {"asin": asin, "start": start, "end": end}).fetchall()
+    return [PricePoint(*row) for row in rows]
+
+
+def get_largest_drops(start=None, end=None, limit=10, order="amount", db_path="amazon.db"):
+    """Найбільші зниження ціни, що відбулися в [start, end], за сумою або відсотком (order)."""
+    if order not in DROP_ORDERS:
+        raise ValueError(f"Недопустимий порядок знижень: {order}")
+    db_path = init_db(db_path)
+    # Діапазон за ts читається з часткового індексу знижень; назви підтягуються лише для limit рядків
+    with get_engine(db_path).connect() as connection:
+        rows = connection.execute(text(f"""
+            SELECT d.asin, p.title, d.ts, d.prev_price, d.price, d.price_drop, d.price_drop / d.prev_price
+            FROM (
+                SELECT asin, ts, prev_price, price, price_drop FROM price_observations
+                WHERE price_drop IS NOT NULL AND ts >= {_START_SQL} AND ts <= {_END_SQL}
+                ORDER BY {DROP_ORDERS[order]} DESC, ts DESC
+                LIMIT :limit
+            ) AS d
+            LEFT JOIN products p ON p.asin = d.asin
+            ORDER BY {DROP_ORDERS[order]} DESC, d.ts DESC
+        """), {"start": start, "end": end, "limit": limit}).fetchall()
+    return [PriceDrop(*row) for row in rows]
+
+
+def get_price_stats(asins, start=None, end=None, db_path="amazon.db"):
+    """Мінімальна, максимальна і середня ціна кожного ASIN з asins за [start, end]: {ASIN: PriceStats}.
+
+    Середнє зважене за кількістю спостережень; інтервали, що перетинають межі діапазону,
+    враховуються повністю, а нульова ціна (невідома) — ні.
+    """
+    if not asins:
+        return {}
+    db_path = init_db(db_path)
+    stats = {}
+    with get_engine(db_path).connect() as connection:
+        # Окремий запит на ASIN: кожен читає лише свій діапазон первинного ключа
+        query = text(f"""
+            SELECT MIN(price), MAX(price), SUM(price * observations) / SUM(observations), SUM(observations),
+                MIN(ts), MAX(last_ts)
+            FROM price_observations WHERE asin = :asin AND price > 0 AND {_RANGE_SQL}
+        """)
+        for asin in asins:
+            row = connection.execute(query, {"asin": asin, "start": start, "end": end}).first()
+            if row[3]:
+                stats[asin] = PriceStats(*row)
+    return stats
@@ -0,0 +1,287 @@
+import os
+import re
+import lxml.html
+import soupsieve
+from bs4 import BeautifulSoup
+from cssselect import HTMLTranslator
+from lxml import etree
+
+_translator = HTMLTranslator()
+
+
+class Selector:
+    """CSS-селектор, скомпільований один раз для обох бекендів парсингу.
+
+    Для BeautifulSoup — soupsieve, для lxml — XPath, отриманий через cssselect.
+    Як і soupsieve, шукає лише серед нащадків вузла і повертає збіги в порядку документа.
+    """
+
+    def __init__(self, css):
+        self.css = css
+        self.soup = soupsieve.compile(css)
+        # cssselect не знає soupsieve-розширення :-soup-contains, але має еквівалентний :contains
+        xpath = _translator.css_to_xpath(css.replace(":-soup-contains(", ":contains("), prefix="descendant::")
+        self.xpath = etree.XPath(xpath)
+
+    def __repr__(self):
+        return f"Selector({self.css!r})"
+
+    def select_one(self, node):
+        if isinstance(node, LxmlNode):
+            matches = self.xpath(node.element)
+            return LxmlNode(matches[0]) if matches else None
+        return self.soup.select_one(node)
+
+    def select(self, node):
+        if isinstance(node, LxmlNode):
+            return [LxmlNode(element) for element in self.xpath(node.element)]
+        return self.soup.select(node)
+
+
+class LxmlNode:
+    """Обгортка над елементом lxml з тим підмножинним API Tag, яким користуються екстрактори."""
+
+    __slots__ = ("element",)
+
+    def __init__(self, element):
+        self.element = element
+
+    def __eq__(self, other):
+        return isinstance(other, LxmlNode) and other.element is self.element
+
+    def __hash__(self):
+        return hash(self.element)
+
+    @property
+    def text(self):
+        return self.element.text_content()
+
+    @property
+    def attrs(self):
+        attrs = dict(self.element.attrib)
+        if "class" in attrs:
+            # Як у BeautifulSoup: class — багатозначний атрибут
+            attrs["class"] = attrs["class"].split()
+        return attrs
+
+    def get(self, name, default=None):
+        value = self.element.get(name)
+        if value is None:
+            return default
+        return value.split() if name == "class" else value
+
+    def __getitem__(self, name):
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def select_one(self, selector):
+        return _as_selector(selector).select_one(self)
+
+    def select(self, selector):
+        return _as_selector(selector).select(self)
+
+    def prettify(self):
+        return etree.tostring(self.element, encoding="unicode", pretty_print=True, method="html")
+
+
+def _as_selector(selector):
+    return selector if isinstance(selector, Selector) else Selector(selector)
+
+
+# Складений селектор — послідовність символів поза пробілами і комами, атрибути в [...] можуть містити пробіли
+_COMPOUND = re.compile(r"(?:[^\s,\[]|\[[^\]]*\])+")
+_COMPOUND_TOKEN = re.compile(r"""([a-z0-9]+)|#([\w-]+)|\.([\w-]+)|\[([\w-]+)(?:(\*?=)'([^']*)')?\]""")
+
+
+def _compile_compound(css):
+    """Розбирає складений селектор (tag#id.class[attr='v']) у кортеж (tag, id, classes, attrs)."""
+    tag, element_id, classes, attrs = None, None, set(), []
+    position = 0
+    while position < len(css):
+        match = _COMPOUND_TOKEN.match(css, position)
+        if not match:
+            raise ValueError(f"Непідтримуваний синтаксис у селекторі схеми: {css!r}")
+        name, id_value, class_name, attr, op, value = match.groups()
+        if name:
+            tag = name
+        elif id_value:
+            element_id = id_value
+        elif class_name:
+            classes.add(class_name)
+        else:
+            attrs.append((attr, op, value))
+        position = match.end()
+    return tag, element_id, frozenset(classes), tuple(attrs)
+
+
+def _xpath_literal(value):
+    return f"'{value}'" if "'" not in value else f'"{value}"'
+
+
+def _compound_xpath(compound):
+    """Умова XPath на сам елемент для складеного селектора."""
+    tag, element_id, classes, attrs = compound
+    conditions = [f"self::{tag}"] if tag else []
+    if element_id:
+        conditions.append(f"@id={_xpath_literal(element_id)}")
+    for class_name in sorted(classes):
+        conditions.append(f"contains(concat(' ', normalize-space(@class), ' '), {_xpath_literal(' ' + class_name + ' ')})")
+    for attr, op, value in attrs:
+        if op is None:
+            conditions.append(f"@{attr}")
+        elif op == "=":
+            conditions.append(f"@{attr}={_xpath_literal(value)}")
+        else:
+            conditions.append(f"contains(@{attr}, {_xpath_literal(value)})")
+    return "(" + " and ".join(conditions or ["true()"]) + ")"
+
+
+def _compound_predicate(compound, lxml_element):
+    """Компілює складений селектор у функцію-перевірку елемента lxml або тегу BeautifulSoup."""
+    tag, element_id, classes, attrs = compound
+
+    def matches(element):
+        if tag and (element.tag if lxml_element else element.name) != tag:
+            return False
+        if element_id and element.get("id") != element_id:
+            return False
+        if classes:
+            element_classes = element.get("class")
+            if not element_classes:
+                return False
+            if not classes.issubset(element_classes.split() if lxml_element else element_classes):
+                return False
+        for attr, op, value in attrs:
+            actual = element.get(attr)
+            if actual is None or (op == "=" and actual != value) or (op == "*=" and value not in actual):
+                return False
+        return True
+
+    return matches
+
+
+class SelectorSchema:
+    """Набір іменованих селекторів, які шукаються за один обхід піддерева.
+
+    Один запит бекенду (XPath з диз'юнкцією умов для lxml, soupsieve для BeautifulSoup) знаходить
+    елементи-кандидати, а вони розподіляються між іменами скомпільованими перевірками. Для кожного
+    імені повертається перший у порядку документа відповідний елемент — так само, як Selector.select_one.
+    Підтримуються лише складені селектори з комбінатором нащадка; предки шукаються в межах піддерева,
+    як у lxml-бекенді.
+    """
+
+    def __init__(self, selectors):
+        self.names = tuple(selectors)
+        self._rules = {True: {}, False: {}}
+        last_parts = {}
+        for name, selector in selectors.items():
+            css = selector.css if isinstance(selector, Selector) else selector
+            for alternative in re.split(r",(?![^\[]*\])", css):
+                parts = _COMPOUND.findall(alternative)
+                chain = tuple(_compile_compound(part) for part in parts)
+                last_parts[parts[-1]] = chain[-1]
+                key = self._rule_key(chain[-1])
+                for lxml_element, rules in self._rules.items():
+                    predicates = tuple(_compound_predicate(compound, lxml_element) for compound in chain)
+                    rules.setdefault(key, []).append((name, predicates[-1], predicates[:-1]))
+        self._soup_candidates = soupsieve.compile(", ".join(last_parts))
+        self._xpath_candidates = etree.XPath(
+            "descendant::*[" + " or ".join(_compound_xpath(compound) for compound in last_parts.values()) + "]")
+
+    @staticmethod
+    def _rule_key(compound):
+        # Правило індексується за найвибірковішою частиною останнього складеного селектора
+        tag, element_id, classes, attrs = compound
+        if element_id:
+            return "#" + element_id
+        if classes:
+            return "." + min(classes)
+        if attrs:
+            return "[" + attrs[0][0]
+        return tag or "*"
+
+    @staticmethod
+    def _element_keys(element, lxml_element):
+        if lxml_element:
+            keys = {element.tag, "*"}
+            keys.update("[" + attr for attr in element.keys())
+            classes = (element.get("class") or "").split()
+        else:
+            keys = {element.name, "*"}
+            keys.update("[" + attr for attr in element.attrs)
+            classes = element.get("class") or ()
+        keys.update("." + class_name for class_name in classes)
+        element_id = element.get("id")
+        if element_id:
+            keys.add("#" + element_id)
+        return keys
+
+    def extract(self, node):
+        """Повертає словник ім'я -> перший відповідний елемент (або None)."""
+        lxml_element = isinstance(node, LxmlNode)
+        if lxml_element:
+            root = node.element
+            candidates = self._xpath_candidates(root)
+        else:
+            root = node
+            candidates = self._soup_candidates.select(root)
+        rules = self._rules[lxml_element]
+        found = dict.fromkeys(self.names)
+        for element in candidates:
+            ancestors = None
+            for key in self._element_keys(element, lxml_element):
+                for name, matches, prefix in rules.get(key, ()):
+                    if found[name] is not None or not matches(element):
+                        continue
+                    if prefix:
+                        if ancestors is None:
+                            ancestors = self._ancestors(element, root, lxml_element)
+                        # Жадібне зіставлення справа наліво коректне для комбінатора нащадка
+                        index = len(prefix) - 1
+                        for ancestor in ancestors:
+                            if prefix[index](ancestor):
+                                index -= 1
+                                if index < 0:
+                                    break
+                        if index >= 0:
+                            continue
+                    found[name] = LxmlNode(element) if lxml_element else element
+        return found
+
+    @staticmethod
+    def _ancestors(element, root, lxml_element):
+        ancestors = []
+        for ancestor in (element.iterancestors() if lxml_element else element.parents):
+            if ancestor is root:
+                break
+            ancestors.append(ancestor)
+        return ancestors
+
+
+def _parse_bs4(html):
+    return BeautifulSoup(html, "html.parser")
+
+
+def _parse_lxml(html):
+    if not html or not html.strip():
+        html = "<html></html>"
+    return LxmlNode(lxml.html.document_fromstring(html))
+
+
+# html.parser з BeautifulSoup — еталонна реалізація, lxml — швидкий шлях
+BACKENDS = {
+    "bs4": _parse_bs4,
+    "lxml": _parse_lxml,
+}
+
+DEFAULT_BACKEND = os.environ.get("SCRAPER_PARSER_BACKEND", "lxml")
+
+
+def parse_document(html, backend=None):
+    """Будує дерево документа вибраним бекендом (за замовчуванням — SCRAPER_PARSER_BACKEND або lxml)."""
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Невідомий бекенд парсингу: {backend}")
+    return BACKENDS[backend](html)
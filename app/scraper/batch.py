@@ -0,0 +1,80 @@
+import logging
+from contextlib import ExitStack
+from app.jobs import parse_queries
+from app.scraper.amazon_scraper import AmazonScraper
+from app.scraper.fetchers import Fetcher
+from app.scraper.parsing_engine import get_default_engine
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+
+def read_queries_file(path):
+    """Запити пакета з файлу (формат — parse_queries)."""
+    with open(path, encoding="utf-8") as f:
+        return parse_queries(f)
+
+
+class BatchScraper:
+    """Скрапінг пакета пов'язаних запитів в одному процесі.
+
+    Запити виконуються від найвищого пріоритету з одним рушієм завантаження (браузер або
+    пул з'єднань відкривається один раз), одним рушієм парсингу і спільним для процесу
+    планувальником запитів. Товар, зібраний для одного запиту, для наступних запитів
+    оновлюється з картки пошуку без повторного завантаження його сторінки.
+    """
+
+    def __init__(self, queries, pages=1, db_path="amazon.db", fetch_engine="selenium", parse_engine=None,
+                 **scraper_options):
+        self.queries = queries
+        self.pages = pages
+        self.db_path = db_path
+        self.parse_engine = parse_engine or get_default_engine()
+        self.scraper_options = scraper_options
+        # Рушій завантаження створює перший скрапер пакета, наступні отримують його ж
+        self.fetcher = fetch_engine if isinstance(fetch_engine, Fetcher) else None
+        self.fetch_engine = fetch_engine
+        self.seen_asins = set()
+        self.cancelled = False
+        self.scraper = None
+        self.results = {}
+
+    def cancel(self):
+        self.cancelled = True
+        if self.scraper is not None:
+            self.scraper.cancel()
+
+    def _create_scraper(self, query):
+        scraper = AmazonScraper(query, self.pages, self.db_path, parse_engine=self.parse_engine,
+                                fetch_engine=self.fetcher or self.fetch_engine, seen_asins=self.seen_asins,
+                                **self.scraper_options)
+        self.fetcher = scraper.fetcher
+        return scraper
+
+    def run(self, max_retries=2):
+        """Виконує всі запити; повертає {запит: кількість продуктів або текст помилки}."""
+        with ExitStack() as stack:
+            for number, (query, priority) in enumerate(self.queries, 1):
+                if self.cancelled:
+                    break
+                logging.info(f"Пакет: запит {number}/{len(self.queries)} '{query}' (пріоритет {priority})")
+                self.scraper = self._create_scraper(query)
+                if number == 1:
+                    stack.enter_context(self.fetcher)
+                try:
+                    self.scraper.run(max_retries=max_retries)
+                    self.results[query] = self.scraper.total_products
+                except Exception as e:
+                    # Помилка одного запиту не зупиняє пакет
+                    logging.error(f"Пакет: помилка запиту '{query}': {e}")
+                    self.results[query] = str(e)
+        logging.info(f"Пакет завершено: {len(self.results)} запитів, завантажено сторінок товарів: "
+                     f"{len(self.seen_asins)}")
+        return self.results
@@ -0,0 +1,317 @@
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from app.scraper.resources import ResourcePolicy
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    Object.defineProperty(navigator, 'platform', { get: () => 'Win32' });
+    Object.defineProperty(window, 'chrome', { get: () => { runtime: {} } });
+    Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3] });
+    Object.defineProperty(navigator, 'languages', { get: () => ['en-US', 'en'] });
+    Object.defineProperty(navigator, 'hardwareConcurrency', { get: () => 4 });
+    Object.defineProperty(navigator, 'deviceMemory', { get: () => 8 });
+"""
+
+
+def launch_driver(headless=True, user_agent=None, resource_policy=None):
+    """Запускає Chromium з окремим тимчасовим профілем; повертає (driver, директорія профілю)."""
+    options = Options()
+    if user_agent:
+        options.add_argument(f"user-agent={user_agent}")
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-features=UserAgentClientHint,TranslateUI")
+    if resource_policy is not None and resource_policy.enabled:
+        for argument in resource_policy.launch_arguments():
+            options.add_argument(argument)
+        # Очікування в скрапері чекають на елементи DOM, тож подія load (усі ресурси) не потрібна
+        options.page_load_strategy = "eager"
+    # Performance-лог потрібен для звіту про трафік кожної сторінки
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    options.add_argument("--enable-javascript")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-devtools")
+    options.add_argument("--no-zygote")
+    options.add_argument("--disable-notifications")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--incognito")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-background-networking")
+    options.binary_location = "/usr/bin/chromium"
+    profile_dir = tempfile.mkdtemp()
+    logging.debug(f"Створено тимчасову директорію: {profile_dir}")
+    options.add_argument(f"--user-data-dir={profile_dir}")
+    service = Service("/usr/bin/chromedriver")  # Use system-installed chromedriver
+
+    try:
+        driver = webdriver.Chrome(service=service, options=options)
+    except Exception as e:
+        logging.error(f"Помилка створення WebDriver: {e}")
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        raise
+    try:
+        driver.delete_all_cookies()
+        # navigator.userAgent не підміняється скриптом: його задає Network.setUserAgentOverride на кожну оренду
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": STEALTH_SCRIPT})
+        if resource_policy is not None:
+            resource_policy.apply(driver)
+    except Exception:
+        quit_driver(driver, profile_dir)
+        raise
+    return driver, profile_dir
+
+
+def quit_driver(driver, profile_dir):
+    try:
+        driver.quit()
+        logging.info("WebDriver закрито")
+    except Exception as e:
+        logging.error(f"Помилка закриття WebDriver: {e}")
+    shutil.rmtree(profile_dir, ignore_errors=True)
+    logging.debug(f"Тимчасова директорія видалена: {profile_dir}")
+
+
+def _process_tree_rss(pid):
+    """Сумарний RSS процесу і всіх його нащадків у МБ (лише Linux, інакше None)."""
+    if not os.path.isdir("/proc"):
+        return None
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Ім'я процесу в дужках може містити пробіли, тож поля рахуються після ')'
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total_kb, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, ()))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+class PooledDriver:
+    """Екземпляр Chromium у пулі з лічильником оренд."""
+
+    def __init__(self, driver, profile_dir):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.leases = 0
+        self.created_at = time.monotonic()
+
+    def memory_mb(self):
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        return _process_tree_rss(process.pid) if process is not None else None
+
+    def is_healthy(self):
+        try:
+            self.driver.execute_script("return 1")
+            return len(self.driver.window_handles) > 0
+        except Exception as e:
+            logging.warning(f"WebDriver не відповідає: {e}")
+            return False
+
+    def reset(self):
+        """Прибирає стан попередньої оренди: зайві вкладки, cookies, сховища, кеш."""
+        driver = self.driver
+        handles = driver.window_handles
+        origins = set()
+        for index, handle in enumerate(handles):
+            driver.switch_to.window(handle)
+            parts = urlsplit(driver.current_url)
+            if parts.scheme in ("http", "https"):
+                origins.add(f"{parts.scheme}://{parts.netloc}")
+            if index > 0:
+                driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        for origin in origins:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+    def quit(self):
+        quit_driver(self.driver, self.profile_dir)
+
+
+class DriverPool:
+    """Пул «теплих» екземплярів Chromium, спільний для задач скрапінгу.
+
+    Не більше size браузерів існує одночасно: задача чекає на вільний, а не запускає ще один.
+    Між орендами стан браузера скидається; екземпляр, що не пройшов перевірку стану,
+    перевищив max_leases оренд або max_memory_mb пам'яті, закривається і замінюється новим.
+    resource_policy (ResourcePolicy) задає, які ресурси браузер не завантажує.
+    """
+
+    def __init__(self, size=2, headless=True, max_leases=20, max_memory_mb=1500, resource_policy=None,
+                 launcher=None):
+        if size < 1:
+            raise ValueError("Розмір пулу має бути не менше 1")
+        self.size = size
+        self.headless = headless
+        self.max_leases = max_leases
+        self.max_memory_mb = max_memory_mb
+        self.resource_policy = resource_policy
+        self._launch = launcher or (lambda: PooledDriver(*launch_driver(headless, resource_policy=resource_policy)))
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def warm(self, count=None):
+        """Заздалегідь запускає браузери, щоб перша задача не чекала на старт Chromium."""
+        launched = 0
+        for _ in range(self.size if count is None else count):
+            if not self._slots.acquire(blocking=False):
+                break
+            try:
+                with self._lock:
+                    # Разом з орендованими браузерів не може бути більше за size
+                    if self._closed or self._in_use + len(self._idle) >= self.size:
+                        break
+                    self._in_use += 1
+                try:
+                    pooled = self._launch()
+                except Exception as e:
+                    logging.error(f"Не вдалося запустити браузер для пулу: {e}")
+                    with self._lock:
+                        self._in_use -= 1
+                    break
+                with self._lock:
+                    self._in_use -= 1
+                    self._idle.append(pooled)
+                launched += 1
+            finally:
+                self._slots.release()
+        logging.info(f"Пул браузерів прогріто: {launched} екземплярів")
+
+    @contextmanager
+    def lease(self, user_agent=None, timeout=None):
+        """Видає WebDriver на час блоку with і повертає його в пул після скидання стану."""
+        if not self._slots.acquire(timeout=timeout if timeout is not None else -1):
+            raise TimeoutError(f"Немає вільного браузера в пулі за {timeout} с")
+        pooled = None
+        with self._lock:
+            self._in_use += 1
+        try:
+            pooled = self._checkout()
+            pooled.leases += 1
+            if user_agent:
+                pooled.driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": user_agent})
+            width = random.randint(1600, 1920)
+            height = random.randint(900, 1080)
+            pooled.driver.set_window_size(width, height)
+            logging.debug(f"Встановлено розмір вікна: {width}x{height}")
+            yield pooled.driver
+        finally:
+            try:
+                if pooled is not None:
+                    self._checkin(pooled)
+            finally:
+                with self._lock:
+                    self._in_use -= 1
+                self._slots.release()
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Пул браузерів закрито")
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                logging.info("Запуск нового браузера для пулу")
+                return self._launch()
+            if pooled.is_healthy():
+                return pooled
+            pooled.quit()
+
+    def _checkin(self, pooled):
+        reason = None
+        if pooled.leases >= self.max_leases:
+            reason = f"досягнуто {pooled.leases} оренд"
+        else:
+            memory = pooled.memory_mb()
+            if memory is not None and memory > self.max_memory_mb:
+                reason = f"використовує {memory:.0f} МБ"
+        if reason is None:
+            try:
+                pooled.reset()
+            except Exception as e:
+                reason = f"не вдалося скинути стан: {e}"
+        with self._lock:
+            if reason is None and not self._closed:
+                self._idle.append(pooled)
+                return
+        logging.info(f"Браузер вилучено з пулу: {reason or 'пул закрито'}")
+        pooled.quit()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            pooled.quit()
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), "in_use": self._in_use}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_driver_pool(headless=True):
+    """Спільний для процесу пул браузерів.
+
+    Розмір задається змінною SCRAPER_DRIVER_POOL_SIZE, політика ресурсів — ResourcePolicy.from_env().
+    """
+    with _pools_lock:
+        if headless not in _pools:
+            _pools[headless] = DriverPool(int(os.environ.get("SCRAPER_DRIVER_POOL_SIZE", 2)), headless,
+                                          resource_policy=ResourcePolicy.from_env())
+        return _pools[headless]
+
+
+def close_driver_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
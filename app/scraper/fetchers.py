@@ -0,0 +1,759 @@
+import logging
+import random
+import re
+import threading
+from contextlib import ExitStack
+from urllib.parse import quote_plus
+import requests
+from requests.adapters import HTTPAdapter
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.webdriver.common.action_chains import ActionChains
+from urllib3.util import make_headers
+from app.scraper.driver_pool import get_driver_pool
+from app.scraper.page_cache import OK, ERROR, CAPTCHA, get_page_cache
+from app.scraper.resources import log_page_stats
+from app.scraper.scheduler import get_default_scheduler
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+AMAZON_URL = "https://www.amazon.com"
+CAPTCHA_KEYWORDS = ["captcha", "meow", "verify your identity"]
+SEARCH_RESULTS_LOCATOR = "div.s-main-slot div[data-component-type='s-search-result'], div.s-result-item"
+BUYING_OPTIONS_BUTTON = "a#buybox-see-all-buying-choices"
+# Навігація Selenium до сторінок результатів: за прямим URL пошуку або через поле пошуку і кнопку "Наступна"
+NAVIGATION_MODES = ("direct", "click")
+
+
+class FetchError(Exception):
+    """Сторінку не вдалося завантажити."""
+
+
+class CaptchaError(FetchError):
+    """Замість сторінки Amazon повернув CAPTCHA."""
+
+
+class NoMorePagesError(FetchError):
+    """Наступної сторінки результатів немає."""
+
+
+def is_captcha_html(html):
+    html = html.lower()
+    return any(keyword in html for keyword in CAPTCHA_KEYWORDS)
+
+
+def search_url(query, page=1, base_url=AMAZON_URL):
+    """URL сторінки результатів пошуку."""
+    url = f"{base_url.rstrip('/')}/s?k={quote_plus(query)}"
+    return url if page <= 1 else f"{url}&page={page}"
+
+
+def offers_url(asin, base_url=AMAZON_URL):
+    """URL списку пропозицій продавців товару."""
+    return f"{base_url.rstrip('/')}/gp/offer-listing/{asin}"
+
+
+def asin_from_url(url):
+    match = re.search(r"/(?:dp|gp/product)/([A-Z0-9]{10})", url)
+    return match.group(1) if match else None
+
+
+class Fetcher:
+    """Рушій завантаження сторінок Amazon.
+
+    Використовується як контекстний менеджер: open() готує ресурси (браузер або пул з'єднань),
+    close() звільняє їх. fetch_search_page() і fetch_product_page() повертають сирий HTML,
+    парсинг лишається за скрапером. Якщо задано page_cache, завантажені сторінки (і сторінки
+    з помилками для діагностики) зберігаються в PageCache за канонічним URL amazon.com.
+    """
+
+    name = None
+    # Чи можна викликати fetch_product_page з кількох потоків одночасно
+    concurrent = False
+    # Сторінки беруться не з мережі, а з кешу (режим відтворення)
+    offline = False
+    # Будь-яку сторінку результатів можна завантажити незалежно від інших за прямим URL пошуку
+    direct_search = True
+    # Діапазони пауз за видами, секунди; RateScheduler масштабує їх з урахуванням стану хоста
+    delays = {"page": (0, 0), "retry": (0, 0), "restart": (15, 20)}
+
+    def __init__(self, base_url=AMAZON_URL, user_agents=None, is_cancelled=None, scheduler=None, delays=None,
+                 page_cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.user_agents = user_agents
+        self.is_cancelled = is_cancelled or (lambda: False)
+        # Скасування будить паузу одразу, а не після її завершення
+        self.cancel_event = threading.Event()
+        self.scheduler = scheduler or get_default_scheduler()
+        self.delays = {**self.delays, **(delays or {})}
+        self.page_cache = page_cache
+        # on_event(тип, **дані) — подія для EventBus задачі (наприклад, очікування CAPTCHA)
+        self.on_event = lambda event_type, **data: None
+        self._depth = 0
+
+    def __enter__(self):
+        # Вкладені with не відкривають ресурси заново: пакет запитів ділить один браузер або сесію
+        if self._depth == 0:
+            self.open()
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth == 0:
+            self.close()
+        return False
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def start_query(self, query):
+        """Викликається перед скрапінгом запиту query: рушій, спільний для пакета запитів,
+        не переносить на нього стан навігації попереднього."""
+
+    def check_cancelled(self):
+        if self.is_cancelled():
+            raise Exception("Скрапінг скасовано")
+
+    def user_agent(self):
+        return self.user_agents.random if self.user_agents is not None else None
+
+    def resolve(self, url):
+        """Переносить канонічний URL amazon.com на base_url (дзеркало, фікстурний сервер)."""
+        if url.startswith(AMAZON_URL) and self.base_url != AMAZON_URL:
+            return self.base_url + url[len(AMAZON_URL):]
+        return url
+
+    def wait(self, seconds):
+        if seconds > 0:
+            self.cancel_event.wait(seconds)
+        self.check_cancelled()
+
+    def pause(self, kind="page"):
+        """Пауза виду kind з профілю delays."""
+        self.wait(self.scheduler.delay(self.base_url, self.delays.get(kind, (0, 0))))
+
+    def throttle(self, url=None):
+        """Чекає, доки планувальник дозволить наступний запит до хоста."""
+        self.wait(self.scheduler.reserve(self.resolve(url) if url else self.base_url))
+
+    def record_success(self, url=None):
+        self.scheduler.record_success(self.resolve(url) if url else self.base_url)
+
+    def record_failure(self, url=None, status=None):
+        self.scheduler.record_failure(self.resolve(url) if url else self.base_url, status)
+
+    def cache_page(self, url, html, kind, status=OK):
+        """Зберігає HTML у кеш сторінок, якщо він є; помилка кешу не перериває скрапінг."""
+        if self.page_cache is None:
+            return
+        try:
+            self.page_cache.put(url, html, kind, status)
+        except Exception as e:
+            logging.error(f"Помилка збереження сторінки {url} у кеш: {e}")
+
+    def fetch_search_page(self, query, page):
+        """HTML сторінки результатів; NoMorePagesError, якщо сторінки page немає."""
+        raise NotImplementedError
+
+    def fetch_product_page(self, url, wants_buying_options=None):
+        """Повертає (HTML сторінки товару, HTML пропозицій продавців або None).
+
+        wants_buying_options(html) викликається, лише якщо на сторінці є список пропозицій,
+        і вирішує, чи завантажувати його.
+        """
+        raise NotImplementedError
+
+
+class PageSnapshot:
+    """HTML поточної сторінки браузера, серіалізований не більше одного разу на стан сторінки.
+
+    Кожне читання driver.page_source — повна серіалізація DOM через протокол WebDriver
+    (сотні мілісекунд на сторінках товару в кілька МБ). Знімок зчитує HTML при першому
+    зверненні і кешує його та його нижній регістр для перевірки CAPTCHA. invalidate()
+    викликається перед кожною дією, що змінює сторінку: переходом, кліком, оновленням,
+    скролом або перемиканням вкладки.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.serializations = 0
+        self._html = None
+        self._lower = None
+
+    def invalidate(self):
+        self._html = None
+        self._lower = None
+
+    @property
+    def html(self):
+        if self._html is None:
+            self._html = self.driver.page_source
+            self.serializations += 1
+        return self._html
+
+    @property
+    def lower(self):
+        if self._lower is None:
+            self._lower = self.html.lower()
+        return self._lower
+
+    @property
+    def is_captcha(self):
+        return any(keyword in self.lower for keyword in CAPTCHA_KEYWORDS)
+
+
+class SeleniumFetcher(Fetcher):
+    """Завантаження через Chromium з імітацією людської поведінки."""
+
+    name = "selenium"
+    delays = {**Fetcher.delays, "page": (10, 15), "retry": (10, 15), "scroll": (3, 6), "read": (5, 10),
+              "mouse": (0.5, 1), "click": (5, 10), "typing": (0.3, 0.7), "product": (5, 10), "captcha": (5, 10)}
+
+    def __init__(self, base_url=AMAZON_URL, user_agents=None, is_cancelled=None, headless=True, driver_pool=None,
+                 navigation="direct", **kwargs):
+        super().__init__(base_url, user_agents, is_cancelled, **kwargs)
+        if navigation not in NAVIGATION_MODES:
+            raise ValueError(f"Невідомий режим навігації: {navigation}")
+        self.headless = headless
+        # Заданий режим навігації; navigation — поточний, до кінця запиту може стати "click"
+        self.navigation_mode = navigation
+        self.navigation = navigation
+        self.driver_pool = driver_pool
+        self.resource_policy = None
+        self.driver = None
+        self.snapshot = None
+        self._stack = None
+        # (запит, сторінка), відкриті в браузері; кнопка 'Наступна' веде лише до сторінок того самого запиту
+        self._position = None
+
+    def open(self):
+        # Браузер орендується зі спільного пулу замість запуску нового Chromium на кожну задачу
+        pool = self.driver_pool or get_driver_pool(self.headless)
+        self.resource_policy = pool.resource_policy
+        self._stack = ExitStack()
+        self.driver = self._stack.enter_context(pool.lease(self.user_agent()))
+        self.snapshot = PageSnapshot(self.driver)
+        self._position = None
+
+    @property
+    def direct_search(self):
+        return self.navigation == "direct"
+
+    def start_query(self, query):
+        self.navigation = self.navigation_mode
+
+    def close(self):
+        if self._stack is not None:
+            self._stack.close()
+        self._stack = None
+        self.driver = None
+        self.snapshot = None
+
+    def is_captcha_present(self):
+        return self.snapshot.is_captcha
+
+    def human_scroll(self):
+        self.check_cancelled()
+        logging.debug("Імітація людського скролу")
+        # Скрол довантажує лінивий вміст, тож попередній знімок сторінки застаріває
+        self.snapshot.invalidate()
+        driver = self.driver
+        actions = ActionChains(driver)
+        scroll_points = [0, 0.2, 0.4, 0.6, 0.8, 1.0]
+        for i in range(len(scroll_points) - 1):
+            self.check_cancelled()
+            start = scroll_points[i]
+            end = scroll_points[i + 1]
+            driver.execute_script(f"window.scrollTo(0, document.body.scrollHeight * {start});")
+            self.pause("scroll")
+            actions.scroll_by_amount(0, random.randint(100, 300)).pause(random.uniform(0.5, 1.5)).perform()
+            driver.execute_script(f"window.scrollTo(0, document.body.scrollHeight * {end});")
+            self.pause("read")
+
+    def human_mouse_movement(self):
+        self.check_cancelled()
+        logging.debug("Імітація рухів миші")
+        self.snapshot.invalidate()
+        try:
+            actions = ActionChains(self.driver)
+            for _ in range(random.randint(3, 6)):
+                x_offset = random.randint(-150, 150)
+                y_offset = random.randint(-150, 150)
+                actions.move_by_offset(x_offset, y_offset).pause(random.uniform(0.7, 2.0)).perform()
+                self.pause("mouse")
+            actions.reset_actions()
+        except Exception as e:
+            logging.error(f"Помилка імітації рухів миші: {e}")
+
+    def random_interaction(self):
+        self.check_cancelled()
+        logging.debug("Виконання випадкової взаємодії")
+        try:
+            interactive_elements = self.driver.find_elements(By.CSS_SELECTOR,
+                                                             "a.s-ref-text-link, div.s-filter-bar a, span.a-button-text")
+            if interactive_elements and random.random() < 0.3:
+                element = random.choice(interactive_elements)
+                actions = ActionChains(self.driver)
+                self.snapshot.invalidate()
+                actions.move_to_element(element).pause(random.uniform(0.7, 1.5)).click().perform()
+                logging.info(f"Виконано клік по елементу: {element.text[:50]}...")
+                self.pause("click")
+        except Exception as e:
+            logging.error(f"Помилка випадкової взаємодії: {e}")
+
+    def _rotate_identity(self):
+        self.driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": self.user_agent()})
+        self.driver.delete_all_cookies()
+
+    def check_captcha(self, max_retries=5):
+        driver = self.driver
+        for attempt in range(max_retries):
+            self.check_cancelled()
+            try:
+                if self.is_captcha_present():
+                    logging.warning(f"Виявлено CAPTCHA (спроба {attempt + 1}/{max_retries})")
+                    self.on_event("captcha", url=driver.current_url, attempt=attempt + 1)
+                    self.record_failure(status="CAPTCHA")
+                    # Для діагностики сторінка CAPTCHA зберігається лише в кеш сторінок
+                    self.cache_page(driver.current_url, self.snapshot.html, "captcha", CAPTCHA)
+                    if not self.headless:
+                        logging.warning("Очікування ручного вирішення CAPTCHA (30 секунд)")
+                        self.wait(30)
+                    else:
+                        logging.warning("Автоматичне вирішення CAPTCHA не підтримується в headless-режимі")
+                    if attempt < max_retries - 1:
+                        self._rotate_identity()
+                        self.throttle()
+                        self.snapshot.invalidate()
+                        driver.refresh()
+                        self.pause("page")
+                        continue
+                    logging.warning("Не вдалося пройти CAPTCHA, але продовжуємо зі спробою введення запиту")
+                    return False
+                return True
+            except Exception as e:
+                logging.error(f"Помилка перевірки CAPTCHA (спроба {attempt + 1}): {e}")
+                self.cache_page(driver.current_url, self.snapshot.html, "captcha", ERROR)
+                if attempt < max_retries - 1:
+                    self._rotate_identity()
+                    self.throttle()
+                    self.snapshot.invalidate()
+                    driver.refresh()
+                    self.pause("page")
+                    continue
+                logging.warning("Не вдалося перевірити CAPTCHA, але продовжуємо зі спробою введення запиту")
+                return False
+
+    def _open_home_page(self):
+        driver = self.driver
+        for attempt in range(3):
+            self.check_cancelled()
+            try:
+                logging.info(f"Спроба {attempt + 1}: Завантаження головної сторінки Amazon")
+                self.throttle()
+                self.snapshot.invalidate()
+                driver.get(self.base_url + "/")
+                self.pause("page")
+                self.human_mouse_movement()
+                self.random_interaction()
+                if not self.check_captcha():
+                    logging.warning("CAPTCHA виявлено, але продовжуємо з введенням запиту")
+                    break
+                logging.info("CAPTCHA відсутнє або вирішено, продовжуємо...")
+                break
+            except Exception as e:
+                logging.error(f"Помилка завантаження головної сторінки (спроба {attempt + 1}): {e}")
+                if attempt < 2:
+                    self.pause("retry")
+                    continue
+                raise
+
+    def _submit_search(self, query):
+        driver = self.driver
+        try:
+            logging.info(f"Введення пошукового запиту: {query}")
+            search_input = WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located((By.ID, "twotabsearchtextbox"))
+            )
+            search_input.clear()
+            self.snapshot.invalidate()
+            for ch in query:
+                self.check_cancelled()
+                actions = ActionChains(driver)
+                actions.move_to_element(search_input).click().send_keys(ch).perform()
+                self.pause("typing")
+            logging.info(f"Пошуковий запит '{query}' успішно введено")
+        except TimeoutException:
+            logging.error("Не вдалося знайти пошукове поле")
+            self.cache_page(driver.current_url, self.snapshot.html, "home", ERROR)
+            raise
+
+        try:
+            search_button = driver.find_element(By.ID, "nav-search-submit-button")
+            self.throttle()
+            actions = ActionChains(driver)
+            self.snapshot.invalidate()
+            actions.move_to_element(search_button).pause(random.uniform(0.7, 1.5)).click().perform()
+            logging.info("Натискання кнопки пошуку виконано")
+            self.pause("page")
+        except NoSuchElementException:
+            logging.error("Не вдалося знайти кнопку пошуку")
+            self.cache_page(driver.current_url, self.snapshot.html, "home", ERROR)
+            raise
+
+    def _click_next_page(self, page):
+        driver = self.driver
+        try:
+            next_btn_selectors = [
+                "a.s-pagination-item.s-pagination-next.s-pagination-button",
+                "span.a-list-item a[aria-label*='Go to next page']",
+                "li.s-list-item-margin-right-adjustment a.s-pagination-next",
+                "a.s-pagination-next"
+            ]
+            next_btn = None
+            for selector in next_btn_selectors:
+                try:
+                    next_btn = WebDriverWait(driver, 10).until(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
+                    )
+                    break
+                except:
+                    continue
+
+            if not next_btn:
+                raise NoMorePagesError("Кнопка 'Наступна сторінка' не знайдена, завершуємо перегляд сторінок")
+            self._rotate_identity()
+            self.throttle()
+            actions = ActionChains(driver)
+            self.snapshot.invalidate()
+            actions.move_to_element(next_btn).pause(random.uniform(0.7, 1.5)).click().perform()
+            logging.info(f"Перехід до наступної сторінки {page}")
+            self.pause("page")
+        except NoMorePagesError:
+            raise
+        except Exception as e:
+            raise NoMorePagesError(f"Помилка переходу до наступної сторінки: {e}")
+
+    def _wait_for_results(self, page):
+        driver = self.driver
+        for attempt in range(3):
+            self.check_cancelled()
+            try:
+                WebDriverWait(driver, 20).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, SEARCH_RESULTS_LOCATOR))
+                )
+                logging.info(f"Сторінка результатів {page} успішно завантажена")
+                self.record_success()
+                break
+            except TimeoutException:
+                self.record_failure(status="timeout")
+                self.cache_page(driver.current_url, self.snapshot.html, "search", ERROR)
+                if not self.check_captcha():
+                    logging.warning("CAPTCHA виявлено на сторінці результатів, але продовжуємо")
+                    break
+                if attempt < 2:
+                    self._rotate_identity()
+                    self.throttle()
+                    self.snapshot.invalidate()
+                    driver.refresh()
+                    self.pause("page")
+                    continue
+                raise
+
+    def _open_search_url(self, query, page):
+        self.throttle()
+        logging.info(f"Перехід до сторінки результатів {page} за URL пошуку")
+        self.snapshot.invalidate()
+        self.driver.get(search_url(query, page, self.base_url))
+        self.pause("page")
+
+    def _click_through(self, query, page):
+        """Перехід як у користувача: пошук з головної сторінки, далі кнопкою 'Наступна' до сторінки page."""
+        current = self._position[1] if self._position is not None and self._position[0] == query else 0
+        if page == 1 or not 0 < current < page:
+            self._open_home_page()
+            self.check_cancelled()
+            self._submit_search(query)
+            current = 1
+            self._position = (query, current)
+        while current < page:
+            if current + 1 < page:
+                self._wait_for_results(current)
+            self._click_next_page(current + 1)
+            current += 1
+            self._position = (query, current)
+
+    def fetch_search_page(self, query, page):
+        """Сторінка результатів за прямим URL пошуку (navigation="direct") або через поле пошуку і
+        кнопку 'Наступна' (navigation="click").
+
+        Якщо сторінка за прямим URL не завантажилась, рушій до кінця запиту переходить на click-through.
+        """
+        if self.navigation == "direct":
+            try:
+                self._open_search_url(query, page)
+                self._position = (query, page)
+                self._wait_for_results(page)
+            except Exception as e:
+                self.check_cancelled()
+                logging.warning(f"Сторінка результатів {page} за прямим URL не завантажилась ({e}), "
+                                f"переходимо на пошук через головну сторінку")
+                self.navigation = "click"
+                self._position = None
+                self._click_through(query, page)
+                self._wait_for_results(page)
+        else:
+            self._click_through(query, page)
+            self._wait_for_results(page)
+
+        self.check_cancelled()
+        self.human_scroll()
+        self.human_mouse_movement()
+        self.random_interaction()
+        self.pause("page")
+        log_page_stats(self.driver, f"результатів {page}")
+        html = self.snapshot.html
+        self.cache_page(search_url(query, page), html, "search")
+        return html
+
+    def fetch_product_page(self, url, wants_buying_options=None):
+        """Відкриває товар у новій вкладці і закриває її, щойно HTML зчитано."""
+        driver = self.driver
+        original_window = driver.current_window_handle
+        # Вкладка відкривається порожньою: блокування ресурсів через CDP діє лише на ціль, де його ввімкнено
+        driver.execute_script("window.open('about:blank');")
+        self.snapshot.invalidate()
+        driver.switch_to.window(driver.window_handles[-1])
+        try:
+            if self.resource_policy is not None:
+                self.resource_policy.apply(driver)
+            self.throttle(url)
+            self.snapshot.invalidate()
+            driver.get(self.resolve(url))
+            WebDriverWait(driver, 20).until(
+                EC.any_of(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "h1#title, span#productTitle")),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "span.a-price, div#buybox, div#availability, div#corePriceDisplay_desktop_feature_div"))
+                )
+            )
+            self.pause("product")
+            try:
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "span.a-price-whole, span.a-offscreen"))
+                )
+                logging.debug("Елемент ціни завантажено")
+            except TimeoutException:
+                logging.warning("Елемент ціни не завантажено після очікування")
+
+            self.human_scroll()
+            self.human_mouse_movement()
+            self.random_interaction()
+
+            if self.check_captcha():
+                wait_attempts = 0
+                while self.is_captcha_present() and wait_attempts < 6:
+                    self.check_cancelled()
+                    logging.warning("CAPTCHA ще не вирішено. Очікуємо...")
+                    self.on_event("captcha", url=url, attempt=wait_attempts + 1)
+                    self.pause("captcha")
+                    # CAPTCHA може бути вирішено вручну за час паузи
+                    self.snapshot.invalidate()
+                    wait_attempts += 1
+                if self.is_captcha_present():
+                    raise CaptchaError(f"Не вдалося пройти CAPTCHA на сторінці товару: {url}")
+                logging.info("CAPTCHA вирішено або відсутнє, продовжуємо...")
+
+            # Перевірки CAPTCHA вище і збереження HTML використовують одну серіалізацію DOM
+            html = self.snapshot.html
+            self.record_success(url)
+            log_page_stats(driver, url)
+            self.cache_page(url, html, "product")
+
+            buying_options_html = None
+            if (driver.find_elements(By.CSS_SELECTOR, BUYING_OPTIONS_BUTTON) and wants_buying_options
+                    and wants_buying_options(html)):
+                try:
+                    see_options_btn = driver.find_element(By.CSS_SELECTOR, BUYING_OPTIONS_BUTTON)
+                    self.throttle(url)
+                    actions = ActionChains(driver)
+                    self.snapshot.invalidate()
+                    actions.move_to_element(see_options_btn).pause(random.uniform(0.7, 1.5)).click().perform()
+                    WebDriverWait(driver, 10).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, "div#buyingOptionsList"))
+                    )
+                    buying_options_html = self.snapshot.html
+                    asin = asin_from_url(url)
+                    if asin:
+                        self.cache_page(offers_url(asin), buying_options_html, "offers")
+                except Exception as e:
+                    logging.error(f"Помилка при парсингу пропозицій сторонніх продавців: {e}")
+            return html, buying_options_html
+        except CaptchaError:
+            self.record_failure(url, "CAPTCHA")
+            raise
+        except Exception:
+            self.record_failure(url)
+            self.cache_page(url, self.snapshot.html, "product", ERROR)
+            raise
+        finally:
+            try:
+                driver.close()
+                self.snapshot.invalidate()
+                driver.switch_to.window(original_window)
+            except Exception as e:
+                logging.error(f"Помилка при закритті вкладки: {e}")
+
+
+class HttpFetcher(Fetcher):
+    """Завантаження звичайними HTTP-запитами через пул keep-alive з'єднань requests.Session.
+
+    Без браузера: десятки МБ пам'яті замість сотень і жодного часу на старт Chromium.
+    Стиснення gzip/deflate (і br, якщо встановлено brotli) узгоджується автоматично.
+    """
+
+    name = "http"
+    concurrent = True
+    delays = {**Fetcher.delays, "page": (2, 5), "retry": (5, 10)}
+
+    def __init__(self, base_url=AMAZON_URL, user_agents=None, is_cancelled=None, timeout=20, pool_size=10,
+                 **kwargs):
+        super().__init__(base_url, user_agents, is_cancelled, **kwargs)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = None
+
+    def open(self):
+        # Сесія спільна для потоків ProductPagePipeline: пул з'єднань urllib3 потокобезпечний
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9",
+            # make_headers додає br лише тоді, коли urllib3 уміє його розпакувати
+            "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"],
+        })
+        user_agent = self.user_agent()
+        if user_agent:
+            session.headers["User-Agent"] = user_agent
+        self.session = session
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    def get(self, url, kind="page"):
+        """HTML сторінки за канонічним URL; успішні відповіді і CAPTCHA зберігаються в кеш сторінок."""
+        key = url
+        self.throttle(url)
+        url = self.resolve(url)
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.record_failure(url)
+            raise FetchError(f"Помилка запиту {url}: {e}") from e
+        if response.status_code in (429, 503):
+            self.record_failure(url, response.status_code)
+            self.on_event("captcha", url=key, status=response.status_code)
+            raise CaptchaError(f"Amazon відхилив запит ({response.status_code}): {url}")
+        if response.status_code >= 400:
+            if response.status_code >= 500:
+                self.record_failure(url, response.status_code)
+            raise FetchError(f"HTTP {response.status_code} для {url}")
+        html = response.text
+        if is_captcha_html(html):
+            self.record_failure(url, "CAPTCHA")
+            self.on_event("captcha", url=key, status="CAPTCHA")
+            self.cache_page(key, html, kind, CAPTCHA)
+            raise CaptchaError(f"Виявлено CAPTCHA: {url}")
+        self.record_success(url)
+        self.cache_page(key, html, kind)
+        logging.debug(f"Завантажено {url} ({len(response.content)} байтів, {response.headers.get('Content-Encoding', 'identity')})")
+        return html
+
+    def fetch_search_page(self, query, page):
+        html = self.get(search_url(query, page), "search")
+        if page > 1 and "s-search-result" not in html:
+            raise NoMorePagesError(f"Сторінка результатів {page} порожня, завершуємо перегляд сторінок")
+        return html
+
+    def fetch_product_page(self, url, wants_buying_options=None):
+        html = self.get(url, "product")
+        buying_options_html = None
+        if "buybox-see-all-buying-choices" in html and wants_buying_options and wants_buying_options(html):
+            asin = asin_from_url(url)
+            if asin:
+                try:
+                    buying_options_html = self.get(offers_url(asin), "offers")
+                except FetchError as e:
+                    logging.error(f"Помилка при парсингу пропозицій сторонніх продавців: {e}")
+        return html, buying_options_html
+
+
+class CacheFetcher(Fetcher):
+    """Режим відтворення: сторінки віддаються з PageCache замість мережі.
+
+    Для швидкого офлайн-перепарсингу після зміни селекторів і детермінованих бенчмарків.
+    """
+
+    name = "cache"
+    concurrent = True
+    offline = True
+    delays = {"page": (0, 0), "retry": (0, 0), "restart": (0, 0)}
+
+    def __init__(self, base_url=AMAZON_URL, user_agents=None, is_cancelled=None, page_cache=None, **kwargs):
+        super().__init__(base_url, user_agents, is_cancelled, page_cache=page_cache or get_page_cache(), **kwargs)
+        if self.page_cache is None:
+            raise ValueError("Режим відтворення потребує кешу сторінок")
+
+    def cache_page(self, url, html, kind, status=OK):
+        pass
+
+    def fetch_search_page(self, query, page):
+        html = self.page_cache.get(search_url(query, page), "search")
+        if html is None:
+            if page > 1:
+                raise NoMorePagesError(f"Сторінки результатів {page} немає в кеші, завершуємо перегляд сторінок")
+            raise FetchError(f"Сторінки результатів '{query}' немає в кеші")
+        return html
+
+    def fetch_product_page(self, url, wants_buying_options=None):
+        html = self.page_cache.get(url, "product")
+        if html is None:
+            raise FetchError(f"Сторінки товару немає в кеші: {url}")
+        buying_options_html = None
+        if "buybox-see-all-buying-choices" in html and wants_buying_options and wants_buying_options(html):
+            asin = asin_from_url(url)
+            if asin:
+                buying_options_html = self.page_cache.get(offers_url(asin), "offers")
+        return html, buying_options_html
+
+
+FETCHERS = {
+    SeleniumFetcher.name: SeleniumFetcher,
+    HttpFetcher.name: HttpFetcher,
+    CacheFetcher.name: CacheFetcher,
+}
+
+
+def create_fetcher(engine="selenium", **kwargs):
+    """Створює рушій завантаження за назвою ("selenium", "http" або "cache")."""
+    if engine not in FETCHERS:
+        raise ValueError(f"Невідомий рушій завантаження: {engine}")
+    return FETCHERS[engine](**kwargs)
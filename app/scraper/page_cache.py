@@ -0,0 +1,251 @@
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy import text
+from app.database import get_engine
+
+try:
+    import zstandard
+except ImportError:  # zstd — необов'язкова залежність, без неї сторінки стискаються gzip
+    zstandard = None
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+OK, ERROR, CAPTCHA = "ok", "error", "captcha"
+
+# Кодеки стиснення: назва (розширення файлу) -> (стиснути, розпакувати)
+CODECS = {"gz": (lambda data: gzip.compress(data, compresslevel=6), gzip.decompress)}
+if zstandard is not None:
+    # Об'єкти zstandard не потокобезпечні, тож створюються на кожен виклик
+    CODECS["zst"] = (lambda data: zstandard.ZstdCompressor(level=10).compress(data),
+                     lambda data: zstandard.ZstdDecompressor().decompress(data))
+DEFAULT_CODEC = "zst" if zstandard is not None else "gz"
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS blobs (
+        digest TEXT PRIMARY KEY,
+        codec TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        stored_size INTEGER NOT NULL,
+        last_access REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_blobs_last_access ON blobs (last_access)",
+    """
+    CREATE TABLE IF NOT EXISTS pages (
+        id INTEGER PRIMARY KEY,
+        url TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        digest TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_pages_url ON pages (url, fetched_at)",
+    "CREATE INDEX IF NOT EXISTS idx_pages_digest ON pages (digest)",
+]
+
+
+class PageCache:
+    """Кеш сирого HTML сторінок на диску з адресацією за вмістом.
+
+    Кожен унікальний HTML зберігається один раз, стиснутим (zstd або gzip), у файлі
+    root/ab/cd/<sha256>.html.<codec>. Індекс SQLite root/index.db зберігає історію завантажень
+    за URL і часом (зокрема сторінки з помилками і CAPTCHA для діагностики). Коли розмір файлів
+    перевищує max_bytes, видаляються найдавніше використані (LRU) до 90% ліміту.
+    """
+
+    def __init__(self, root="page_cache", max_bytes=512 * 1024 * 1024, codec=DEFAULT_CODEC, clock=time.time):
+        if codec not in CODECS:
+            raise ValueError(f"Невідомий кодек стиснення: {codec}")
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.codec = codec
+        self.clock = clock
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self.engine = get_engine(os.path.join(self.root, "index.db"))
+        with self.engine.begin() as connection:
+            for statement in SCHEMA:
+                connection.execute(text(statement))
+            self._total = connection.execute(text("SELECT COALESCE(SUM(stored_size), 0) FROM blobs")).scalar()
+
+    def _path(self, digest, codec):
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}.html.{codec}")
+
+    def _write_blob(self, digest, data):
+        stored = CODECS[self.codec][0](data)
+        path = self._path(digest, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Запис через тимчасовий файл: читач ніколи не бачить недописаний блоб
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(stored)
+        os.replace(tmp_path, path)
+        return len(stored)
+
+    def put(self, url, html, kind="page", status=OK):
+        """Зберігає HTML сторінки url і повертає його sha256."""
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        now = self.clock()
+        with self.engine.connect() as connection:
+            known = connection.execute(text("SELECT 1 FROM blobs WHERE digest = :digest"),
+                                       {"digest": digest}).first() is not None
+        stored_size = 0 if known else self._write_blob(digest, data)
+
+        added = 0
+        with self.engine.begin() as connection:
+            if not known:
+                added = connection.execute(text("""
+                    INSERT OR IGNORE INTO blobs (digest, codec, size, stored_size, last_access)
+                    VALUES (:digest, :codec, :size, :stored_size, :now)
+                """), {"digest": digest, "codec": self.codec, "size": len(data), "stored_size": stored_size,
+                       "now": now}).rowcount
+            if not added:
+                connection.execute(text("UPDATE blobs SET last_access = :now WHERE digest = :digest"),
+                                   {"digest": digest, "now": now})
+            # Повторне завантаження незміненої сторінки оновлює час останнього запису, а не додає новий
+            latest = connection.execute(text("""
+                SELECT id, digest, status FROM pages WHERE url = :url AND kind = :kind
+                ORDER BY fetched_at DESC LIMIT 1
+            """), {"url": url, "kind": kind}).first()
+            if latest is not None and latest.digest == digest and latest.status == status:
+                connection.execute(text("UPDATE pages SET fetched_at = :now WHERE id = :id"),
+                                   {"id": latest.id, "now": now})
+            else:
+                connection.execute(text("""
+                    INSERT INTO pages (url, kind, status, fetched_at, digest)
+                    VALUES (:url, :kind, :status, :now, :digest)
+                """), {"url": url, "kind": kind, "status": status, "now": now, "digest": digest})
+
+        with self._lock:
+            self._total += stored_size if added else 0
+            over_limit = self._total > self.max_bytes
+        logging.debug(f"Сторінку {url} ({kind}, {status}) збережено в кеш: {digest[:12]}")
+        if over_limit:
+            self.evict()
+        return digest
+
+    def get(self, url, kind=None):
+        """Останній успішно завантажений HTML сторінки url або None."""
+        query = """
+            SELECT p.digest, b.codec FROM pages p JOIN blobs b ON b.digest = p.digest
+            WHERE p.url = :url AND p.status = 'ok'{kind}
+            ORDER BY p.fetched_at DESC LIMIT 1
+        """.format(kind=" AND p.kind = :kind" if kind else "")
+        with self.engine.connect() as connection:
+            row = connection.execute(text(query), {"url": url, "kind": kind}).first()
+        if row is None:
+            return None
+        html = self._read_blob(row.digest, row.codec)
+        if html is None:
+            return None
+        with self.engine.begin() as connection:
+            connection.execute(text("UPDATE blobs SET last_access = :now WHERE digest = :digest"),
+                               {"digest": row.digest, "now": self.clock()})
+        return html
+
+    def _read_blob(self, digest, codec):
+        try:
+            with open(self._path(digest, codec), "rb") as f:
+                stored = f.read()
+        except FileNotFoundError:
+            # Блоб витіснено іншим процесом між запитом до індексу і читанням
+            return None
+        return CODECS[codec][1](stored).decode("utf-8")
+
+    def latest_pages(self, kinds=None):
+        """Генератор (url, kind, html) останнього успішного завантаження кожної сторінки в кеші.
+
+        kinds обмежує види сторінок ("search", "product", "offers"); HTML читається з диска по одному.
+        """
+        query = """
+            SELECT p.url, p.kind, p.digest, b.codec FROM pages p JOIN blobs b ON b.digest = p.digest
+            WHERE p.status = 'ok' AND p.fetched_at = (
+                SELECT MAX(q.fetched_at) FROM pages q WHERE q.url = p.url AND q.kind = p.kind AND q.status = 'ok'
+            ){kinds}
+            ORDER BY p.kind, p.url
+        """
+        params = {f"k{i}": kind for i, kind in enumerate(kinds or ())}
+        query = query.format(kinds=f" AND p.kind IN ({', '.join(':' + name for name in params)})" if params else "")
+        with self.engine.connect() as connection:
+            rows = connection.execute(text(query), params).fetchall()
+        for row in rows:
+            html = self._read_blob(row.digest, row.codec)
+            if html is not None:
+                yield row.url, row.kind, html
+
+    def history(self, url):
+        """Усі збережені завантаження url від найновішого: (fetched_at, kind, status, digest)."""
+        with self.engine.connect() as connection:
+            return [tuple(row) for row in connection.execute(text("""
+                SELECT fetched_at, kind, status, digest FROM pages WHERE url = :url ORDER BY fetched_at DESC
+            """), {"url": url})]
+
+    def evict(self):
+        """Видаляє найдавніше використані блоби, доки розмір кешу не стане не більшим за 90% ліміту."""
+        with self._lock:
+            victims = []
+            with self.engine.begin() as connection:
+                total = connection.execute(text("SELECT COALESCE(SUM(stored_size), 0) FROM blobs")).scalar()
+                if total > self.max_bytes:
+                    target = self.max_bytes * 0.9
+                    for row in connection.execute(text(
+                            "SELECT digest, codec, stored_size FROM blobs ORDER BY last_access")).fetchall():
+                        if total <= target:
+                            break
+                        victims.append(row)
+                        total -= row.stored_size
+                    params = [{"digest": row.digest} for row in victims]
+                    if params:
+                        connection.execute(text("DELETE FROM pages WHERE digest = :digest"), params)
+                        connection.execute(text("DELETE FROM blobs WHERE digest = :digest"), params)
+            self._total = total
+        for row in victims:
+            try:
+                os.remove(self._path(row.digest, row.codec))
+            except FileNotFoundError:
+                pass
+        if victims:
+            logging.info(f"Витіснено з кешу сторінок {len(victims)} блобів, розмір кешу {total / 1024 / 1024:.1f} МБ")
+        return len(victims)
+
+    def stats(self):
+        with self.engine.connect() as connection:
+            blobs, size, stored_size = connection.execute(text(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs")).first()
+            pages = connection.execute(text("SELECT COUNT(*) FROM pages")).scalar()
+        return {"pages": pages, "blobs": blobs, "bytes": size, "stored_bytes": stored_size}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """Спільний для процесу кеш сторінок або None, якщо його вимкнено.
+
+    Каталог задається змінною SCRAPER_PAGE_CACHE_DIR, ліміт — SCRAPER_PAGE_CACHE_MB (0 вимикає кеш).
+    """
+    global _default_cache
+    max_mb = int(os.environ.get("SCRAPER_PAGE_CACHE_MB", 512))
+    if max_mb <= 0:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PageCache(os.environ.get("SCRAPER_PAGE_CACHE_DIR", "page_cache"), max_mb * 1024 * 1024)
+        return _default_cache
@@ -0,0 +1,318 @@
+import logging
+from collections import namedtuple
+from app.scraper.backends import Selector, SelectorSchema, parse_document
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+# Селектори компілюються один раз під час імпорту, а не на кожен виклик екстрактора
+PRICE_SELECTOR = Selector(
+    "span.a-price.aok-align-center.reinventPricePriceToPayMargin.priceToPay span.a-offscreen, "
+    "span.a-price span.a-offscreen, "
+    "span#priceblock_ourprice, "
+    "span#priceblock_dealprice"
+)
+PRICE_WHOLE_SELECTOR = Selector("span.a-price-whole")
+PRICE_FRACTION_SELECTOR = Selector("span.a-price-fraction")
+PRICE_BLOCK_SELECTOR = Selector("div#corePriceDisplay_desktop_feature_div span.a-price")
+ORIGINAL_PRICE_SELECTOR = Selector(
+    "span.a-price.a-text-price span.a-offscreen, "
+    "span.a-price[data-a-strike='true'] span.a-offscreen, "
+    "span#listPrice, "
+    "span.a-price[data-a-color='secondary'] span.a-offscreen"
+)
+STRIKE_PRICE_SELECTOR = Selector("span.a-price[data-a-strike='true']")
+TITLE_SELECTOR = Selector("h1#title span#productTitle, span#productTitle, h2 a span, h2 span.a-text-normal")
+RATING_SELECTOR = Selector(
+    "span[data-hook='average-star-rating'] span.a-icon-alt, i[data-hook='average-star-rating'], "
+    "span[aria-label*='out of 5 stars'], span.a-icon-alt")
+REVIEWS_SELECTOR = Selector(
+    "span[data-hook='total-review-count'], a#acrCustomerReviewText, span[aria-label*='ratings']")
+SELLER_SELECTOR = Selector("a#sellerProfileTriggerId, div#merchantInfo a, div#soldBy a, div#merchant-info span")
+DELIVERY_SELECTOR = Selector(
+    "div#deliveryBlockMessage span, div#availability span, div#availability_feature_div span, "
+    "span.a-size-base.a-color-secondary")
+SEARCH_RESULT_SELECTOR = Selector(
+    "div.s-main-slot div[data-component-type='s-search-result'], div.s-result-item")
+CARD_TITLE_SELECTOR = Selector("h2")
+CARD_URL_SELECTOR = Selector("a.a-link-normal.s-no-outline")
+AVAILABILITY_SELECTOR = Selector(
+    "div#availability span, span#outOfStock, span:-soup-contains('No featured offers available'), "
+    "span:-soup-contains('Currently unavailable')")
+PRICE_DEBUG_SELECTOR = Selector("div#corePriceDisplay_desktop_feature_div, span.a-price, div#buybox")
+
+def _offscreen_price(elem):
+    """Ціна з тексту a-offscreen або None, якщо елемента немає чи текст не є числом."""
+    if elem and elem.text.strip():
+        price_text = elem.text.strip().replace('$', '').replace(',', '')
+        if price_text.replace('.', '').isdigit():
+            return float(price_text)
+    return None
+
+def _title_value(title_elem):
+    return title_elem.text.strip()
+
+def _rating_value(rating_elem):
+    rating_text = rating_elem.text.split()[0] if 'data-hook' in rating_elem.attrs or 'a-icon-alt' in rating_elem.get('class', []) else rating_elem['aria-label'].split()[0]
+    return float(rating_text) if rating_text.replace('.', '').isdigit() else 0.0
+
+def _reviews_value(reviews_elem):
+    reviews_text = reviews_elem.text.strip().replace(',', '').replace('ratings', '').replace('rating', '')
+    reviews_text = ''.join(filter(str.isdigit, reviews_text))
+    return int(reviews_text) if reviews_text.isdigit() else 0
+
+def _seller_value(seller_elem):
+    seller_text = seller_elem.text.strip()
+    if "Sold by" in seller_text:
+        seller_text = seller_text.replace("Sold by", "").replace(":", "").strip()
+    return seller_text or "Amazon.com"
+
+def _delivery_value(delivery_elem):
+    return delivery_elem.text.strip()
+
+def get_price_from_soup(soup):
+    try:
+        # Спроба знайти ціну через a-offscreen
+        price = _offscreen_price(PRICE_SELECTOR.select_one(soup))
+        if price is not None:
+            logging.debug(f"Знайдено ціну через a-offscreen: {price}")
+            return price
+
+        # Резервний варіант: комбінація a-price-whole і a-price-fraction
+        whole_elem = PRICE_WHOLE_SELECTOR.select_one(soup)
+        fraction_elem = PRICE_FRACTION_SELECTOR.select_one(soup)
+        if whole_elem and fraction_elem:
+            whole_text = whole_elem.text.strip().replace(',', '')
+            fraction_text = fraction_elem.text.strip()
+            price_text = f"{whole_text}.{fraction_text}"
+            if price_text.replace('.', '').isdigit():
+                logging.debug(f"Знайдено ціну через a-price-whole і a-price-fraction: {price_text}")
+                return float(price_text)
+
+        # Додатковий селектор для блоку ціни
+        price_block = PRICE_BLOCK_SELECTOR.select_one(soup)
+        if price_block:
+            price_text = price_block.text.strip().replace('$', '').replace(',', '')
+            if price_text.replace('.', '').isdigit():
+                logging.debug(f"Знайдено ціну через corePriceDisplay: {price_text}")
+                return float(price_text)
+
+        logging.debug("Ціна не знайдена за жодним селектором")
+        return 0.0
+    except Exception as e:
+        logging.error(f"Помилка парсингу ціни: {e}")
+        return 0.0
+
+def get_original_price_from_soup(soup):
+    try:
+        original_price = _offscreen_price(ORIGINAL_PRICE_SELECTOR.select_one(soup))
+        if original_price is not None:
+            logging.debug(f"Знайдено оригінальну ціну через a-offscreen: {original_price}")
+            return original_price
+
+        # Резервний варіант для знижок
+        discount_elem = STRIKE_PRICE_SELECTOR.select_one(soup)
+        if discount_elem:
+            whole_elem = PRICE_WHOLE_SELECTOR.select_one(discount_elem)
+            fraction_elem = PRICE_FRACTION_SELECTOR.select_one(discount_elem)
+            if whole_elem and fraction_elem:
+                whole_text = whole_elem.text.strip().replace(',', '')
+                fraction_text = fraction_elem.text.strip()
+                price_text = f"{whole_text}.{fraction_text}"
+                if price_text.replace('.', '').isdigit():
+                    logging.debug(f"Знайдено оригінальну ціну через a-price-whole і a-price-fraction: {price_text}")
+                return float(price_text)
+
+        logging.debug("Оригінальна ціна не знайдена за жодним селектором")
+        return 0.0
+    except Exception as e:
+        logging.error(f"Помилка парсингу оригінальної ціни: {e}")
+        return 0.0
+
+def get_title_from_soup(soup):
+    try:
+        title_elem = TITLE_SELECTOR.select_one(soup)
+        return _title_value(title_elem) if title_elem else "N/A"
+    except Exception as e:
+        logging.error(f"Помилка парсингу назви: {e}")
+        return "N/A"
+
+def get_rating_from_soup(soup):
+    try:
+        rating_elem = RATING_SELECTOR.select_one(soup)
+        if rating_elem:
+            return _rating_value(rating_elem)
+        logging.debug("Рейтинг не знайдено за жодним селектором")
+        return 0.0
+    except Exception as e:
+        logging.error(f"Помилка парсингу рейтингу: {e}")
+        return 0.0
+
+def get_reviews_from_soup(soup):
+    try:
+        reviews_elem = REVIEWS_SELECTOR.select_one(soup)
+        if reviews_elem:
+            return _reviews_value(reviews_elem)
+        logging.debug("Елемент відгуків не знайдено")
+        return 0
+    except Exception as e:
+        logging.error(f"Помилка парсингу кількості відгуків: {e}")
+        return 0
+
+def get_seller_from_soup(soup):
+    try:
+        seller_elem = SELLER_SELECTOR.select_one(soup)
+        if seller_elem:
+            seller_text = _seller_value(seller_elem)
+            logging.debug(f"Знайдено продавця: {seller_text}")
+            return seller_text
+        logging.debug("Продавець не знайдений")
+        return "N/A"
+    except Exception as e:
+        logging.error(f"Помилка парсингу продавця: {e}")
+        return "N/A"
+
+def get_delivery_from_soup(soup):
+    try:
+        delivery_elem = DELIVERY_SELECTOR.select_one(soup)
+        if delivery_elem:
+            delivery_text = _delivery_value(delivery_elem)
+            logging.debug(f"Знайдено інформацію про доставку: {delivery_text}")
+            return delivery_text
+        logging.debug("Інформація про доставку не знайдена")
+        return "N/A"
+    except Exception as e:
+        logging.error(f"Помилка парсингу доставки: {e}")
+        return "N/A"
+
+# Схема картки результатів: усі поля шукаються за один обхід піддерева картки
+CARD_SCHEMA = SelectorSchema({
+    "heading": CARD_TITLE_SELECTOR,
+    "url": CARD_URL_SELECTOR,
+    "title": TITLE_SELECTOR,
+    "price": PRICE_SELECTOR,
+    "original_price": ORIGINAL_PRICE_SELECTOR,
+    "strike_price": STRIKE_PRICE_SELECTOR,
+    "rating": RATING_SELECTOR,
+    "reviews": REVIEWS_SELECTOR,
+    "seller": SELLER_SELECTOR,
+    "delivery": DELIVERY_SELECTOR,
+})
+
+CardRecord = namedtuple("CardRecord", ["asin", "url", "title", "price", "original_price", "rating", "reviews",
+                                       "seller", "delivery"])
+
+def _card_field(card, elem, value_fn, default, get_from_soup):
+    if elem is None:
+        return default
+    try:
+        return value_fn(elem)
+    except Exception:
+        # Нетиповий елемент — повний шлях екстрактора з його резервними селекторами і логуванням
+        return get_from_soup(card)
+
+def extract_card(card):
+    """Витягує всі поля картки результатів за один обхід; None — для карток без ASIN чи заголовка або спонсорованих.
+
+    До окремих get_*_from_soup звертається лише для полів, яких не вдалося визначити з основного селектора.
+    """
+    asin = card.get("data-asin")
+    found = CARD_SCHEMA.extract(card) if asin else None
+    if not found or found["heading"] is None:
+        logging.debug("Пропущено продукт без ASIN або заголовка")
+        return None
+
+    url_elem = found["url"]
+    url = "https://www.amazon.com" + url_elem['href'].split("?")[0] if url_elem and url_elem.get("href") else "N/A"
+    if "sspa/click" in url:
+        logging.debug(f"Пропущено спонсорований продукт: {url}")
+        return None
+
+    price = _offscreen_price(found["price"])
+    if price is None:
+        price = get_price_from_soup(card)
+    original_price = _offscreen_price(found["original_price"])
+    if original_price is None:
+        original_price = get_original_price_from_soup(card) if found["strike_price"] is not None else 0.0
+
+    return CardRecord(
+        asin=asin,
+        url=url,
+        title=_card_field(card, found["title"], _title_value, "N/A", get_title_from_soup),
+        price=price,
+        original_price=original_price,
+        rating=_card_field(card, found["rating"], _rating_value, 0.0, get_rating_from_soup),
+        reviews=_card_field(card, found["reviews"], _reviews_value, 0, get_reviews_from_soup),
+        seller=_card_field(card, found["seller"], _seller_value, "N/A", get_seller_from_soup),
+        delivery=_card_field(card, found["delivery"], _delivery_value, "N/A", get_delivery_from_soup)
+    )
+
+def default_product_data(title="N/A"):
+    """Дані продукту за замовчуванням, коли сторінку товару не вдалося спарсити."""
+    return {
+        "title": title,
+        "price": 0.0,
+        "original_price": 0.0,
+        "rating": 0.0,
+        "reviews": 0,
+        "seller": "N/A",
+        "delivery": "N/A"
+    }
+
+def parse_search_results_html(html, backend=None):
+    """Парсить сторінку результатів пошуку і повертає список CardRecord."""
+    soup = parse_document(html, backend)
+    records = []
+    for card in SEARCH_RESULT_SELECTOR.select(soup):
+        record = extract_card(card)
+        if record is not None:
+            records.append(record)
+    logging.debug(f"Спарсено {len(records)} карток товарів")
+    return records
+
+def parse_product_html(html, product_url="N/A", backend=None):
+    """Парсить сторінку товару і повертає пару (дані продукту, чи доступний товар)."""
+    soup = parse_document(html, backend)
+    availability_elem = AVAILABILITY_SELECTOR.select_one(soup)
+    if availability_elem and ("No featured offers available" in availability_elem.text or "Currently unavailable" in availability_elem.text):
+        logging.warning(f"Товар недоступний: {product_url}, текст: '{availability_elem.text.strip()}'")
+        product_data = default_product_data(get_title_from_soup(soup))
+        logging.info(f"Повертаємо дані для недоступного товару: {product_data}")
+        return product_data, False
+
+    title = get_title_from_soup(soup)
+    price = get_price_from_soup(soup)
+    original_price = get_original_price_from_soup(soup)
+    if price == 0.0 and original_price > 0.0:
+        price = original_price
+        logging.debug(f"Використано оригінальну ціну як основну: {price}")
+    elif price == 0.0 and original_price == 0.0:
+        logging.warning(f"Ціна та оригінальна ціна = 0.0 для {product_url}. Можливо, товар недоступний або ціна не спарсилась.")
+        price_block = PRICE_DEBUG_SELECTOR.select_one(soup)
+        logging.debug(f"HTML блоку ціни: {price_block.prettify() if price_block else 'Відсутній'}")
+
+    return {
+        "title": title,
+        "price": price,
+        "original_price": original_price,
+        "rating": get_rating_from_soup(soup),
+        "reviews": get_reviews_from_soup(soup),
+        "seller": get_seller_from_soup(soup),
+        "delivery": get_delivery_from_soup(soup)
+    }, True
+
+def parse_buying_options_html(html, backend=None):
+    """Парсить сторінку пропозицій сторонніх продавців і повертає ціну та продавця."""
+    soup = parse_document(html, backend)
+    return {"price": get_price_from_soup(soup), "seller": get_seller_from_soup(soup)}
+
+def needs_buying_options(product_data):
+    """Чи потрібно відкривати список пропозицій, щоб знайти продавця."""
+    return product_data["seller"] == "N/A" or "See All Buying Options" in product_data["seller"]
@@ -0,0 +1,145 @@
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from app.scraper.parsers import parse_search_results_html, parse_product_html, parse_buying_options_html
+
+# Верхня межа пулу парсингу за замовчуванням: парсинг лише наздоганяє завантаження сторінок,
+# а пул є в кожному процесі-воркері, тож займати всі ядра в кожному з них немає сенсу
+DEFAULT_MAX_WORKERS = 4
+
+
+def default_parse_workers(processes=1):
+    """Розмір пулу парсингу одного процесу, коли на машині працює processes таких процесів."""
+    return max(1, min(DEFAULT_MAX_WORKERS, (os.cpu_count() or 1) // max(processes, 1)))
+
+
+def completed_future(value):
+    """Повертає вже завершений Future із заданим значенням."""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class ParsingEngine:
+    """Парсинг сирого HTML (сторінок результатів і товарів) у пулі процесів.
+
+    Потік браузера лише зчитує page_source і передає його сюди, тож завантаження наступної
+    сторінки і парсинг попередньої виконуються паралельно, а пропускна здатність парсингу
+    масштабується з кількістю ядер. За замовчуванням пул займає частку ядер default_parse_workers(),
+    max_workers=0 вмикає парсинг у поточному потоці.
+    backend обирає бекенд побудови дерева ("lxml" або еталонний "bs4").
+    """
+
+    def __init__(self, max_workers=None, backend=None):
+        self.max_workers = default_parse_workers() if max_workers is None else max_workers
+        self.backend = backend
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _submit(self, fn, *args):
+        if self.max_workers == 0:
+            try:
+                return completed_future(fn(*args))
+            except Exception as e:
+                future = Future()
+                future.set_exception(e)
+                return future
+        with self._lock:
+            if self._executor is None:
+                # spawn, а не fork: процес вебзастосунку багатопотоковий (uvicorn, потоки скраперів)
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+                logging.info(f"Запущено пул парсингу на {self.max_workers} процесів")
+            return self._executor.submit(fn, *args)
+
+    def submit_search_results(self, html):
+        """Ставить у чергу парсинг сторінки результатів; Future повертає список CardRecord."""
+        return self._submit(parse_search_results_html, html, self.backend)
+
+    def submit_product_page(self, html, product_url="N/A"):
+        """Ставить у чергу парсинг сторінки товару; Future повертає (дані продукту, чи доступний товар)."""
+        return self._submit(parse_product_html, html, product_url, self.backend)
+
+    def submit_buying_options(self, html):
+        return self._submit(parse_buying_options_html, html, self.backend)
+
+    def parse_search_results(self, html):
+        return self.submit_search_results(html).result()
+
+    def parse_product_page(self, html, product_url="N/A"):
+        return self.submit_product_page(html, product_url).result()
+
+    def parse_buying_options(self, html):
+        return self.submit_buying_options(html).result()
+
+    def reparse_cache(self, page_cache, kinds=("search", "product", "offers")):
+        """Офлайн-перепарсинг сторінок із кешу сторінок (PageCache), напр. після зміни селекторів.
+
+        Повертає генератор трійок (url, вид сторінки, результат): для сторінок результатів — список
+        CardRecord, для сторінок товарів — (дані продукту, чи доступний товар), для пропозицій — ціна і продавець.
+        """
+        submitters = {"search": self.submit_search_results, "offers": self.submit_buying_options}
+        in_flight = deque()
+        max_in_flight = max(2 * self.max_workers, 1)
+        for url, kind, html in page_cache.latest_pages(kinds):
+            future = self.submit_product_page(html, url) if kind == "product" else submitters[kind](html)
+            in_flight.append((url, kind, future))
+            # Обмежуємо кількість сторінок у пам'яті одночасно
+            while len(in_flight) >= max_in_flight:
+                done_url, done_kind, future = in_flight.popleft()
+                yield done_url, done_kind, future.result()
+        while in_flight:
+            done_url, done_kind, future = in_flight.popleft()
+            yield done_url, done_kind, future.result()
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine():
+    """Спільний для процесу рушій парсингу; розмір пулу задається змінною SCRAPER_PARSE_WORKERS."""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            workers = os.environ.get("SCRAPER_PARSE_WORKERS")
+            _default_engine = ParsingEngine(int(workers) if workers is not None else None)
+        return _default_engine
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from app.scraper.page_cache import PageCache
+
+    parser = argparse.ArgumentParser(description="Офлайн-перепарсинг сторінок Amazon із кешу сторінок")
+    parser.add_argument("--cache-dir", default=os.environ.get("SCRAPER_PAGE_CACHE_DIR", "page_cache"),
+                        help="Каталог кешу сторінок (за замовчуванням: SCRAPER_PAGE_CACHE_DIR або page_cache)")
+    parser.add_argument("--kind", choices=["search", "product", "offers"], action="append", default=None,
+                        help="Види сторінок для перепарсингу (за замовчуванням: усі)")
+    parser.add_argument("--workers", type=int, default=None, help="Кількість процесів парсингу")
+    parser.add_argument("--backend", choices=["lxml", "bs4"], default=None, help="Бекенд парсингу HTML")
+    args = parser.parse_args()
+
+    with ParsingEngine(args.workers, args.backend) as engine:
+        kinds = args.kind or ("search", "product", "offers")
+        for url, kind, result in engine.reparse_cache(PageCache(args.cache_dir), kinds):
+            if kind == "search":
+                result = [card._asdict() for card in result]
+            print(json.dumps({"url": url, "kind": kind, "result": result}, ensure_ascii=False))
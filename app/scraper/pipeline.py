@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+
+class ProductPagePipeline:
+    """Паралельне завантаження сторінок товарів однієї сторінки результатів на asyncio.
+
+    fetch_product(url) — блокуюча функція (завантаження, повтори, парсинг), вона виконується
+    у власному пулі потоків. Кількість одночасних завантажень обмежена глобальним семафором
+    (concurrency) і семафором на кожен хост (per_host_concurrency).
+    """
+
+    def __init__(self, fetch_product, concurrency=4, per_host_concurrency=None, resolve=None, label="сторінок товарів"):
+        if concurrency < 1:
+            raise ValueError("concurrency має бути не менше 1")
+        self.fetch_product = fetch_product
+        self.concurrency = concurrency
+        self.per_host_concurrency = min(per_host_concurrency or concurrency, concurrency)
+        self.resolve = resolve or (lambda url: url)
+        self.label = label
+
+    def run(self, urls):
+        """Повертає результати в порядку urls; виняток завантаження повертається замість результату."""
+        if not urls:
+            return []
+        # Власний пул: типовий пул asyncio.to_thread має лише min(32, cpu + 4) потоків
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="product-fetch") as executor:
+            return asyncio.run(self._fetch_all(urls, executor))
+
+    async def _fetch_all(self, urls, executor):
+        global_limit = asyncio.Semaphore(self.concurrency)
+        host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host_concurrency))
+        loop = asyncio.get_running_loop()
+
+        async def fetch(url):
+            # Спершу слот хоста: задачі, що чекають на зайнятий хост, не тримають глобальних слотів
+            async with host_limits[urlsplit(self.resolve(url)).netloc]:
+                async with global_limit:
+                    return await loop.run_in_executor(executor, self.fetch_product, url)
+
+        logging.info(f"Паралельне завантаження {len(urls)} {self.label} "
+                     f"(потоків: {self.concurrency}, на хост: {self.per_host_concurrency})")
+        return await asyncio.gather(*(fetch(url) for url in urls), return_exceptions=True)
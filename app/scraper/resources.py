@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+from fnmatch import fnmatch
+from urllib.parse import urlsplit
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+# Шаблони Network.setBlockedURLs для типів ресурсів, які парсерам не потрібні
+RESOURCE_PATTERNS = {
+    "image": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "stylesheet": ["*.css*"],
+}
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+
+# Хости, з яких Amazon віддає саму сторінку і її скрипти; решта — реклама і трекери
+AMAZON_HOSTS = ("amazon.com", "*.amazon.com", "*.media-amazon.com", "*.ssl-images-amazon.com")
+DEFAULT_BLOCKED_HOSTS = ("*.amazon-adsystem.com", "*.doubleclick.net", "*.googlesyndication.com",
+                         "*.google-analytics.com")
+
+
+class ResourcePolicy:
+    """Політика блокування важких ресурсів у браузері.
+
+    blocked_types — типи ресурсів з RESOURCE_PATTERNS, що блокуються за шаблоном URL.
+    allowed_hosts — список дозволених хостів (шаблони fnmatch); якщо задано, решта хостів
+    не резолвиться зовсім (--host-resolver-rules). blocked_hosts блокуються завжди.
+    """
+
+    def __init__(self, blocked_types=DEFAULT_BLOCKED_TYPES, allowed_hosts=AMAZON_HOSTS,
+                 blocked_hosts=DEFAULT_BLOCKED_HOSTS, extra_patterns=()):
+        unknown = set(blocked_types) - set(RESOURCE_PATTERNS)
+        if unknown:
+            raise ValueError(f"Невідомі типи ресурсів: {', '.join(sorted(unknown))}")
+        self.blocked_types = tuple(blocked_types)
+        self.allowed_hosts = tuple(allowed_hosts) if allowed_hosts else None
+        self.blocked_hosts = tuple(blocked_hosts)
+        self.extra_patterns = tuple(extra_patterns)
+
+    @classmethod
+    def from_env(cls):
+        """SCRAPER_BLOCK_RESOURCES (типи через кому або "none") і SCRAPER_ALLOWED_HOSTS ("*" — усі хости)."""
+        types = os.environ.get("SCRAPER_BLOCK_RESOURCES")
+        hosts = os.environ.get("SCRAPER_ALLOWED_HOSTS")
+        kwargs = {}
+        if types is not None:
+            kwargs["blocked_types"] = [] if types.strip() == "none" else [t.strip() for t in types.split(",") if t.strip()]
+        if hosts is not None:
+            kwargs["allowed_hosts"] = None if hosts.strip() == "*" else [h.strip() for h in hosts.split(",") if h.strip()]
+        return cls(**kwargs)
+
+    @property
+    def enabled(self):
+        return bool(self.blocked_types or self.allowed_hosts or self.blocked_hosts or self.extra_patterns)
+
+    def blocked_urls(self):
+        patterns = [pattern for kind in self.blocked_types for pattern in RESOURCE_PATTERNS[kind]]
+        patterns.extend(f"*://{host}/*" for host in self.blocked_hosts)
+        patterns.extend(self.extra_patterns)
+        return patterns
+
+    def launch_arguments(self):
+        """Аргументи запуску Chromium, що діють на весь браузер, а не на окрему вкладку."""
+        arguments = [f"--blink-settings=imagesEnabled={'false' if 'image' in self.blocked_types else 'true'}"]
+        if self.allowed_hosts:
+            # Фікстурний сервер і дзеркала на localhost не мають ламатися від списку дозволених хостів
+            excluded = ", ".join(f"EXCLUDE {host}" for host in self.allowed_hosts + ("localhost",))
+            arguments.append(f"--host-resolver-rules=MAP * ~NOTFOUND, {excluded}")
+        return arguments
+
+    def apply(self, driver):
+        """Вмикає блокування шаблонів URL у поточній вкладці (CDP діє на одну ціль)."""
+        if not self.enabled:
+            return
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_urls()})
+
+    def is_allowed_host(self, host):
+        if any(fnmatch(host, pattern) for pattern in self.blocked_hosts):
+            return False
+        return self.allowed_hosts is None or host == "localhost" or any(
+            fnmatch(host, pattern) for pattern in self.allowed_hosts)
+
+    def is_blocked(self, url):
+        """Чи заблокує політика запит на url (для звітів і тестів)."""
+        if not self.is_allowed_host(urlsplit(url).hostname or ""):
+            return True
+        patterns = [pattern for kind in self.blocked_types for pattern in RESOURCE_PATTERNS[kind]]
+        return any(fnmatch(url, pattern) for pattern in patterns + list(self.extra_patterns))
+
+
+class ResourceSizes:
+    """Розміри завантажених ресурсів для оцінки трафіку, заощадженого блокуванням.
+
+    Заблокований ресурс не завантажується, тож його розмір невідомий: оцінкою є розмір того самого URL
+    з попереднього завантаження (до зміни політики, у прогоні без блокування), інакше — середній
+    розмір завантажених у цьому процесі ресурсів того самого типу (Script, Font, XHR...).
+    """
+
+    def __init__(self):
+        self._by_url = {}
+        self._by_type = {}
+        self._lock = threading.Lock()
+
+    def record(self, url, kind, size):
+        with self._lock:
+            self._by_url[url] = size
+            total, count = self._by_type.get(kind, (0, 0))
+            self._by_type[kind] = (total + size, count + 1)
+
+    def estimate(self, url, kind):
+        """Оцінка розміру ресурсу в байтах або None, якщо схожих ресурсів ще не завантажувалось."""
+        with self._lock:
+            if url in self._by_url:
+                return self._by_url[url]
+            total, count = self._by_type.get(kind, (0, 0))
+            return total // count if count else None
+
+
+resource_sizes = ResourceSizes()
+
+
+def collect_network_stats(log_entries, sizes=None):
+    """Підсумовує performance-лог ChromeDriver: запити, передані байти, заблоковані запити.
+
+    Блокування шаблоном дає Network.loadingFailed з blockedReason, блокування хоста —
+    net::ERR_NAME_NOT_RESOLVED. Якщо передано sizes (ResourceSizes), розміри завантажених ресурсів
+    (encodedDataLength, а без нього Content-Length відповіді) додаються до нього, а saved_bytes —
+    оцінка заощаджених байтів за заблокованими запитами; unestimated — заблоковані запити без оцінки.
+    """
+    stats = {"requests": 0, "bytes": 0, "blocked": 0, "saved_bytes": 0, "unestimated": 0}
+    # requestId -> (url, тип ресурсу); спершу збираються всі розміри сторінки, потім оцінюються заблоковані
+    requests, content_lengths, loaded, blocked = {}, {}, [], []
+    for entry in log_entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            stats["requests"] += 1
+            requests[params.get("requestId")] = (params.get("request", {}).get("url"), params.get("type", "Other"))
+        elif method == "Network.responseReceived":
+            headers = {name.lower(): value for name, value in params.get("response", {}).get("headers", {}).items()}
+            if str(headers.get("content-length", "")).isdigit():
+                content_lengths[params.get("requestId")] = int(headers["content-length"])
+        elif method == "Network.loadingFinished":
+            size = int(params.get("encodedDataLength", 0)) or content_lengths.get(params.get("requestId"), 0)
+            stats["bytes"] += size
+            loaded.append((params.get("requestId"), size))
+        elif method == "Network.loadingFailed" and (
+                params.get("blockedReason") or params.get("errorText") == "net::ERR_NAME_NOT_RESOLVED"):
+            stats["blocked"] += 1
+            blocked.append(params.get("requestId"))
+    if sizes is None:
+        stats["unestimated"] = stats["blocked"]
+        return stats
+    for request_id, size in loaded:
+        if request_id in requests and size:
+            sizes.record(*requests[request_id], size)
+    for request_id in blocked:
+        estimate = sizes.estimate(*requests[request_id]) if request_id in requests else None
+        if estimate is None:
+            stats["unestimated"] += 1
+        else:
+            stats["saved_bytes"] += estimate
+    return stats
+
+
+def log_page_stats(driver, url, sizes=resource_sizes):
+    """Забирає накопичений performance-лог і логує трафік сторінки; повертає статистику або None."""
+    try:
+        stats = collect_network_stats(driver.get_log("performance"), sizes)
+    except Exception as e:
+        logging.debug(f"Performance-лог недоступний: {e}")
+        return None
+    unestimated = f", розмір {stats['unestimated']} з них невідомий" if stats["unestimated"] else ""
+    logging.info(f"Трафік сторінки {url}: {stats['requests']} запитів, {stats['bytes'] / 1024:.0f} КБ, "
+                 f"заблоковано {stats['blocked']}, заощаджено ~{stats['saved_bytes'] / 1024:.0f} КБ{unestimated}")
+    return stats
@@ -0,0 +1,178 @@
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+
+class TokenBucket:
+    """Відро токенів з адаптивною швидкістю для одного хоста.
+
+    Токени можуть іти в мінус: це черга вже зарезервованих запитів, кожен наступний чекає довше.
+    """
+
+    def __init__(self, rate, burst, now):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+        self.successes = 0
+
+    def reserve(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateScheduler:
+    """Центральний планувальник ввічливості: темп запитів і паузи імітації людини.
+
+    rate — запитів на секунду до одного хоста (None — без обмеження), burst — розмір відра.
+    Після помилки або 503 швидкість хоста множиться на backoff (не нижче min_rate), після
+    recover_after успіхів поспіль — на recovery (не вище max_rate). Паузи delay() беруться
+    з профілю рушія, множаться на delay_scale і на сповільнення хоста (base_rate / rate),
+    тож при блокуваннях подовжуються, а після серії успіхів скорочуються.
+
+    rate і burst задано для одного потоку завантаження. set_parallelism() масштабує їх під кількість
+    одночасних запитів до хоста, якщо scale_with_parallelism (параметри не задано явно змінними середовища).
+    """
+
+    def __init__(self, rate=0.5, burst=1, min_rate=0.02, max_rate=None, backoff=0.5, recovery=1.25,
+                 recover_after=5, delay_scale=1.0, clock=time.monotonic, scale_with_parallelism=True):
+        self.rate = rate
+        self.burst = burst
+        self.parallelism = 1
+        self.scale_with_parallelism = scale_with_parallelism
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else (rate * 2 if rate else None)
+        self.backoff = backoff
+        self.recovery = recovery
+        self.recover_after = recover_after
+        self.delay_scale = delay_scale
+        self.clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Параметри зі змінних SCRAPER_RATE, SCRAPER_BURST і SCRAPER_DELAY_SCALE.
+
+        Явно задані SCRAPER_RATE або SCRAPER_BURST — сумарний темп до хоста, він не масштабується з concurrency.
+        """
+        rate = os.environ.get("SCRAPER_RATE")
+        burst = os.environ.get("SCRAPER_BURST")
+        return cls(rate=(float(rate) or None) if rate is not None else 0.5,
+                   burst=int(burst) if burst is not None else 1,
+                   delay_scale=float(os.environ.get("SCRAPER_DELAY_SCALE", 1.0)),
+                   scale_with_parallelism=rate is None and burst is None)
+
+    def set_parallelism(self, parallelism):
+        """Налаштовує відра під parallelism одночасних запитів до хоста (паралельні завантаження рушія http).
+
+        Кожен паралельний потік отримує власний темп rate: темп і розмір відра множаться на parallelism,
+        стан адаптації хостів (сповільнення після відмов) зберігається. Якщо параметри задано явно,
+        вони не змінюються, а паралельні запити понад burst чекатимуть спільного відра.
+        """
+        parallelism = max(1, parallelism)
+        if not self.rate or parallelism == self.parallelism:
+            return
+        if not self.scale_with_parallelism:
+            if parallelism > self.burst:
+                logging.warning(f"Паралельних завантажень {parallelism}, але SCRAPER_BURST={self.burst} і "
+                                f"SCRAPER_RATE={self.rate}/с обмежують усі запити до хоста разом: "
+                                f"завантаження чекатимуть одне одного")
+            return
+        factor = parallelism / self.parallelism
+        with self._lock:
+            added = max(0, round(self.burst * factor) - self.burst)
+            self.rate *= factor
+            self.max_rate *= factor
+            self.burst = max(1, round(self.burst * factor))
+            self.parallelism = parallelism
+            for bucket in self._buckets.values():
+                bucket.base_rate *= factor
+                bucket.rate *= factor
+                bucket.burst = self.burst
+                # Нові слоти доступні одразу, борг уже зарезервованих запитів лишається
+                bucket.tokens = min(bucket.tokens + added, bucket.burst)
+        logging.info(f"Темп запитів до хоста: {self.rate:g}/с, до {self.burst} одночасно "
+                     f"(паралельних завантажень: {parallelism})")
+
+    @staticmethod
+    def host_of(url):
+        return urlsplit(url).netloc or url
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst, self.clock())
+        return bucket
+
+    def reserve(self, url):
+        """Резервує запит до хоста url; повертає, скільки секунд треба почекати перед ним."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            return self._bucket(self.host_of(url)).reserve(self.clock())
+
+    def slowdown(self, url):
+        """Множник пауз для хоста: >1 після блокувань, <1 після серії успіхів."""
+        if not self.rate:
+            return 1.0
+        with self._lock:
+            bucket = self._bucket(self.host_of(url))
+            return bucket.base_rate / bucket.rate
+
+    def delay(self, url, delay_range):
+        """Тривалість паузи з діапазону профілю з урахуванням налаштувань і стану хоста."""
+        low, high = delay_range
+        return random.uniform(low, high) * self.delay_scale * self.slowdown(url)
+
+    def record_success(self, url):
+        if not self.rate:
+            return
+        with self._lock:
+            bucket = self._bucket(self.host_of(url))
+            bucket.successes += 1
+            if bucket.successes >= self.recover_after and bucket.rate < self.max_rate:
+                bucket.rate = min(self.max_rate, bucket.rate * self.recovery)
+                bucket.successes = 0
+                logging.debug(f"Темп запитів до {self.host_of(url)} збільшено до {bucket.rate:.3f}/с")
+
+    def record_failure(self, url, status=None):
+        if not self.rate:
+            return
+        with self._lock:
+            bucket = self._bucket(self.host_of(url))
+            bucket.successes = 0
+            bucket.rate = max(self.min_rate, bucket.rate * self.backoff)
+            # Відро спорожнюється, щоб наступний запит не пішов одразу після відмови
+            bucket.tokens = min(bucket.tokens, 0)
+        logging.warning(f"Відмова {self.host_of(url)}{f' ({status})' if status else ''}: "
+                        f"темп запитів зменшено до {bucket.rate:.3f}/с")
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_default_scheduler():
+    """Спільний для процесу планувальник: темп до хоста враховує всі задачі скрапінгу."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RateScheduler.from_env()
+        return _default_scheduler
@@ -0,0 +1,94 @@
+# app/tests/test_analytics.py
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+from app.analytics import get_analytics, analytics_cache
+from app.database import ProductWriter, save_to_db, dispose_engines
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "test.db")
+        self.clock = FakeClock()
+        analytics_cache.clock = self.clock
+
+    def tearDown(self):
+        analytics_cache.clear()
+        analytics_cache.clock = time.monotonic
+        dispose_engines()
+        self.tmpdir.cleanup()
+
+    def test_empty_database(self):
+        analytics = get_analytics(self.db_path)
+        self.assertEqual(analytics["top_by_rating"], [])
+        self.assertIsNone(analytics["max_discount_product"])
+
+    def test_matches_python_reference(self):
+        products = [
+            {"asin": f"B{i:09d}", "title": f"Product {i}", "price": [0.0, 9.99, 20.0, 150.0, 999.0][i % 5],
+             "original_price": [0.0, 19.99, 20.0, 180.0, 1200.0][i % 5], "rating": [3.5, 4.0, 4.5, 5.0][i % 4],
+             "reviews": i * 3}
+            for i in range(40)
+        ]
+        with ProductWriter(self.db_path) as writer:
+            for product in products:
+                writer.add(product)
+
+        analytics = get_analytics(self.db_path)
+        high_rated = [p for p in products if p["rating"] >= 4.0]
+        self.assertEqual(analytics["avg_price"], round(np.mean([p["price"] for p in high_rated]), 2))
+        self.assertEqual(analytics["avg_reviews"], round(np.mean([p["reviews"] for p in high_rated]), 0))
+        self.assertEqual(analytics["max_discount"], 201.0)
+        self.assertEqual(analytics["max_discount_product"]["asin"], "B000000004")
+        self.assertEqual([p["asin"] for p in analytics["top_by_rating"]], ["B000000003", "B000000007", "B000000011"])
+        self.assertEqual([p["asin"] for p in analytics["top_by_price"]], ["B000000000", "B000000005", "B000000010"])
+
+        hist, _ = np.histogram([p["price"] for p in products if p["price"] > 0], bins=10)
+        self.assertEqual(analytics["price_distribution"]["values"], hist.tolist())
+
+    def test_cache_is_invalidated_by_writes(self):
+        save_to_db({"asin": "B000000001", "price": 10.0, "rating": 4.5}, self.db_path)
+        first = get_analytics(self.db_path)
+        self.assertEqual(get_analytics(self.db_path), first)
+        self.assertEqual((analytics_cache.hits, analytics_cache.misses), (1, 1))
+
+        # Одразу після запису віддається попередній знімок, після refresh_interval він перераховується у фоні
+        save_to_db({"asin": "B000000002", "price": 30.0, "rating": 4.5}, self.db_path)
+        self.assertEqual(get_analytics(self.db_path)["avg_price"], 10.0)
+        self.clock.now += analytics_cache.refresh_interval
+        self.assertEqual(get_analytics(self.db_path)["avg_price"], 10.0)
+        analytics_cache.join()
+        self.assertEqual(get_analytics(self.db_path)["avg_price"], 20.0)
+        self.assertEqual((analytics_cache.hits, analytics_cache.stale_hits, analytics_cache.misses), (2, 2, 2))
+
+        # Знімок, старший за max_staleness, не віддається: аналітика рахується одразу
+        save_to_db({"asin": "B000000003", "price": 50.0, "rating": 4.5}, self.db_path)
+        self.clock.now += analytics_cache.max_staleness
+        self.assertEqual(get_analytics(self.db_path)["avg_price"], 30.0)
+        self.assertEqual(analytics_cache.misses, 3)
+
+    def test_polls_during_writes_share_recomputes(self):
+        with ProductWriter(self.db_path) as writer:
+            for i in range(50):
+                writer.add({"asin": f"B{i:09d}", "price": 10.0, "rating": 4.5})
+                writer.flush()
+                get_analytics(self.db_path)
+                self.clock.now += 0.1
+        analytics_cache.join()
+        # 50 запитів за 5 секунд запису: перерахунок не частіше ніж раз на refresh_interval
+        self.assertLessEqual(analytics_cache.misses, 6)
+        self.assertGreaterEqual(analytics_cache.stale_hits, 40)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+# app/tests/test_database.py
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from app import database
+from app.database import (init_db, get_engine, save_to_db, get_products, count_products, clear_db, dispose_engines,
+                          ProductWriter, SCHEMA_VERSION, iter_csv_chunks, export_to_csv, get_data_version,
+                          FreshnessIndex)
+
+
+def init_db_after_barrier(db_path, barrier, results):
+    barrier.wait()
+    try:
+        init_db(db_path)
+        results.put("ok")
+    except Exception as e:
+        results.put(str(e))
+
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "test.db")
+
+    def tearDown(self):
+        dispose_engines()
+        self.tmpdir.cleanup()
+
+    def test_engine_is_shared_per_path(self):
+        relative = os.path.relpath(self.db_path)
+        self.assertIs(get_engine(self.db_path), get_engine(relative))
+        self.assertEqual(init_db(relative), self.db_path)
+
+    def test_legacy_database_is_migrated_in_place(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE products (asin TEXT PRIMARY KEY, title TEXT, price REAL, original_price REAL, "
+                     "rating REAL, reviews INTEGER, delivery TEXT, seller TEXT, url TEXT)")
+        conn.execute("INSERT INTO products (asin, title, price, rating, reviews) VALUES ('B1', 'Old', 10, 4.2, 3)")
+        conn.commit()
+        conn.close()
+
+        init_db(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        plan = " ".join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT asin FROM products WHERE rating >= 4.0"))
+        self.assertIn("idx_products_rating", plan)
+        conn.close()
+        self.assertEqual([p.title for p in get_products(self.db_path)], ["Old"])
+
+    def test_concurrent_init_on_fresh_file(self):
+        # Веб-застосунок і воркери ініціалізують одну базу одночасно
+        context = multiprocessing.get_context("spawn")
+        barrier, results = context.Barrier(4), context.Queue()
+        processes = [context.Process(target=init_db_after_barrier, args=(self.db_path, barrier, results))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        outcomes = [results.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join()
+        self.assertEqual(outcomes, ["ok"] * 4)
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+        conn.close()
+
+    def test_failed_migration_is_rolled_back(self):
+        init_db(self.db_path)
+        dispose_engines()
+        broken = database.MIGRATIONS + [(SCHEMA_VERSION + 1, "зламана міграція", [
+            "ALTER TABLE products ADD COLUMN extra TEXT",
+            "ALTER TABLE no_such_table ADD COLUMN extra TEXT",
+        ])]
+        with mock.patch.object(database, "MIGRATIONS", broken), \
+                mock.patch.object(database, "SCHEMA_VERSION", SCHEMA_VERSION + 1):
+            with self.assertRaises(Exception):
+                init_db(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+        self.assertNotIn("extra", [row[1] for row in conn.execute("PRAGMA table_info(products)")])
+        conn.close()
+
+    def test_save_get_and_clear(self):
+        save_to_db({"asin": "B000000001", "title": "Laptop", "price": 999.99, "rating": 4.5, "reviews": 10},
+                   self.db_path)
+        products = get_products(self.db_path, min_rating=4.0)
+        self.assertEqual([p.asin for p in products], ["B000000001"])
+        clear_db(self.db_path)
+        self.assertEqual(get_products(self.db_path), [])
+
+    def test_product_writer_batches_and_flushes_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with ProductWriter(self.db_path, batch_size=2) as writer:
+                for i in range(3):
+                    writer.add({"asin": f"B00000000{i}", "title": f"Product {i}"})
+                self.assertEqual(len(writer), 1)
+                self.assertEqual(len(get_products(self.db_path)), 2)
+                raise RuntimeError("Скрапінг скасовано")
+        self.assertEqual(len(get_products(self.db_path)), 3)
+        self.assertEqual(writer.total_written, 3)
+
+    def test_pagination_and_count(self):
+        with ProductWriter(self.db_path) as writer:
+            for i in range(25):
+                writer.add({"asin": f"B{i:09d}", "price": float(i % 5), "rating": 4.0 + (i % 2) / 2})
+        self.assertEqual(count_products(self.db_path), 25)
+        self.assertEqual(count_products(self.db_path, min_rating=4.5), 12)
+
+        page = get_products(self.db_path, limit=10, offset=10)
+        self.assertEqual([p.asin for p in page], [f"B{i:09d}" for i in range(10, 20)])
+        after = get_products(self.db_path, limit=10, after=(page[-1].asin,))
+        self.assertEqual([p.asin for p in after], [f"B{i:09d}" for i in range(20, 25)])
+
+        by_price = get_products(self.db_path, order_by="-price", limit=7)
+        rest = get_products(self.db_path, order_by="-price", limit=100, after=(by_price[-1].price, by_price[-1].asin))
+        combined = by_price + rest
+        self.assertEqual(len({p.asin for p in combined}), 25)
+        self.assertEqual([p.price for p in combined], sorted((p.price for p in combined), reverse=True))
+
+    def test_card_refresh_and_freshness_index(self):
+        with ProductWriter(self.db_path) as writer:
+            writer.add({"asin": "B1", "title": "Laptop", "price": 999.0, "rating": 4.5, "reviews": 10,
+                        "seller": "Shop"}, scraped_at=1000.0)
+            writer.add({"asin": "B2", "title": "Old laptop", "price": 500.0}, scraped_at=100.0)
+            writer.add({"asin": "B3", "title": "Card only", "price": 10.0})
+        version = get_data_version(self.db_path)
+
+        with ProductWriter(self.db_path) as writer:
+            writer.refresh({"asin": "B1", "price": 999.0, "rating": 4.5, "reviews": 10})
+        # Незмінена картка не перезаписує рядок і не скидає кеші аналітики
+        self.assertEqual(get_data_version(self.db_path), version)
+
+        with ProductWriter(self.db_path) as writer:
+            writer.refresh({"asin": "B1", "price": 949.0, "rating": 0.0, "reviews": 12})
+        product = get_products(self.db_path, max_price=950.0, min_rating=4.0)[0]
+        self.assertEqual((product.asin, product.price, product.rating, product.reviews, product.seller),
+                         ("B1", 949.0, 4.5, 12, "Shop"))
+        self.assertGreater(get_data_version(self.db_path), version)
+
+        index = FreshnessIndex(self.db_path, ttl=600, clock=lambda: 1200.0)
+        index.BATCH = 2
+        self.assertEqual(index.fresh(["B1", "B2", "B3", "B9", "B1"]), {"B1"})
+        self.assertTrue(index.is_fresh("B1"))
+        self.assertFalse(index.is_fresh("B2"))
+        self.assertFalse(index.is_fresh("B3"))
+        index.add("B3", 1200.0)
+        self.assertTrue(index.is_fresh("B3"))
+        self.assertEqual(FreshnessIndex(self.db_path, ttl=0).fresh(["B1"]), set())
+
+    def test_save_to_db_marks_fetched_products_fresh(self):
+        save_to_db({"asin": "B1", "title": "Laptop", "price": 999.0}, self.db_path)
+        save_to_db({"asin": "B2", "price": 10.0}, self.db_path)
+        save_to_db({"asin": "B3", "title": "Mouse"}, self.db_path, scraped_at=None)
+        index = FreshnessIndex(self.db_path, ttl=600)
+        self.assertEqual(index.fresh(["B1", "B2", "B3"]), {"B1"})
+
+    def test_streaming_csv_matches_pandas_export(self):
+        with ProductWriter(self.db_path) as writer:
+            for i in range(7):
+                writer.add({"asin": f"B{i:09d}", "title": f'Laptop, 15" model {i}', "price": i * 10.5,
+                            "rating": 4.5, "reviews": i})
+        chunks = list(iter_csv_chunks(self.db_path, min_reviews=2, chunk_size=2))
+        self.assertEqual(len(chunks), 1 + 3)
+
+        expected = pd.DataFrame(get_products(self.db_path, min_reviews=2)).to_csv(index=False, lineterminator="\n")
+        self.assertEqual(b"".join(chunks).decode("utf-8"), expected)
+
+        csv_file = os.path.join(self.tmpdir.name, "export.csv")
+        self.assertEqual(export_to_csv(db_path=self.db_path, csv_file=csv_file, chunk_size=3, min_reviews=2), csv_file)
+        with open(csv_file, encoding="utf-8") as f:
+            self.assertEqual(f.read(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
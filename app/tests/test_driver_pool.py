@@ -0,0 +1,124 @@
+# app/tests/test_driver_pool.py
+import os
+import tempfile
+import threading
+import unittest
+from app.scraper.driver_pool import DriverPool, PooledDriver
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current = handle
+
+
+class FakeDriver:
+    """Мінімальна імітація WebDriver: вкладки, URL і журнал CDP-команд."""
+
+    def __init__(self):
+        self.window_handles = ["main"]
+        self.current = "main"
+        self.urls = {"main": "about:blank"}
+        self.cdp = []
+        self.alive = True
+        self.quit_called = False
+        self.switch_to = FakeSwitchTo(self)
+
+    @property
+    def current_url(self):
+        return self.urls[self.current]
+
+    def open_tab(self, url):
+        handle = f"tab{len(self.window_handles)}"
+        self.window_handles.append(handle)
+        self.urls[handle] = url
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("chrome not reachable")
+        return 1
+
+    def execute_cdp_cmd(self, command, params):
+        self.cdp.append((command, params))
+
+    def close(self):
+        self.window_handles.remove(self.current)
+
+    def get(self, url):
+        self.urls[self.current] = url
+
+    def set_window_size(self, width, height):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+class TestDriverPool(unittest.TestCase):
+    def setUp(self):
+        self.launched = []
+
+    def launcher(self):
+        driver = FakeDriver()
+        self.launched.append(driver)
+        return PooledDriver(driver, tempfile.mkdtemp())
+
+    def test_reuses_and_resets_driver(self):
+        pool = DriverPool(size=1, max_leases=10, launcher=self.launcher)
+        with pool.lease(user_agent="UA-1") as driver:
+            driver.get("https://www.amazon.com/s?k=laptop")
+            driver.open_tab("https://www.amazon.com/dp/B0TEST0001")
+        self.assertEqual(driver.window_handles, ["main"])
+        self.assertIn(("Network.clearBrowserCookies", {}), driver.cdp)
+        self.assertIn(("Storage.clearDataForOrigin", {"origin": "https://www.amazon.com", "storageTypes": "all"}),
+                      driver.cdp)
+        with pool.lease(user_agent="UA-2") as second:
+            self.assertIs(second, driver)
+        self.assertIn(("Network.setUserAgentOverride", {"userAgent": "UA-2"}), driver.cdp)
+        self.assertEqual(len(self.launched), 1)
+
+    def test_recycles_after_max_leases_and_unhealthy(self):
+        pool = DriverPool(size=1, max_leases=2, launcher=self.launcher)
+        for _ in range(2):
+            with pool.lease():
+                pass
+        self.assertTrue(self.launched[0].quit_called)
+        with pool.lease():
+            pass
+        self.launched[1].alive = False
+        with pool.lease() as driver:
+            self.assertIs(driver, self.launched[2])
+        self.assertTrue(self.launched[1].quit_called)
+
+    def test_size_caps_instances(self):
+        pool = DriverPool(size=1, launcher=self.launcher)
+        pool.warm()
+        pool.warm()
+        self.assertEqual(pool.stats()["idle"], 1)
+        leased = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with pool.lease():
+                leased.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        leased.wait()
+        with self.assertRaises(TimeoutError):
+            with pool.lease(timeout=0.05):
+                pass
+        release.set()
+        holder.join()
+        self.assertEqual(len(self.launched), 1)
+        profile_dir = pool._idle[0].profile_dir
+        pool.close()
+        self.assertTrue(self.launched[0].quit_called)
+        self.assertFalse(os.path.exists(profile_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+# app/tests/test_events.py
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from app.database import dispose_engines
+from app.events import EventBus, EventRelay, EventStore, PAGE, PRODUCT, RETRY, FINISHED
+
+
+class TestEventBus(unittest.TestCase):
+    def test_coalesces_progress_updates(self):
+        bus = EventBus()
+        subscription = bus.subscribe("job-1")
+        for i in range(1, 6):
+            bus.publish("job-1", PRODUCT, total_products=i)
+        bus.publish("job-1", RETRY, attempt=2)
+        bus.publish("job-1", RETRY, attempt=3)
+        bus.publish("job-1", PAGE, current_page=2, total_products=5)
+        events = subscription.drain()
+        self.assertEqual([event["type"] for event in events], [PRODUCT, RETRY, RETRY, PAGE])
+        self.assertEqual(events[0]["total_products"], 5)
+        self.assertEqual(subscription.drain(), [])
+
+    def test_filters_by_topic(self):
+        bus = EventBus()
+        own, every = bus.subscribe("job-1"), bus.subscribe()
+        bus.publish("job-1", RETRY, attempt=2)
+        bus.publish("job-2", RETRY, attempt=2)
+        self.assertEqual([event.get("task_id") for event in own.drain()], [None])
+        self.assertEqual([event["task_id"] for event in every.drain()], ["job-1", "job-2"])
+        own.close()
+        every.close()
+        self.assertFalse(bus.has_subscribers)
+
+    def test_drops_oldest_progress_for_slow_subscriber(self):
+        bus = EventBus(max_pending=3)
+        subscription = bus.subscribe()
+        for job in range(5):
+            bus.publish(f"job-{job}", PAGE, current_page=1)
+        self.assertEqual(subscription.dropped, 2)
+        self.assertEqual([event["task_id"] for event in subscription.drain()], ["job-2", "job-3", "job-4"])
+
+    def test_overflow_keeps_terminal_events(self):
+        bus = EventBus(max_pending=3)
+        subscription = bus.subscribe()
+        bus.publish("job-0", FINISHED, status="completed")
+        bus.publish("job-0", RETRY, attempt=2)
+        for job in range(1, 10):
+            bus.publish(f"job-{job}", PRODUCT, total_products=job)
+            bus.publish(f"job-{job}", FINISHED, status="completed")
+        events = subscription.drain()
+        self.assertEqual(subscription.dropped, 9)
+        self.assertEqual([(event["task_id"], event["type"]) for event in events],
+                         [("job-0", FINISHED), ("job-0", RETRY)] + [(f"job-{job}", FINISHED) for job in range(1, 10)])
+
+    def test_get_waits_for_publisher_thread(self):
+        bus = EventBus()
+        subscription = bus.subscribe("job-1")
+        threading.Timer(0.05, bus.publish, ("job-1", FINISHED)).start()
+        self.assertEqual([event["type"] for event in subscription.get(5)], [FINISHED])
+        self.assertEqual(subscription.get(0.01), [])
+
+    def test_next_batch_from_event_loop(self):
+        bus = EventBus()
+
+        async def consume():
+            with bus.subscribe("job-1") as subscription:
+                self.assertEqual(await subscription.next_batch(0.01), [])
+                threading.Timer(0.05, bus.publish, ("job-1", PAGE), {"current_page": 1}).start()
+                return await subscription.next_batch(5)
+
+        events = asyncio.run(consume())
+        self.assertEqual([(event["type"], event["current_page"]) for event in events], [(PAGE, 1)])
+        self.assertFalse(bus.has_subscribers)
+
+
+class TestEventRelay(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = EventStore(os.path.join(self.tmpdir.name, "test.db"))
+
+    def tearDown(self):
+        dispose_engines()
+        self.tmpdir.cleanup()
+
+    def test_relays_new_events_to_subscribers(self):
+        # Події, записані до появи підписників, не передаються
+        self.store.append("job-1", [{"type": PAGE, "time": time.time(), "current_page": 1}])
+        bus = EventBus()
+        relay = EventRelay(bus, self.store, poll_interval=0.01)
+        relay.start()
+        try:
+            subscription = bus.subscribe("job-1")
+            self.store.append("job-2", [{"type": PAGE, "time": time.time(), "current_page": 1}])
+            self.store.append("job-1", [{"type": PAGE, "time": time.time(), "current_page": 2},
+                                        {"type": FINISHED, "time": time.time(), "status": "completed"}])
+            events = []
+            deadline = time.time() + 5
+            while len(events) < 2 and time.time() < deadline:
+                events += subscription.get(0.1)
+        finally:
+            relay.stop()
+        self.assertEqual([(event["type"], event.get("current_page")) for event in events],
+                         [(PAGE, 2), (FINISHED, None)])
+
+    def test_event_right_after_subscribe_is_not_lost(self):
+        bus = EventBus()
+        relay = EventRelay(bus, self.store, poll_interval=0.01)
+        relay.start()
+        try:
+            for attempt in range(20):
+                # Без підписників реле лише пересуває позицію журналу
+                time.sleep(0.02)
+                subscription = bus.subscribe(f"job-{attempt}")
+                self.store.append(f"job-{attempt}", [{"type": FINISHED, "time": time.time(), "status": "completed"}])
+                events = subscription.get(5)
+                subscription.close()
+                self.assertEqual([event["type"] for event in events], [FINISHED])
+        finally:
+            relay.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+# app/tests/test_exporters.py
+import io
+import json
+import os
+import tempfile
+import unittest
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.database import ProductWriter, get_products, dispose_engines
+from app.exporters import iter_parquet_chunks, iter_arrow_chunks, iter_export_chunks
+
+
+class TestExporters(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "test.db")
+        with ProductWriter(self.db_path) as writer:
+            for i in range(10):
+                writer.add({"asin": f"B{i:09d}", "title": f"Product {i}", "price": i * 1.5, "rating": 4.0,
+                            "reviews": i, "seller": ["Amazon.com", "Other"][i % 2], "delivery": "FREE"})
+        self.expected = [p._asdict() for p in get_products(self.db_path)]
+
+    def tearDown(self):
+        dispose_engines()
+        self.tmpdir.cleanup()
+
+    def test_parquet_row_groups_and_types(self):
+        data = b"".join(iter_parquet_chunks(self.db_path, row_group_size=4))
+        parquet_file = pq.ParquetFile(io.BytesIO(data))
+        self.assertEqual(parquet_file.num_row_groups, 3)
+        table = parquet_file.read()
+        self.assertTrue(pa.types.is_dictionary(table.schema.field("seller").type))
+        self.assertEqual(table.schema.field("reviews").type, pa.int64())
+        self.assertEqual(table.to_pylist(), self.expected)
+
+    def test_arrow_stream_round_trip(self):
+        data = b"".join(iter_arrow_chunks(self.db_path, chunk_size=3, min_reviews=5))
+        table = pa.ipc.open_stream(data).read_all()
+        self.assertEqual(table.to_pylist(), [p for p in self.expected if p["reviews"] >= 5])
+
+    def test_ndjson(self):
+        lines = b"".join(iter_export_chunks("ndjson", self.db_path)).decode("utf-8").splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
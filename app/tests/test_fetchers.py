@@ -0,0 +1,388 @@
+# app/tests/test_fetchers.py
+import gzip
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from selenium.common.exceptions import TimeoutException
+from sqlalchemy import text
+from app.database import get_engine, get_products, clear_db, dispose_engines
+from app.frontier import CrawlFrontier
+from app.scraper.amazon_scraper import AmazonScraper
+from app.scraper.batch import BatchScraper
+from app.scraper.fetchers import (HttpFetcher, SeleniumFetcher, PageSnapshot, CaptchaError, NoMorePagesError,
+                                  search_url)
+from app.scraper.page_cache import PageCache
+from app.scraper.parsing_engine import ParsingEngine
+from app.scraper.scheduler import RateScheduler
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Віддає фікстури замість Amazon; стискає відповідь gzip, якщо клієнт це підтримує."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.client_ports.append(self.client_address[1])
+        self.server.paths.append(self.path)
+        # Імітація затримки відповіді Amazon для тестів паралельного завантаження
+        time.sleep(self.server.delay)
+        if self.path.startswith("/s?") and "page=" not in self.path:
+            body = read_fixture("search_results.html")
+        elif self.path.startswith("/s?"):
+            body = "<html><body>No results</body></html>"
+        elif "B0TEST0001" in self.path:
+            body = read_fixture("product_page.html")
+        elif "B0TEST0002" in self.path:
+            body = read_fixture("unavailable_product_page.html")
+        elif self.path == "/captcha":
+            body = "<html><body>Enter the characters you see below (captcha)</body></html>"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpFetcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        cls.server.client_ports = []
+        cls.server.paths = []
+        cls.server.delay = 0
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.client_ports.clear()
+        self.server.paths.clear()
+
+    def make_fetcher(self):
+        return HttpFetcher(base_url=self.base_url, scheduler=RateScheduler(rate=None, delay_scale=0))
+
+    def test_search_url(self):
+        self.assertEqual(search_url("gaming laptop"), "https://www.amazon.com/s?k=gaming+laptop")
+        self.assertEqual(search_url("laptop", 3, "http://localhost/"), "http://localhost/s?k=laptop&page=3")
+
+    def test_connection_reused(self):
+        with self.make_fetcher() as fetcher:
+            html = fetcher.fetch_search_page("laptop", 1)
+            product_html, buying_options_html = fetcher.fetch_product_page(
+                "https://www.amazon.com/Test-Laptop-15/dp/B0TEST0001/ref=sr_1_1")
+            with self.assertRaises(NoMorePagesError):
+                fetcher.fetch_search_page("laptop", 2)
+            with self.assertRaises(CaptchaError):
+                fetcher.get(self.base_url + "/captcha")
+        self.assertIn("B0TEST0001", html)
+        self.assertIn("TestSeller LLC", product_html)
+        self.assertIsNone(buying_options_html)
+        # Усі запити пішли одним keep-alive з'єднанням
+        self.assertEqual(len(self.server.client_ports), 4)
+        self.assertEqual(len(set(self.server.client_ports)), 1)
+
+    def test_scraper_with_http_engine(self):
+        with tempfile.TemporaryDirectory() as tmpdir, ParsingEngine(max_workers=0) as engine:
+            db_path = os.path.join(tmpdir, "test.db")
+            scraper = AmazonScraper(query="laptop", pages=2, db_path=db_path, parse_engine=engine,
+                                    fetch_engine=self.make_fetcher())
+            scraper.run()
+            products = {product.asin: product for product in get_products(db_path)}
+        self.assertEqual(sorted(products), ["B0TEST0001", "B0TEST0002", "B0TEST0003"])
+        self.assertEqual(products["B0TEST0001"].price, 949.0)
+        self.assertEqual(products["B0TEST0001"].seller, "TestSeller LLC")
+        self.assertEqual(scraper.current_page, 2)
+
+    def test_scraper_with_concurrent_product_pages(self):
+        with tempfile.TemporaryDirectory() as tmpdir, ParsingEngine(max_workers=0) as engine:
+            db_path = os.path.join(tmpdir, "test.db")
+            scraper = AmazonScraper(query="laptop", pages=1, db_path=db_path, parse_engine=engine,
+                                    fetch_engine=self.make_fetcher(), concurrency=3)
+            scraper.run()
+            products = get_products(db_path)
+        self.assertEqual(sorted(product.asin for product in products), ["B0TEST0001", "B0TEST0002", "B0TEST0003"])
+        self.assertEqual([product.price for product in products if product.asin == "B0TEST0001"], [949.0])
+
+    def test_concurrency_speeds_up_at_default_rate(self):
+        urls = [f"https://www.amazon.com/Test-Laptop-{i}/dp/B0TEST0001" for i in range(4)]
+
+        def fetch_time(concurrency):
+            # Типові SCRAPER_RATE і SCRAPER_BURST, без людських пауз
+            fetcher = HttpFetcher(base_url=self.base_url, scheduler=RateScheduler(delay_scale=0))
+            scraper = AmazonScraper(query="laptop", pages=1, db_path=db_path, parse_engine=engine,
+                                    fetch_engine=fetcher, concurrency=concurrency)
+            fetcher.open()
+            started = time.monotonic()
+            if scraper.pipeline is None:
+                results = [scraper._fetch_product(urls[0])]
+            else:
+                results = scraper.pipeline.run(urls)
+            elapsed = time.monotonic() - started
+            fetcher.close()
+            self.assertTrue(all(result["title"] != "N/A" for result in results))
+            return elapsed
+
+        self.server.delay = 0.3
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir, ParsingEngine(max_workers=0) as engine:
+                db_path = os.path.join(tmpdir, "test.db")
+                single = fetch_time(1)
+                parallel = fetch_time(len(urls))
+        finally:
+            self.server.delay = 0
+        self.assertLess(parallel, len(urls) * single)
+
+    def test_scraper_prefetches_search_pages_by_url(self):
+        with tempfile.TemporaryDirectory() as tmpdir, ParsingEngine(max_workers=0) as engine:
+            db_path = os.path.join(tmpdir, "test.db")
+            scraper = AmazonScraper(query="laptop", pages=4, db_path=db_path, parse_engine=engine,
+                                    fetch_engine=self.make_fetcher(), concurrency=4)
+            scraper.run()
+            frontier = CrawlFrontier("laptop", 4, db_path)
+            states = [frontier.page_state(page) for page in range(1, 5)]
+            products = get_products(db_path)
+        # Усі сторінки вікна завантажено одразу за прямими URL, без послідовних переходів
+        search_paths = sorted(path for path in self.server.paths if path.startswith("/s?"))
+        self.assertEqual(search_paths, ["/s?k=laptop", "/s?k=laptop&page=2", "/s?k=laptop&page=3",
+                                        "/s?k=laptop&page=4"])
+        self.assertEqual(states, ["done", "missing", "missing", "missing"])
+        self.assertEqual(sorted(product.asin for product in products), ["B0TEST0001", "B0TEST0002", "B0TEST0003"])
+
+    def test_batch_shares_fetcher_and_dedupes_products(self):
+        with tempfile.TemporaryDirectory() as tmpdir, ParsingEngine(max_workers=0) as engine:
+            db_path = os.path.join(tmpdir, "test.db")
+            batch = BatchScraper([("gaming laptop", 5), ("laptop", 0)], pages=1, db_path=db_path,
+                                 parse_engine=engine, fetch_engine=self.make_fetcher(), freshness_ttl=0)
+            results = batch.run()
+            with get_engine(db_path).connect() as connection:
+                links = connection.execute(text("SELECT query, asin FROM query_products ORDER BY query, asin")).fetchall()
+        self.assertEqual(results, {"gaming laptop": 3, "laptop": 3})
+        # Сторінки товарів завантажено один раз на пакет, усе — одним keep-alive з'єднанням
+        self.assertEqual(self.server.paths[0], "/s?k=gaming+laptop")
+        self.assertEqual(len([path for path in self.server.paths if not path.startswith("/s?")]), 2)
+        self.assertEqual(len(set(self.server.client_ports)), 1)
+        self.assertEqual([tuple(link) for link in links],
+                         [(query, asin) for query in ("gaming laptop", "laptop")
+                          for asin in ("B0TEST0001", "B0TEST0002", "B0TEST0003")])
+
+    def test_scraper_skips_fresh_products(self):
+        with tempfile.TemporaryDirectory() as tmpdir, ParsingEngine(max_workers=0) as engine:
+            db_path = os.path.join(tmpdir, "test.db")
+            AmazonScraper(query="laptop", pages=1, db_path=db_path, parse_engine=engine,
+                          fetch_engine=self.make_fetcher()).run()
+            self.server.paths.clear()
+            scraper = AmazonScraper(query="gaming laptop", pages=1, db_path=db_path, parse_engine=engine,
+                                    fetch_engine=self.make_fetcher())
+            scraper.run()
+            self.assertEqual(self.server.paths, ["/s?k=gaming+laptop"])
+            self.assertEqual(scraper.total_products, 3)
+
+            self.server.paths.clear()
+            AmazonScraper(query="notebook", pages=1, db_path=db_path, parse_engine=engine,
+                          fetch_engine=self.make_fetcher(), freshness_ttl=0).run()
+            self.assertEqual(len(self.server.paths), 3)
+            products = {product.asin: product for product in get_products(db_path)}
+        self.assertEqual(products["B0TEST0001"].seller, "TestSeller LLC")
+
+    def test_scraper_replays_from_page_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir, ParsingEngine(max_workers=0) as engine:
+            db_path = os.path.join(tmpdir, "test.db")
+            cache = PageCache(os.path.join(tmpdir, "cache"))
+            fetcher = self.make_fetcher()
+            fetcher.page_cache = cache
+            AmazonScraper(query="laptop", pages=2, db_path=db_path, parse_engine=engine, fetch_engine=fetcher).run()
+            expected = get_products(db_path)
+            clear_db(db_path)
+
+            self.server.paths.clear()
+            scraper = AmazonScraper(query="laptop", pages=2, db_path=db_path, parse_engine=engine,
+                                    fetch_engine="cache", page_cache=cache)
+            scraper.run()
+            self.assertEqual(self.server.paths, [])
+            self.assertEqual(get_products(db_path), expected)
+
+    def test_scraper_resumes_from_frontier(self):
+        with tempfile.TemporaryDirectory() as tmpdir, ParsingEngine(max_workers=0) as engine:
+            db_path = os.path.join(tmpdir, "test.db")
+            fetcher = self.make_fetcher()
+            scraper = AmazonScraper(query="laptop", pages=2, db_path=db_path, parse_engine=engine,
+                                    fetch_engine=fetcher)
+            fetch_product_page = fetcher.fetch_product_page
+
+            def fetch_then_cancel(url, wants_buying_options=None):
+                # Скасування одразу після першого товару
+                result = fetch_product_page(url, wants_buying_options)
+                scraper.cancel()
+                return result
+
+            fetcher.fetch_product_page = fetch_then_cancel
+            with self.assertRaises(Exception):
+                scraper.run(max_retries=1)
+            self.assertEqual([product.asin for product in get_products(db_path)], ["B0TEST0001"])
+
+            self.server.paths.clear()
+            resumed = AmazonScraper(query="Laptop ", pages=2, db_path=db_path, parse_engine=engine,
+                                    fetch_engine=self.make_fetcher())
+            resumed.run()
+            products = get_products(db_path)
+        self.assertEqual(sorted(product.asin for product in products), ["B0TEST0001", "B0TEST0002", "B0TEST0003"])
+        # Перша сторінка результатів і вже збережений товар повторно не завантажуються
+        self.assertEqual(len(self.server.paths), 2)
+        self.assertIn("B0TEST0002", self.server.paths[0])
+        self.assertIn("page=2", self.server.paths[1])
+
+
+class FakeDriver:
+    """Браузер, що віддає сторінки pages по черзі при кожному оновленні і рахує серіалізації DOM."""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.current_url = "https://www.amazon.com/"
+        self.page_source_calls = 0
+
+    @property
+    def page_source(self):
+        self.page_source_calls += 1
+        return self.pages[0]
+
+    def refresh(self):
+        self.pages.pop(0)
+
+    def execute_cdp_cmd(self, command, params):
+        pass
+
+    def delete_all_cookies(self):
+        pass
+
+
+class ScriptedSeleniumFetcher(SeleniumFetcher):
+    """SeleniumFetcher, що записує кроки навігації замість дій у браузері."""
+
+    def __init__(self, direct_fails=False, **kwargs):
+        super().__init__(scheduler=RateScheduler(rate=None, delay_scale=0), **kwargs)
+        self.direct_fails = direct_fails
+        self.steps = []
+        self.driver = FakeDriver(["<html><body>Results</body></html>"])
+        self.snapshot = PageSnapshot(self.driver)
+
+    def _open_search_url(self, query, page):
+        self.steps.append(("url", page))
+        if self.direct_fails:
+            raise TimeoutException("Немає результатів")
+
+    def _open_home_page(self):
+        self.steps.append("home")
+
+    def _submit_search(self, query):
+        self.steps.append("search")
+
+    def _click_next_page(self, page):
+        self.steps.append(("next", page))
+
+    def _wait_for_results(self, page):
+        pass
+
+    def human_scroll(self):
+        pass
+
+    def human_mouse_movement(self):
+        pass
+
+    def random_interaction(self):
+        pass
+
+
+class TestSeleniumNavigation(unittest.TestCase):
+    def test_direct_navigation(self):
+        fetcher = ScriptedSeleniumFetcher()
+        fetcher.fetch_search_page("laptop", 3)
+        fetcher.fetch_search_page("laptop", 4)
+        self.assertEqual(fetcher.steps, [("url", 3), ("url", 4)])
+
+    def test_falls_back_to_click_through(self):
+        fetcher = ScriptedSeleniumFetcher(direct_fails=True)
+        fetcher.fetch_search_page("laptop", 3)
+        fetcher.fetch_search_page("laptop", 4)
+        self.assertEqual(fetcher.navigation, "click")
+        self.assertFalse(fetcher.direct_search)
+        self.assertEqual(fetcher.steps, [("url", 3), "home", "search", ("next", 2), ("next", 3), ("next", 4)])
+
+    def test_next_query_does_not_continue_previous_results(self):
+        fetcher = ScriptedSeleniumFetcher(navigation="click")
+        fetcher.start_query("laptop")
+        fetcher.fetch_search_page("laptop", 2)
+        fetcher.start_query("mouse")
+        fetcher.fetch_search_page("mouse", 3)
+        self.assertEqual(fetcher.steps, ["home", "search", ("next", 2), "home", "search", ("next", 2), ("next", 3)])
+
+    def test_next_query_restores_configured_navigation(self):
+        fetcher = ScriptedSeleniumFetcher(direct_fails=True)
+        fetcher.start_query("laptop")
+        fetcher.fetch_search_page("laptop", 1)
+        self.assertFalse(fetcher.direct_search)
+        fetcher.start_query("mouse")
+        self.assertTrue(fetcher.direct_search)
+        fetcher.direct_fails = False
+        fetcher.fetch_search_page("mouse", 2)
+        self.assertEqual(fetcher.steps, [("url", 1), "home", "search", ("url", 2)])
+
+    def test_unknown_navigation_mode(self):
+        with self.assertRaises(ValueError):
+            SeleniumFetcher(navigation="teleport")
+
+
+class TestPageSnapshot(unittest.TestCase):
+    def make_fetcher(self, driver, page_cache=None):
+        fetcher = SeleniumFetcher(scheduler=RateScheduler(rate=None, delay_scale=0), page_cache=page_cache)
+        fetcher.driver = driver
+        fetcher.snapshot = PageSnapshot(driver)
+        return fetcher
+
+    def test_captcha_checks_share_one_serialization(self):
+        driver = FakeDriver(["<html><body>Product</body></html>"])
+        fetcher = self.make_fetcher(driver)
+        self.assertTrue(fetcher.check_captcha())
+        self.assertFalse(fetcher.is_captcha_present())
+        self.assertFalse(fetcher.is_captcha_present())
+        self.assertEqual(fetcher.snapshot.html, "<html><body>Product</body></html>")
+        self.assertEqual(driver.page_source_calls, 1)
+
+    def test_snapshot_invalidated_on_refresh(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = PageCache(os.path.join(tmpdir, "cache"))
+            driver = FakeDriver(["<html>Enter the characters you see (CAPTCHA)</html>", "<html>Product</html>"])
+            fetcher = self.make_fetcher(driver, cache)
+            self.assertTrue(fetcher.check_captcha(max_retries=3))
+            self.assertEqual(fetcher.snapshot.html, "<html>Product</html>")
+            # Сторінка з CAPTCHA зберігається в кеш з уже зчитаного знімка
+            self.assertEqual(driver.page_source_calls, 2)
+            self.assertEqual([status for _, _, status, _ in cache.history(driver.current_url)], ["captcha"])
+            dispose_engines()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+# app/tests/test_frontier.py
+import os
+import tempfile
+import threading
+import unittest
+from sqlalchemy import text
+from app.database import dispose_engines, get_engine
+from app.frontier import CrawlFrontier, FrontierBusyError, crawl_key
+from app.scraper.parsers import CardRecord
+
+
+def card(asin, url="N/A"):
+    return CardRecord(asin, url, f"Title {asin}", 10.0, 0.0, 4.0, 5, "Amazon.com", "N/A")
+
+
+class TestCrawlFrontier(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "test.db")
+
+    def tearDown(self):
+        dispose_engines()
+        self.tmpdir.cleanup()
+
+    def test_resume_skips_done_and_requeues_in_flight(self):
+        frontier = CrawlFrontier("Gaming  Laptop", 3, self.db_path)
+        self.assertEqual(frontier.resume(), 1)
+        frontier.enqueue(1, [card("A1", "https://www.amazon.com/dp/A1"), card("A2", "https://www.amazon.com/dp/A2"),
+                             card("A3")])
+        frontier.advance(1)
+        frontier.mark_in_flight(["A1", "A2"])
+        frontier.mark_done(["A1"])
+        frontier.finish("failed")
+
+        resumed = CrawlFrontier("gaming laptop", 3, self.db_path)
+        self.assertEqual(resumed.key, crawl_key("Gaming  Laptop"))
+        self.assertEqual(resumed.resume(), 1)
+        self.assertTrue(resumed.has_page(1))
+        self.assertFalse(resumed.has_page(2))
+        self.assertEqual([c.asin for c in resumed.pending(1, CardRecord)], ["A2", "A3"])
+        self.assertEqual(resumed.pending(1, CardRecord)[0], card("A2", "https://www.amazon.com/dp/A2"))
+        self.assertEqual(resumed.stats(), {"queued": 2, "in_flight": 0, "done": 1})
+
+    def test_finished_task_starts_over(self):
+        frontier = CrawlFrontier("laptop", 1, self.db_path)
+        frontier.resume()
+        frontier.enqueue(1, [card("A1")])
+        frontier.mark_done(["A1"])
+        frontier.advance(2)
+        frontier.finish()
+        self.assertEqual(frontier.resume(), 1)
+        self.assertFalse(frontier.has_page(1))
+        frontier.enqueue(1, [card("A1")])
+        frontier.advance(2)
+        self.assertEqual(frontier.resume(fresh=True), 1)
+        self.assertEqual(frontier.stats(), {"queued": 0, "in_flight": 0, "done": 0})
+
+    def test_page_url_frontier(self):
+        frontier = CrawlFrontier("laptop", 4, self.db_path)
+        frontier.resume()
+        frontier.plan_pages({page: f"https://www.amazon.com/s?k=laptop&page={page}" for page in range(1, 5)})
+        self.assertEqual(frontier.claim_pages([1, 2]), [1, 2])
+        # Уже взяті сторінки іншому завантажувачу не дістаються
+        self.assertEqual(frontier.claim_pages([1, 2, 3]), [3])
+        frontier.add_page(1, [card("A1")])
+        frontier.set_page_state(3, "missing")
+        self.assertEqual([frontier.page_state(page) for page in range(1, 6)],
+                         ["done", "in_flight", "missing", "missing", None])
+        self.assertEqual([c.asin for c in frontier.pending(1, CardRecord)], ["A1"])
+
+        # Після збою сторінка 2 повертається в чергу, завантажені і відсутні сторінки лишаються
+        frontier.finish("failed")
+        frontier.resume()
+        self.assertEqual([frontier.page_state(page) for page in range(1, 5)], ["done", "queued", "missing", "missing"])
+        frontier.resume(fresh=True)
+        self.assertIsNone(frontier.page_state(1))
+
+    def test_same_query_is_crawled_by_one_task(self):
+        now = [1000.0]
+        first = CrawlFrontier("laptop", 2, self.db_path, task_id="job-1", clock=lambda: now[0])
+        second = CrawlFrontier("Laptop", 2, self.db_path, task_id="job-2", lease_ttl=600, clock=lambda: now[0])
+        first.resume()
+        first.enqueue(1, [card("A1", "https://www.amazon.com/dp/A1")])
+        first.mark_in_flight(["A1"])
+        with self.assertRaises(FrontierBusyError):
+            second.resume()
+        # Картки першої задачі лишились у роботі
+        self.assertEqual(first.stats(), {"queued": 0, "in_flight": 1, "done": 0})
+        # Та сама задача після перезапуску воркера продовжує свій обхід
+        self.assertEqual(CrawlFrontier("laptop", 2, self.db_path, task_id="job-1", clock=lambda: now[0]).resume(), 1)
+
+        # Оренду продовжує кожна зміна фронтиру; після її закінчення обхід переходить до іншої задачі
+        now[0] += 500
+        first.mark_done(["A1"])
+        now[0] += 500
+        with self.assertRaises(FrontierBusyError):
+            second.resume()
+        now[0] += 200
+        self.assertEqual(second.resume(), 1)
+        first.finish("failed")
+        self.assertEqual(second.stats(), {"queued": 0, "in_flight": 0, "done": 1})
+
+    def test_concurrent_resume_of_same_query(self):
+        barrier = threading.Barrier(4)
+        outcomes = []
+
+        def resume(task_id):
+            frontier = CrawlFrontier("laptop", 2, self.db_path, task_id=task_id)
+            barrier.wait()
+            try:
+                frontier.resume()
+                outcomes.append("running")
+            except FrontierBusyError:
+                outcomes.append("busy")
+
+        threads = [threading.Thread(target=resume, args=(f"job-{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(outcomes), ["busy", "busy", "busy", "running"])
+
+    def test_dead_local_owner_is_taken_over(self):
+        frontier = CrawlFrontier("laptop", 2, self.db_path)
+        frontier.resume()
+        other = CrawlFrontier("laptop", 2, self.db_path, task_id="job-1")
+        with self.assertRaises(FrontierBusyError):
+            other.resume()
+        # Процес-власник без task_id на цьому хості завершився: обхід відновлюється без очікування оренди
+        dead_owner = frontier.task_id.rsplit("-", 2)[0] + "-999999999-abcdef"
+        with get_engine(self.db_path).begin() as connection:
+            connection.execute(text("UPDATE crawl_tasks SET task_id = :owner"), {"owner": dead_owner})
+        self.assertEqual(other.resume(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+# app/tests/test_jobs.py
+import os
+import tempfile
+import threading
+import unittest
+from app.database import dispose_engines
+from app.events import EventStore, PAGE, PRODUCT
+from app.jobs import JobQueue, parse_queries
+from app.worker import ScrapeWorker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeScraper:
+    """Скрапер, що звітує прогрес і за потреби чекає скасування."""
+
+    def __init__(self, query, pages, db_path, block=False, fail=False, **options):
+        self.pages = pages
+        self.block = block
+        self.fail = fail
+        self.options = options
+        self.cancelled = False
+        self.total_products = 0
+        self.started = threading.Event()
+        self._cancel_event = threading.Event()
+        FakeScraper.last = self
+
+    def cancel(self):
+        self.cancelled = True
+        self._cancel_event.set()
+
+    def run(self, task_id=None, max_retries=2, events=None):
+        self.started.set()
+        for page in range(1, self.pages + 1):
+            events.publish(task_id, PAGE, current_page=page, pages=self.pages, total_products=self.total_products)
+            self.total_products += 10
+            events.publish(task_id, PRODUCT, asin=f"B{page:09d}", current_page=page,
+                           total_products=self.total_products)
+        if self.block and not self._cancel_event.wait(10):
+            raise AssertionError("Скрапер не скасовано")
+        if self.cancelled:
+            raise Exception("Скрапінг скасовано")
+        if self.fail:
+            raise RuntimeError("Amazon недоступний")
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "test.db")
+        self.clock = FakeClock()
+        self.queue = JobQueue(self.db_path, clock=self.clock)
+
+    def tearDown(self):
+        dispose_engines()
+        self.tmpdir.cleanup()
+
+    def test_claim_heartbeat_and_finish(self):
+        first = self.queue.submit("laptop", 2, fetch_engine="http", concurrency=4)
+        self.clock.now += 1
+        second = self.queue.submit("mouse", 1)
+        job = self.queue.claim("worker-1")
+        self.assertEqual((job["id"], job["status"], job["options"]), (first, "running", {"fetch_engine": "http",
+                                                                                         "concurrency": 4}))
+        self.assertEqual(self.queue.claim("worker-2")["id"], second)
+        self.assertIsNone(self.queue.claim("worker-3"))
+
+        self.assertFalse(self.queue.heartbeat(first, "worker-1", current_page=1, total_products=16))
+        self.assertTrue(self.queue.heartbeat(first, "worker-2"))
+        self.queue.finish(first, "worker-1", "completed", "Скрапінг завершено")
+        job = self.queue.get(first)
+        self.assertEqual((job["status"], job["current_page"], job["total_products"]), ("completed", 1, 16))
+        self.assertEqual([job["id"] for job in self.queue.list()], [second, first])
+
+    def test_batch_claimed_by_priority(self):
+        batch_id, (low, high, default) = self.queue.submit_batch([("mouse", -1), ("laptop", 5), ("keyboard", 0)], 2,
+                                                                 fetch_engine="http")
+        self.assertEqual([self.queue.claim("worker-1")["id"] for _ in range(3)], [high, default, low])
+        job = self.queue.get(high)
+        self.assertEqual((job["batch_id"], job["priority"], job["options"]), (batch_id, 5, {"fetch_engine": "http"}))
+
+    def test_parse_queries(self):
+        lines = ["# ноутбуки", "laptop", "", "gaming  laptop | 10", "Laptop | 3  # дубль", "laptop stand|1"]
+        self.assertEqual(parse_queries(lines), [("gaming laptop", 10), ("laptop", 3), ("laptop stand", 1)])
+        with self.assertRaises(ValueError):
+            parse_queries(["laptop | high"])
+
+    def test_cancel_requeue_and_evict(self):
+        queued = self.queue.submit("laptop", 1)
+        self.assertEqual(self.queue.cancel(queued)["status"], "cancelled")
+
+        running = self.queue.submit("mouse", 1)
+        self.queue.claim("worker-1")
+        self.assertEqual(self.queue.cancel(running)["status"], "running")
+        self.assertTrue(self.queue.heartbeat(running, "worker-1"))
+
+        stale = self.queue.submit("keyboard", 1)
+        self.queue.claim("worker-2")
+        self.clock.now += 30
+        self.queue.heartbeat(running, "worker-1")
+        self.assertEqual(self.queue.requeue_stale(stale_after=20), 1)
+        self.assertEqual(self.queue.get(stale)["status"], "queued")
+        self.assertEqual(self.queue.claim("worker-3")["attempts"], 2)
+        # Воркер, що втратив задачу, більше не може її змінювати
+        self.queue.finish(stale, "worker-2", "failed", "Помилка")
+        self.assertEqual(self.queue.get(stale)["status"], "running")
+
+        self.clock.now += 3600
+        self.assertEqual(self.queue.evict(ttl=600), 1)
+        self.assertIsNone(self.queue.get(queued))
+        self.assertIsNotNone(self.queue.get(running))
+
+    def test_job_failed_after_max_attempts(self):
+        job_id = self.queue.submit("laptop", 1)
+        # Зупинка воркера не рахується як спроба
+        self.queue.claim("worker-0")
+        self.queue.release(job_id, "worker-0")
+        for attempt in range(1, 3):
+            self.assertEqual(self.queue.claim(f"worker-{attempt}")["attempts"], attempt)
+            self.clock.now += 100
+            self.assertEqual(self.queue.requeue_stale(stale_after=20, max_attempts=2), 1 if attempt < 2 else 0)
+        job = self.queue.get(job_id)
+        self.assertEqual((job["status"], job["attempts"]), ("failed", 2))
+        self.assertIsNone(self.queue.claim("worker-3"))
+        events = [event for _, topic, event in EventStore(self.db_path).read_after(0) if topic == job_id]
+        self.assertEqual([(event["type"], event["status"]) for event in events], [("finished", "failed")])
+
+
+class TestScrapeWorker(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "test.db")
+        self.queue = JobQueue(self.db_path)
+        self.worker = ScrapeWorker(self.db_path, worker_id="worker-1", heartbeat_interval=0.05,
+                                   event_interval=0.01, scraper_factory=FakeScraper)
+
+    def tearDown(self):
+        dispose_engines()
+        self.tmpdir.cleanup()
+
+    def test_runs_jobs_and_records_result(self):
+        completed = self.queue.submit("laptop", 3, fetch_engine="http")
+        failed = self.queue.submit("mouse", 1, fail=True)
+        self.assertTrue(self.worker.run_once())
+        self.assertEqual(FakeScraper.last.options, {"fetch_engine": "http"})
+        self.assertTrue(self.worker.run_once())
+        self.assertFalse(self.worker.run_once())
+
+        job = self.queue.get(completed)
+        self.assertEqual((job["status"], job["current_page"], job["total_products"]), ("completed", 3, 30))
+        self.assertEqual(job["message"], "Скрапінг завершено: зібрано 30 продуктів")
+        job = self.queue.get(failed)
+        self.assertEqual((job["status"], job["message"]), ("failed", "Помилка скрапінгу: Amazon недоступний"))
+
+    def test_writes_task_events(self):
+        job_id = self.queue.submit("laptop", 3)
+        self.worker.run_once()
+        events = [event for _, topic, event in EventStore(self.db_path).read_after(0) if topic == job_id]
+        types = [event["type"] for event in events]
+        self.assertEqual(types[0], "started")
+        self.assertEqual(types[-1], "finished")
+        self.assertEqual((events[-1]["status"], events[-1]["total_products"]), ("completed", 30))
+        # Оновлення прогресу об'єднуються: не більше ніж по одному на тип між записами в журнал
+        self.assertLessEqual(types.count("product"), 3)
+        self.assertEqual([e for e in events if e["type"] == "product"][-1]["total_products"], 30)
+
+    def test_cancel_and_shutdown(self):
+        cancelled = self.queue.submit("laptop", 1, block=True)
+        FakeScraper.last = None
+        thread = threading.Thread(target=self.worker.run_once)
+        thread.start()
+        while FakeScraper.last is None or not FakeScraper.last.started.wait(0.01):
+            pass
+        self.queue.cancel(cancelled)
+        thread.join(5)
+        self.assertEqual(self.queue.get(cancelled)["status"], "cancelled")
+
+        # Зупинка воркера повертає задачу в чергу, а не скасовує її
+        released = self.queue.submit("mouse", 1, block=True)
+        stop_event = threading.Event()
+        stop_event.set()
+        self.worker.run_once(stop_event)
+        job = self.queue.get(released)
+        self.assertEqual((job["status"], job["worker_id"]), ("queued", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# app/tests/test_page_cache.py
+import os
+import tempfile
+import unittest
+from app.database import dispose_engines
+from app.scraper.fetchers import CacheFetcher, FetchError, NoMorePagesError, search_url
+from app.scraper.page_cache import PageCache, ERROR
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def page(i, size=20000):
+    return f"<html><body>page {i} " + os.urandom(size).hex() + "</body></html>"
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmpdir.name, "cache")
+
+    def tearDown(self):
+        dispose_engines()
+        self.tmpdir.cleanup()
+
+    def test_put_get_and_history(self):
+        cache = PageCache(self.root, codec="gz", clock=FakeClock())
+        url = "https://www.amazon.com/dp/B0TEST0001"
+        html = "<html><body>" + "Test Laptop " * 1000 + "</body></html>"
+        digest = cache.put(url, html, "product")
+        self.assertEqual(cache.put(url, html, "product"), digest)
+        cache.put(url, "<html>Oops</html>", "product", ERROR)
+        self.assertEqual(cache.get(url), html)
+        self.assertEqual(cache.get(url, "search"), None)
+        self.assertIsNone(cache.get("https://www.amazon.com/dp/B0MISSING0"))
+        self.assertEqual([(kind, status) for _, kind, status, _ in cache.history(url)],
+                         [("product", "error"), ("product", "ok")])
+
+        # Однаковий HTML за різними URL зберігається одним стиснутим блобом у шардованому каталозі
+        cache.put("https://www.amazon.com/dp/B0TEST0002", html, "product")
+        stats = cache.stats()
+        self.assertEqual((stats["pages"], stats["blobs"]), (3, 2))
+        self.assertLess(stats["stored_bytes"], stats["bytes"] / 10)
+        self.assertTrue(os.path.exists(os.path.join(self.root, digest[:2], digest[2:4], f"{digest}.html.gz")))
+
+    def test_lru_eviction(self):
+        cache = PageCache(self.root, max_bytes=100000, codec="gz", clock=FakeClock())
+        for i in range(4):
+            cache.put(f"https://www.amazon.com/dp/B{i:09d}", page(i), "product")
+        # Перша сторінка щойно прочитана, тож витісняються друга і третя
+        self.assertIsNotNone(cache.get("https://www.amazon.com/dp/B000000000"))
+        cache.put("https://www.amazon.com/dp/B000000004", page(4), "product")
+        self.assertLessEqual(cache.stats()["stored_bytes"], 100000)
+        present = [i for i in range(5) if cache.get(f"https://www.amazon.com/dp/B{i:09d}") is not None]
+        self.assertEqual(present, [0, 3, 4])
+        self.assertEqual(cache.history("https://www.amazon.com/dp/B000000001"), [])
+        self.assertEqual(PageCache(self.root, max_bytes=100000, codec="gz").stats()["blobs"], 3)
+
+    def test_cache_fetcher_replays_pages(self):
+        cache = PageCache(self.root, codec="gz")
+        cache.put(search_url("laptop"), "<html>results</html>", "search")
+        cache.put("https://www.amazon.com/dp/B0TEST0001", "<html>product</html>", "product")
+        fetcher = CacheFetcher(page_cache=cache)
+        self.assertEqual(fetcher.fetch_search_page("laptop", 1), "<html>results</html>")
+        self.assertEqual(fetcher.fetch_product_page("https://www.amazon.com/dp/B0TEST0001"),
+                         ("<html>product</html>", None))
+        with self.assertRaises(NoMorePagesError):
+            fetcher.fetch_search_page("laptop", 2)
+        with self.assertRaises(FetchError):
+            fetcher.fetch_product_page("https://www.amazon.com/dp/B0TEST0002")
+
+
+if __name__ == "__main__":
+    unittest.main()
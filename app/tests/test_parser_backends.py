@@ -0,0 +1,80 @@
+# app/tests/test_parser_backends.py
+import os
+import unittest
+from app.scraper.backends import BACKENDS, LxmlNode, Selector, SelectorSchema, parse_document
+from app.scraper import parsers
+from app.scraper.parsers import parse_search_results_html, parse_product_html, parse_buying_options_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class TestParserBackends(unittest.TestCase):
+    def test_search_results_parity(self):
+        html = read_fixture("search_results.html")
+        reference = parse_search_results_html(html, backend="bs4")
+        self.assertEqual(len(reference), 3)
+        self.assertEqual(parse_search_results_html(html, backend="lxml"), reference)
+
+    def test_product_pages_parity(self):
+        for name in ("product_page.html", "unavailable_product_page.html"):
+            html = read_fixture(name)
+            with self.subTest(fixture=name):
+                self.assertEqual(parse_product_html(html, name, backend="lxml"),
+                                 parse_product_html(html, name, backend="bs4"))
+                self.assertEqual(parse_buying_options_html(html, backend="lxml"),
+                                 parse_buying_options_html(html, backend="bs4"))
+
+    def test_soup_contains_and_document_order(self):
+        html = ("<div><span class='b'>first</span><p><span>Currently unavailable.</span></p>"
+                "<span class='a'>last</span></div>")
+        selector = Selector("span.a, span.b, span:-soup-contains('Currently unavailable')")
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                matches = selector.select(parse_document(html, backend))
+                self.assertEqual([m.text for m in matches], ["first", "Currently unavailable.", "last"])
+
+    def test_lxml_node_attributes(self):
+        node = Selector("span").select_one(parse_document("<span class='a-icon-alt x' data-hook=''>4.5</span>", "lxml"))
+        self.assertIsInstance(node, LxmlNode)
+        self.assertEqual(node.get("class"), ["a-icon-alt", "x"])
+        self.assertIn("data-hook", node.attrs)
+        with self.assertRaises(KeyError):
+            node["aria-label"]
+
+    def test_card_schema_matches_per_field_extractors(self):
+        html = read_fixture("search_results.html")
+        for backend in BACKENDS:
+            cards = parsers.SEARCH_RESULT_SELECTOR.select(parse_document(html, backend))
+            for card in cards:
+                record = parsers.extract_card(card)
+                if record is None:
+                    continue
+                with self.subTest(backend=backend, asin=record.asin):
+                    self.assertEqual(record[2:], (
+                        parsers.get_title_from_soup(card), parsers.get_price_from_soup(card),
+                        parsers.get_original_price_from_soup(card), parsers.get_rating_from_soup(card),
+                        parsers.get_reviews_from_soup(card), parsers.get_seller_from_soup(card),
+                        parsers.get_delivery_from_soup(card)))
+
+    def test_selector_schema_first_match_per_name(self):
+        html = ("<div><p><b class='x'>outside</b></p><span class='a'><i><b class='x'>inside</b></i></span>"
+                "<b class='y' data-k='v w'>attr</b></div>")
+        schema = SelectorSchema({"nested": "span.a b.x", "any_x": "b.x", "attr": "b[data-k*='w'], em", "none": "em"})
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                found = schema.extract(parse_document(html, backend))
+                self.assertEqual({name: elem.text if elem is not None else None for name, elem in found.items()},
+                                 {"nested": "inside", "any_x": "outside", "attr": "attr", "none": None})
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            parse_document("<html></html>", "html5lib")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# app/tests/test_parsing_engine.py
+import os
+import tempfile
+import unittest
+from unittest import mock
+from app.database import dispose_engines
+from app.scraper.page_cache import PageCache, ERROR
+from app.scraper.parsing_engine import ParsingEngine, default_parse_workers
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class TestParsingEngine(unittest.TestCase):
+    def test_search_results(self):
+        with ParsingEngine(max_workers=0) as engine:
+            cards = engine.parse_search_results(read_fixture("search_results.html"))
+        # Спонсорована картка (/sspa/click) пропускається
+        self.assertEqual([card.asin for card in cards], ["B0TEST0001", "B0TEST0002", "B0TEST0003"])
+        first = cards[0]
+        self.assertEqual(first.url, "https://www.amazon.com/Test-Laptop-15/dp/B0TEST0001/ref=sr_1_1")
+        self.assertEqual((first.price, first.original_price), (999.99, 1199.99))
+        self.assertEqual((first.rating, first.reviews), (4.5, 1234))
+        self.assertEqual(cards[2].url, "N/A")
+
+    def test_product_page(self):
+        with ParsingEngine(max_workers=0) as engine:
+            product, available = engine.parse_product_page(read_fixture("product_page.html"))
+            _, unavailable = engine.parse_product_page(read_fixture("unavailable_product_page.html"))
+        self.assertTrue(available)
+        self.assertFalse(unavailable)
+        self.assertEqual(product["title"], 'Test Laptop 15.6" FHD, 16GB RAM, 512GB SSD')
+        self.assertEqual((product["price"], product["original_price"]), (949.0, 1099.0))
+        self.assertEqual((product["rating"], product["reviews"]), (4.6, 2345))
+        self.assertEqual(product["seller"], "TestSeller LLC")
+
+    def test_process_pool_matches_inline(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = PageCache(tmpdir, codec="gz")
+            cache.put("https://www.amazon.com/s?k=laptop", read_fixture("search_results.html"), "search")
+            cache.put("https://www.amazon.com/dp/B0TEST0001", read_fixture("product_page.html"), "product")
+            cache.put("https://www.amazon.com/dp/B0TEST0002", read_fixture("unavailable_product_page.html"), "product")
+            # Сторінки з помилками зберігаються лише для діагностики і не перепарсюються
+            cache.put("https://www.amazon.com/dp/B0TEST0003", "<html>error</html>", "product", ERROR)
+            with ParsingEngine(max_workers=0) as engine:
+                inline = list(engine.reparse_cache(cache))
+            with ParsingEngine(max_workers=2) as engine:
+                pooled = list(engine.reparse_cache(cache))
+            dispose_engines()
+        self.assertEqual([(url, kind) for url, kind, _ in inline],
+                         [("https://www.amazon.com/dp/B0TEST0001", "product"),
+                          ("https://www.amazon.com/dp/B0TEST0002", "product"),
+                          ("https://www.amazon.com/s?k=laptop", "search")])
+        self.assertEqual(inline[0][2][0]["title"], 'Test Laptop 15.6" FHD, 16GB RAM, 512GB SSD')
+        self.assertFalse(inline[1][2][1])
+        self.assertEqual(len(inline[2][2]), 3)
+        self.assertEqual(pooled, inline)
+
+    def test_default_pool_is_a_share_of_cores(self):
+        with mock.patch("os.cpu_count", return_value=32):
+            self.assertEqual(ParsingEngine().max_workers, 4)
+            self.assertEqual(default_parse_workers(16), 2)
+            self.assertEqual(default_parse_workers(64), 1)
+        with mock.patch("os.cpu_count", return_value=None):
+            self.assertEqual(default_parse_workers(), 1)
+
+if __name__ == "__main__":
+    unittest.main()
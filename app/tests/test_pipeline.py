@@ -0,0 +1,59 @@
+# app/tests/test_pipeline.py
+import threading
+import time
+import unittest
+from collections import Counter
+from urllib.parse import urlsplit
+from app.scraper.pipeline import ProductPagePipeline
+
+
+class InFlightCounter:
+    """Блокуюча «завантажувальна» функція, що запам'ятовує найбільшу кількість одночасних викликів."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = Counter()
+        self.peak = Counter()
+
+    def __call__(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            self.in_flight[host] += 1
+            self.in_flight["*"] += 1
+            for key in (host, "*"):
+                self.peak[key] = max(self.peak[key], self.in_flight[key])
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight[host] -= 1
+            self.in_flight["*"] -= 1
+        if url.endswith("/broken"):
+            raise RuntimeError("Скрапінг скасовано")
+        return {"url": url}
+
+
+class TestProductPagePipeline(unittest.TestCase):
+    def test_results_in_order_under_global_limit(self):
+        fetch = InFlightCounter()
+        urls = [f"http://a.test/dp/{i}" for i in range(12)]
+        results = ProductPagePipeline(fetch, concurrency=4).run(urls)
+        self.assertEqual(results, [{"url": url} for url in urls])
+        self.assertEqual(fetch.peak["*"], 4)
+
+    def test_per_host_limit(self):
+        fetch = InFlightCounter()
+        urls = [f"http://{host}.test/dp/{i}" for i in range(6) for host in ("a", "b")]
+        ProductPagePipeline(fetch, concurrency=4, per_host_concurrency=1).run(urls)
+        self.assertEqual((fetch.peak["a.test"], fetch.peak["b.test"]), (1, 1))
+        self.assertEqual(fetch.peak["*"], 2)
+
+    def test_errors_returned_in_place(self):
+        results = ProductPagePipeline(InFlightCounter(delay=0), concurrency=2).run(
+            ["http://a.test/dp/1", "http://a.test/broken", "http://a.test/dp/2"])
+        self.assertEqual(results[0], {"url": "http://a.test/dp/1"})
+        self.assertIsInstance(results[1], RuntimeError)
+        self.assertEqual(results[2], {"url": "http://a.test/dp/2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
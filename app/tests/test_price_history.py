@@ -0,0 +1,113 @@
+# app/tests/test_price_history.py
+import os
+import sqlite3
+import tempfile
+import unittest
+from sqlalchemy import text
+from app.database import init_db, get_engine, ProductWriter, dispose_engines
+from app.price_history import get_price_series, get_largest_drops, get_price_stats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def product(asin, price, rating=4.5):
+    return {"asin": asin, "title": f"Title {asin}", "price": price, "original_price": 1000.0, "rating": rating,
+            "reviews": 10, "delivery": "N/A", "seller": "Amazon.com", "url": f"https://www.amazon.com/dp/{asin}"}
+
+
+class TestPriceHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "test.db")
+        self.clock = FakeClock()
+        self.writer = ProductWriter(self.db_path, clock=self.clock)
+
+    def tearDown(self):
+        dispose_engines()
+        self.tmpdir.cleanup()
+
+    def scrape(self, prices, step=100):
+        for price in prices:
+            for asin, value in price.items():
+                self.writer.add(product(asin, value))
+            self.writer.flush()
+            self.clock.now += step
+
+    def test_unchanged_observations_collapse_into_intervals(self):
+        self.scrape([{"A1": 900, "A2": 100}, {"A1": 900, "A2": 100}, {"A1": 800, "A2": 100}, {"A1": 800}])
+        # Оновлення з картки без ціни змінює лише рейтинг: ціна береться з рядка products
+        self.writer.refresh({"asin": "A1", "price": None, "rating": 4.0, "reviews": None})
+        self.writer.flush()
+
+        series = get_price_series("A1", db_path=self.db_path)
+        self.assertEqual([(p.ts, p.last_ts, p.price, p.rating, p.observations) for p in series],
+                         [(1000.0, 1100.0, 900.0, 4.5, 2), (1200.0, 1300.0, 800.0, 4.5, 2),
+                          (1400.0, 1400.0, 800.0, 4.0, 1)])
+        self.assertEqual([(p.ts, p.last_ts, p.observations) for p in get_price_series("A2", db_path=self.db_path)],
+                         [(1000.0, 1200.0, 3)])
+        self.assertEqual([p.ts for p in get_price_series("A1", start=1050, end=1250, db_path=self.db_path)],
+                         [1000.0, 1200.0])
+
+    def test_largest_drops_in_window(self):
+        self.scrape([{"A1": 900, "A2": 100, "A3": 50}, {"A1": 800, "A2": 40, "A3": 0}, {"A1": 500, "A2": 60}])
+        drops = get_largest_drops(db_path=self.db_path)
+        self.assertEqual([(d.asin, d.ts, d.prev_price, d.price, d.drop) for d in drops],
+                         [("A1", 1200.0, 800.0, 500.0, 300.0), ("A1", 1100.0, 900.0, 800.0, 100.0),
+                          ("A2", 1100.0, 100.0, 40.0, 60.0)])
+        self.assertEqual(drops[0].title, "Title A1")
+        by_percent = get_largest_drops(start=1050, end=1150, order="percent", db_path=self.db_path)
+        self.assertEqual([(d.asin, round(d.drop_pct, 2)) for d in by_percent], [("A2", 0.6), ("A1", 0.11)])
+        self.assertEqual(len(get_largest_drops(limit=1, db_path=self.db_path)), 1)
+        with self.assertRaises(ValueError):
+            get_largest_drops(order="ratio", db_path=self.db_path)
+
+    def test_drop_across_failed_scrape(self):
+        # Нульова ціна (невдалий скрапінг) між відомими цінами не ховає зниження
+        self.scrape([{"A1": 999}, {"A1": 0}, {"A1": 899}])
+        drops = get_largest_drops(db_path=self.db_path)
+        self.assertEqual([(d.ts, d.prev_price, d.price, d.drop) for d in drops], [(1200.0, 999.0, 899.0, 100.0)])
+        self.assertEqual([p.price for p in get_price_series("A1", db_path=self.db_path)], [999.0, 0.0, 899.0])
+
+    def test_price_stats(self):
+        self.scrape([{"A1": 900}, {"A1": 900}, {"A1": 600}, {"A1": 0}])
+        stats = get_price_stats(["A1", "A9"], db_path=self.db_path)
+        self.assertEqual(list(stats), ["A1"])
+        self.assertEqual(stats["A1"][:4], (600.0, 900.0, 800.0, 3))
+        self.assertEqual(get_price_stats(["A1"], start=1150, db_path=self.db_path)["A1"][:4], (600.0, 600.0, 600.0, 1))
+
+    def test_queries_use_indexes(self):
+        connection = sqlite3.connect(self.db_path)
+        init_db(self.db_path)
+        plans = {}
+        for name, query in {
+            "series": "SELECT * FROM price_observations WHERE asin = 'A1' AND ts <= COALESCE(NULL, 1e300)",
+            "drops": "SELECT asin FROM price_observations WHERE price_drop IS NOT NULL AND ts >= 1 AND ts <= 2",
+        }.items():
+            plans[name] = " ".join(row[-1] for row in connection.execute("EXPLAIN QUERY PLAN " + query))
+        connection.close()
+        self.assertIn("PRIMARY KEY (asin=? AND ts<?)", plans["series"])
+        self.assertIn("idx_price_observations_drops", plans["drops"])
+
+    def test_existing_products_seed_history(self):
+        dispose_engines()
+        db_path = os.path.join(self.tmpdir.name, "legacy.db")
+        connection = sqlite3.connect(db_path)
+        connection.execute("CREATE TABLE products (asin TEXT PRIMARY KEY, title TEXT, price REAL, original_price REAL, "
+                           "rating REAL, reviews INTEGER, delivery TEXT, seller TEXT, url TEXT)")
+        connection.execute("INSERT INTO products (asin, title, price, rating, reviews) VALUES ('B1', 'Old', 10, 4.2, 3)")
+        connection.commit()
+        connection.close()
+        init_db(db_path)
+        with get_engine(db_path).connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT COUNT(*) FROM price_observations")).scalar(), 1)
+        self.assertEqual([p.price for p in get_price_series("B1", db_path=db_path)], [10.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# app/tests/test_resources.py
+import json
+import os
+import unittest
+from unittest import mock
+from app.scraper.resources import ResourcePolicy, ResourceSizes, collect_network_stats
+
+
+def log_entry(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+
+class TestResourcePolicy(unittest.TestCase):
+    def test_default_policy(self):
+        policy = ResourcePolicy()
+        self.assertTrue(policy.is_blocked("https://m.media-amazon.com/images/I/71abc.jpg"))
+        self.assertTrue(policy.is_blocked("https://fonts.example.net/font.woff2"))
+        self.assertTrue(policy.is_blocked("https://aax-us-east.amazon-adsystem.com/e/dtb/bid"))
+        self.assertFalse(policy.is_blocked("https://www.amazon.com/dp/B0TEST0001"))
+        self.assertFalse(policy.is_blocked("https://m.media-amazon.com/images/I/script.js"))
+        self.assertFalse(policy.is_blocked("http://localhost:8000/s?k=laptop"))
+        self.assertIn("*://*.amazon-adsystem.com/*", policy.blocked_urls())
+        arguments = policy.launch_arguments()
+        self.assertIn("--blink-settings=imagesEnabled=false", arguments)
+        self.assertTrue(arguments[1].startswith("--host-resolver-rules=MAP * ~NOTFOUND, EXCLUDE amazon.com"))
+
+    def test_from_env(self):
+        with mock.patch.dict(os.environ, {"SCRAPER_BLOCK_RESOURCES": "none", "SCRAPER_ALLOWED_HOSTS": "*"}):
+            policy = ResourcePolicy.from_env()
+        self.assertEqual(policy.blocked_types, ())
+        self.assertIsNone(policy.allowed_hosts)
+        self.assertFalse(policy.is_blocked("https://cdn.example.com/photo.png"))
+        self.assertEqual(policy.launch_arguments(), ["--blink-settings=imagesEnabled=true"])
+        with self.assertRaises(ValueError):
+            ResourcePolicy(blocked_types=["video"])
+
+    def test_collect_network_stats(self):
+        stats = collect_network_stats([
+            log_entry("Network.requestWillBeSent", requestId="1"),
+            log_entry("Network.loadingFinished", requestId="1", encodedDataLength=2048),
+            log_entry("Network.requestWillBeSent", requestId="2"),
+            log_entry("Network.loadingFailed", requestId="2", blockedReason="inspector"),
+            log_entry("Network.requestWillBeSent", requestId="3"),
+            log_entry("Network.loadingFailed", requestId="3", errorText="net::ERR_NAME_NOT_RESOLVED"),
+            {"message": "not json"},
+        ])
+        self.assertEqual(stats, {"requests": 3, "bytes": 2048, "blocked": 2, "saved_bytes": 0, "unestimated": 2})
+
+    def test_saved_bytes_estimated_from_loaded_resources(self):
+        def request(request_id, url, kind):
+            return log_entry("Network.requestWillBeSent", requestId=request_id, type=kind, request={"url": url})
+
+        sizes = ResourceSizes()
+        first_page = collect_network_stats([
+            request("1", "https://m.media-amazon.com/a.js", "Script"),
+            # Розмір блокованого скрипта оцінюється за скриптами, завантаженими пізніше на тій самій сторінці
+            request("2", "https://ads.amazon-adsystem.com/ad.js", "Script"),
+            log_entry("Network.loadingFailed", requestId="2", errorText="net::ERR_NAME_NOT_RESOLVED"),
+            log_entry("Network.loadingFinished", requestId="1", encodedDataLength=3000),
+            request("3", "https://m.media-amazon.com/b.js", "Script"),
+            log_entry("Network.responseReceived", requestId="3", response={"headers": {"Content-Length": "1000"}}),
+            log_entry("Network.loadingFinished", requestId="3", encodedDataLength=0),
+            request("4", "https://fonts.example.net/f.woff2", "Font"),
+            log_entry("Network.loadingFailed", requestId="4", blockedReason="inspector"),
+        ], sizes)
+        self.assertEqual((first_page["bytes"], first_page["saved_bytes"], first_page["unestimated"]), (4000, 2000, 1))
+
+        # Шрифт, завантажений раніше без блокування, оцінюється точним розміром свого URL
+        sizes.record("https://fonts.example.net/f.woff2", "Font", 50000)
+        second_page = collect_network_stats([
+            request("1", "https://fonts.example.net/f.woff2", "Font"),
+            log_entry("Network.loadingFailed", requestId="1", blockedReason="inspector"),
+            request("2", "https://fonts.example.net/g.woff2", "Font"),
+            log_entry("Network.loadingFailed", requestId="2", blockedReason="inspector"),
+        ], sizes)
+        self.assertEqual((second_page["saved_bytes"], second_page["unestimated"]), (100000, 0))
+
+if __name__ == "__main__":
+    unittest.main()
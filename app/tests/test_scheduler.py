@@ -0,0 +1,95 @@
+# app/tests/test_scheduler.py
+import threading
+import time
+import unittest
+from app.scraper.fetchers import HttpFetcher
+from app.scraper.scheduler import RateScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = RateScheduler(rate=0.5, burst=1, backoff=0.5, recovery=2.0, recover_after=2,
+                                       clock=self.clock)
+
+    def test_token_bucket_per_host(self):
+        url = "https://www.amazon.com/dp/B0TEST0001"
+        self.assertEqual(self.scheduler.reserve(url), 0.0)
+        # Другий і третій запити стають у чергу з інтервалом 1 / rate
+        self.assertAlmostEqual(self.scheduler.reserve(url), 2.0)
+        self.assertAlmostEqual(self.scheduler.reserve(url), 4.0)
+        self.assertEqual(self.scheduler.reserve("https://other.example/"), 0.0)
+        self.clock.now = 10.0
+        self.assertEqual(self.scheduler.reserve(url), 0.0)
+
+    def test_backoff_and_recovery(self):
+        url = "https://www.amazon.com/s?k=laptop"
+        self.scheduler.reserve(url)
+        self.scheduler.record_failure(url, 503)
+        self.assertAlmostEqual(self.scheduler.slowdown(url), 2.0)
+        self.clock.now = 1.0
+        # Після відмови відро порожнє, а інтервал подвоєно
+        self.assertAlmostEqual(self.scheduler.reserve(url), 3.0)
+        for _ in range(2):
+            self.scheduler.record_success(url)
+        self.assertAlmostEqual(self.scheduler.slowdown(url), 1.0)
+        for _ in range(4):
+            self.scheduler.record_success(url)
+        # Не швидше за max_rate (типово 2 * rate)
+        self.assertAlmostEqual(self.scheduler.slowdown(url), 0.5)
+        self.assertLessEqual(self.scheduler.delay(url, (10, 10)), 5.0)
+
+    def test_rate_scales_with_parallel_fetches(self):
+        url = "https://www.amazon.com/dp/B0TEST0001"
+        self.scheduler.reserve(url)
+        self.scheduler.set_parallelism(4)
+        # Три нові слоти доступні одразу, далі запити йдуть з інтервалом 1 / (4 * rate)
+        self.assertEqual([self.scheduler.reserve(url) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(self.scheduler.reserve(url), 0.5)
+        self.assertEqual(self.scheduler.reserve("https://other.example/"), 0.0)
+        self.assertEqual([self.scheduler.reserve("https://other.example/") for _ in range(3)], [0.0, 0.0, 0.0])
+        # Послідовна задача в тому самому процесі повертається до темпу одного потоку
+        self.scheduler.set_parallelism(1)
+        self.clock.now = 100.0
+        self.assertEqual(self.scheduler.reserve(url), 0.0)
+        self.assertAlmostEqual(self.scheduler.reserve(url), 2.0)
+
+    def test_explicit_rate_is_not_scaled(self):
+        scheduler = RateScheduler(rate=0.5, burst=1, clock=self.clock, scale_with_parallelism=False)
+        with self.assertLogs(level="WARNING"):
+            scheduler.set_parallelism(4)
+        self.assertEqual(scheduler.reserve("https://www.amazon.com/"), 0.0)
+        self.assertAlmostEqual(scheduler.reserve("https://www.amazon.com/"), 2.0)
+
+    def test_unlimited_scheduler(self):
+        scheduler = RateScheduler(rate=None, delay_scale=0)
+        self.assertEqual(scheduler.reserve("https://www.amazon.com/"), 0.0)
+        scheduler.record_failure("https://www.amazon.com/", 503)
+        self.assertEqual(scheduler.delay("https://www.amazon.com/", (10, 15)), 0.0)
+
+    def test_cancel_interrupts_pause(self):
+        fetcher = HttpFetcher(scheduler=RateScheduler(rate=None), delays={"page": (30, 30)})
+        cancelled = []
+        fetcher.is_cancelled = lambda: bool(cancelled)
+
+        def cancel():
+            cancelled.append(True)
+            fetcher.cancel_event.set()
+
+        threading.Timer(0.05, cancel).start()
+        started = time.monotonic()
+        with self.assertRaises(Exception):
+            fetcher.pause("page")
+        self.assertLess(time.monotonic() - started, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 # app/tests/test_scraper.py
 import unittest
 from bs4 import BeautifulSoup
-from app.scraper.amazon_scraper import get_title_from_soup, get_price_from_soup, get_rating_from_soup
+from app.scraper.parsers import get_title_from_soup, get_price_from_soup, get_rating_from_soup
 
 class TestScraper(unittest.TestCase):
     def test_extract_product_data(self):
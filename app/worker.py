@@ -0,0 +1,240 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import uuid
+import time
+from app.jobs import JobQueue, COMPLETED, FAILED, CANCELLED, QUEUED
+from app.events import EventBus, EventStore, STARTED, PAGE, PRODUCT, FINISHED
+
+# Налаштування логування
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[
+        logging.FileHandler("scraper.log"),
+        logging.StreamHandler()
+    ]
+)
+
+
+def _create_scraper(**kwargs):
+    # Імпорт тут: веб-процесу, що лише запускає воркерів, не потрібні Selenium і рушій парсингу
+    from app.scraper.amazon_scraper import AmazonScraper
+    return AmazonScraper(**kwargs)
+
+
+class ScrapeWorker:
+    """Воркер черги скрапінгу: по одній задачі з JobQueue за раз.
+
+    Поки задача виконується, окремий потік кожні event_interval секунд переносить події скрапера
+    (вже об'єднані шиною) в журнал scrape_events для веб-застосунку, а кожні heartbeat_interval
+    секунд записує heartbeat з прогресом і скасовує скрапер, якщо задачу скасовано. Між задачами
+    воркер повертає в чергу задачі воркерів, що не відповідають (після max_attempts спроб задача
+    позначається failed), і видаляє завершені задачі, старші за job_ttl.
+    """
+
+    def __init__(self, db_path="amazon.db", worker_id=None, poll_interval=2.0, heartbeat_interval=5.0,
+                 stale_after=60.0, job_ttl=24 * 3600, scraper_factory=_create_scraper, event_interval=0.5,
+                 max_attempts=3):
+        self.db_path = db_path
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.queue = JobQueue(db_path)
+        self.event_store = EventStore(db_path)
+        self.event_interval = event_interval
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.job_ttl = job_ttl
+        self.scraper_factory = scraper_factory
+
+    def run_once(self, stop_event=None):
+        """Виконує одну задачу з черги; False, якщо черга порожня."""
+        stop_event = stop_event or threading.Event()
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            return False
+        self._run_job(job, stop_event)
+        return True
+
+    def run(self, stop_event):
+        """Виконує задачі, доки не встановлено stop_event."""
+        logging.info(f"Воркер {self.worker_id} запущено")
+        while not stop_event.is_set():
+            try:
+                self.queue.requeue_stale(self.stale_after, self.max_attempts)
+                self.queue.evict(self.job_ttl)
+                if not self.run_once(stop_event):
+                    stop_event.wait(self.poll_interval)
+            except Exception as e:
+                logging.error(f"Помилка воркера {self.worker_id}: {e}")
+                stop_event.wait(self.poll_interval)
+        logging.info(f"Воркер {self.worker_id} зупинено")
+
+    def _run_job(self, job, stop_event):
+        job_id = job["id"]
+        progress = {"current_page": job["current_page"], "total_products": job["total_products"]}
+        stopped = {"cancelled": False}
+        bus = EventBus(max_pending=1000)
+        subscription = bus.subscribe(job_id)
+        try:
+            scraper = self.scraper_factory(query=job["query"], pages=job["pages"], db_path=self.db_path,
+                                           **job["options"])
+        except Exception as e:
+            logging.error(f"Не вдалося створити скрапер для задачі {job_id}: {e}")
+            message = f"Помилка скрапінгу: {e}"
+            self.queue.finish(job_id, self.worker_id, FAILED, message)
+            self._write_events(job_id, [self._finished_event(FAILED, message, progress)])
+            return
+
+        def flush_events():
+            events = subscription.drain()
+            for event in events:
+                if event["type"] in (PAGE, PRODUCT):
+                    progress.update(current_page=event["current_page"], total_products=event["total_products"])
+            self._write_events(job_id, events)
+
+        done = threading.Event()
+
+        def heartbeat():
+            next_beat = time.monotonic() + self.heartbeat_interval
+            while not done.wait(self.event_interval):
+                flush_events()
+                if time.monotonic() < next_beat:
+                    continue
+                next_beat = time.monotonic() + self.heartbeat_interval
+                try:
+                    should_stop = self.queue.heartbeat(job_id, self.worker_id, **progress)
+                except Exception as e:
+                    logging.error(f"Помилка heartbeat задачі {job_id}: {e}")
+                    continue
+                if (should_stop or stop_event.is_set()) and not scraper.cancelled:
+                    stopped["cancelled"] = should_stop
+                    scraper.cancel()
+
+        bus.publish(job_id, STARTED, worker_id=self.worker_id, attempt=job["attempts"])
+        beat = threading.Thread(target=heartbeat, name=f"heartbeat-{job_id[:8]}", daemon=True)
+        beat.start()
+        try:
+            scraper.run(job_id, events=bus)
+            status, message = COMPLETED, f"Скрапінг завершено: зібрано {scraper.total_products} продуктів"
+        except Exception as e:
+            logging.error(f"Помилка задачі {job_id}: {e}")
+            status, message = FAILED, f"Помилка скрапінгу: {e}"
+            if scraper.cancelled:
+                status, message = CANCELLED, "Скрапінг скасовано"
+        finally:
+            done.set()
+            beat.join()
+            flush_events()
+            subscription.close()
+
+        if status == CANCELLED and stop_event.is_set() and not stopped["cancelled"]:
+            # Зупинка воркера, а не скасування користувачем: задачу продовжить інший воркер
+            self.queue.release(job_id, self.worker_id)
+            self._write_events(job_id, [{"type": QUEUED, "time": time.time(), "message": "Задачу повернуто в чергу",
+                                         **progress}])
+            return
+        self.queue.finish(job_id, self.worker_id, status, message, **progress)
+        self._write_events(job_id, [self._finished_event(status, message, progress)])
+        logging.info(f"Задача {job_id}: {message}")
+
+    @staticmethod
+    def _finished_event(status, message, progress):
+        return {"type": FINISHED, "time": time.time(), "status": status, "message": message, **progress}
+
+    def _write_events(self, job_id, events):
+        # Журнал подій — лише для відображення прогресу, його помилки не зупиняють задачу
+        try:
+            self.event_store.append(job_id, events)
+        except Exception as e:
+            logging.error(f"Не вдалося записати події задачі {job_id}: {e}")
+
+
+def _worker_process(db_path, stop_event, options, parse_workers, pool_size):
+    # Ctrl+C обробляє батьківський процес і зупиняє воркерів через stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    # Пул парсингу є в кожному воркері: без явного розміру воркери ділять ядра між собою
+    if parse_workers is None and "SCRAPER_PARSE_WORKERS" not in os.environ:
+        from app.scraper.parsing_engine import default_parse_workers
+        parse_workers = default_parse_workers(pool_size)
+    if parse_workers is not None:
+        os.environ["SCRAPER_PARSE_WORKERS"] = str(parse_workers)
+    try:
+        if os.environ.get("SCRAPER_DRIVER_POOL_WARM") == "1":
+            from app.scraper.driver_pool import get_driver_pool
+            threading.Thread(target=get_driver_pool(headless=True).warm, daemon=True).start()
+        ScrapeWorker(db_path, **options).run(stop_event)
+    finally:
+        from app.scraper.driver_pool import close_driver_pools
+        close_driver_pools()
+
+
+class WorkerPool:
+    """Пул процесів-воркерів; його розмір не залежить від кількості процесів веб-застосунку.
+
+    parse_workers — розмір пулу парсингу в кожному воркері (за замовчуванням SCRAPER_PARSE_WORKERS
+    або частка ядер машини на один воркер).
+    """
+
+    def __init__(self, size, db_path="amazon.db", parse_workers=None, **worker_options):
+        self.size = size
+        self.db_path = db_path
+        self.parse_workers = parse_workers
+        self.worker_options = worker_options
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._processes = []
+
+    def start(self):
+        for i in range(self.size):
+            process = self._context.Process(target=_worker_process, name=f"scrape-worker-{i + 1}",
+                                            args=(self.db_path, self._stop_event, self.worker_options,
+                                                  self.parse_workers, self.size))
+            process.start()
+            self._processes.append(process)
+        logging.info(f"Запущено воркерів скрапінгу: {self.size}")
+
+    def stop(self, timeout=30):
+        """Просить воркерів завершитись; виконувані задачі повертаються в чергу."""
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                logging.warning(f"Воркер {process.name} не завершився за {timeout} с, примусова зупинка")
+                process.terminate()
+                process.join()
+        self._processes.clear()
+
+    def join(self):
+        for process in self._processes:
+            process.join()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Воркери черги скрапінгу Amazon")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SCRAPER_WORKERS", 1)) or 1,
+                        help="Кількість процесів-воркерів (за замовчуванням: SCRAPER_WORKERS або 1)")
+    parser.add_argument("--db", default="amazon.db", help="Шлях до бази даних (за замовчуванням: amazon.db)")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="Процесів парсингу в кожному воркері (за замовчуванням: частка ядер на воркер)")
+    args = parser.parse_args()
+
+    pool = WorkerPool(args.workers, args.db, parse_workers=args.parse_workers)
+    signal.signal(signal.SIGTERM, lambda signum, frame: pool.stop())
+    pool.start()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        logging.info("Зупинка воркерів...")
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
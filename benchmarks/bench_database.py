@@ -0,0 +1,63 @@
+"""Мікробенчмарк шару бази даних: вартість збереження одного рядка та одного запиту на читання.
+
+Режим "cold" відтворює стару поведінку (новий engine і перевірка схеми на кожен виклик),
+режим "pooled" використовує спільний реєстр engine-ів.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from app.database import save_to_db, get_products, dispose_engines, ProductWriter
+
+
+def _product(i):
+    return {
+        "asin": f"B{i:09d}",
+        "title": f"Benchmark product {i}",
+        "price": 100.0 + i % 500,
+        "original_price": 150.0 + i % 500,
+        "rating": 3.0 + (i % 20) / 10,
+        "reviews": i % 5000,
+        "delivery": "FREE delivery",
+        "seller": "Amazon.com",
+        "url": f"https://www.amazon.com/dp/B{i:09d}"
+    }
+
+
+def _measure(fn, iterations, cold):
+    started = time.perf_counter()
+    for i in range(iterations):
+        if cold:
+            dispose_engines()
+        fn(i)
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пулу з'єднань бази даних")
+    parser.add_argument("--rows", type=int, default=500, help="Кількість рядків для збереження")
+    parser.add_argument("--reads", type=int, default=200, help="Кількість запитів на читання")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for mode in ("cold", "pooled"):
+            db_path = os.path.join(tmpdir, f"{mode}.db")
+            cold = mode == "cold"
+            save_cost = _measure(lambda i: save_to_db(_product(i), db_path), args.rows, cold)
+            read_cost = _measure(lambda i: get_products(db_path, min_rating=4.0), args.reads, cold)
+            print(f"{mode:>6}: save_to_db {save_cost * 1000:.3f} ms/рядок, "
+                  f"get_products {read_cost * 1000:.3f} ms/запит")
+            dispose_engines()
+
+        db_path = os.path.join(tmpdir, "batched.db")
+        with ProductWriter(db_path, batch_size=60) as writer:
+            save_cost = _measure(lambda i: writer.add(_product(i)), args.rows, cold=False)
+        print(f"batched: ProductWriter.add {save_cost * 1000:.3f} ms/рядок (пакети по 60)")
+        dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
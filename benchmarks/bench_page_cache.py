@@ -0,0 +1,45 @@
+"""Бенчмарк кешу сторінок: стиснення, запис і читання фікстур HTML для кожного доступного кодека.
+
+Сторінки — фікстури тестів з унікальним маркером, тож кожна зберігається окремим блобом.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from app.database import dispose_engines
+from app.scraper.page_cache import CODECS, PageCache
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "app", "tests", "fixtures")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк кешу сторінок")
+    parser.add_argument("--pages", type=int, default=500, help="Кількість сторінок")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    with open(os.path.join(FIXTURES, "product_page.html"), encoding="utf-8") as f:
+        template = f.read()
+    pages = [(f"https://www.amazon.com/dp/B{i:09d}", template + f"<!-- {i} -->") for i in range(args.pages)]
+    for codec in CODECS:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = PageCache(os.path.join(tmpdir, "cache"), codec=codec)
+            started = time.perf_counter()
+            for url, html in pages:
+                cache.put(url, html, "product")
+            put_time = time.perf_counter() - started
+            started = time.perf_counter()
+            for url, _ in pages:
+                cache.get(url, "product")
+            get_time = time.perf_counter() - started
+            stats = cache.stats()
+            dispose_engines()
+        print(f"{codec}: запис {put_time / args.pages * 1000:.2f} ms/сторінку, "
+              f"читання {get_time / args.pages * 1000:.2f} ms/сторінку, "
+              f"стиснення {stats['bytes'] / stats['stored_bytes']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
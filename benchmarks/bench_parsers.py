@@ -0,0 +1,90 @@
+"""Мікробенчмарк бекендів парсингу: час розбору однієї сторінки результатів і сторінки товару.
+
+Сторінка результатів збирається з фікстури, картки якої повторюються --cards разів,
+а сторінка товару доповнюється --padding блоками розмітки, щоб наблизити розмір до реальних сторінок Amazon.
+"""
+import argparse
+import logging
+import os
+import re
+import time
+
+from app.scraper import parsers
+from app.scraper.backends import BACKENDS, parse_document
+from app.scraper.parsers import parse_search_results_html, parse_product_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "app", "tests", "fixtures")
+
+_PADDING = ('<div class="a-section a-spacing-small"><ul class="a-unordered-list a-vertical">'
+            '<li><span class="a-list-item">Lorem ipsum dolor sit amet, consectetur adipiscing elit.</span></li>'
+            '<li><span class="a-list-item">Sed do eiusmod tempor incididunt ut labore et dolore.</span></li>'
+            '</ul></div>\n')
+
+
+def _read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _search_page(cards):
+    html = _read_fixture("search_results.html")
+    start = html.index('<div data-asin="B0TEST0001"')
+    end = html.index('<div class="s-pagination-container">')
+    block = html[start:end]
+    copies = [re.sub(r"B0TEST(\d{4})", lambda m: f"B{i:05d}{m.group(1)}", block) for i in range(cards // 4 + 1)]
+    return html[:start] + "".join(copies) + html[end:]
+
+
+def _product_page(padding):
+    html = _read_fixture("product_page.html")
+    return html.replace('<div id="rightCol">', _PADDING * padding + '<div id="rightCol">')
+
+
+def _per_field_cards(html, backend):
+    """Попередній спосіб: окремий виклик get_*_from_soup на кожне поле картки."""
+    cards = []
+    for card in parsers.SEARCH_RESULT_SELECTOR.select(parse_document(html, backend)):
+        if card.get("data-asin") and parsers.CARD_TITLE_SELECTOR.select_one(card):
+            cards.append((parsers.get_title_from_soup(card), parsers.get_price_from_soup(card),
+                          parsers.get_original_price_from_soup(card), parsers.get_rating_from_soup(card),
+                          parsers.get_reviews_from_soup(card), parsers.get_seller_from_soup(card),
+                          parsers.get_delivery_from_soup(card)))
+    return cards
+
+
+def _measure(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк бекендів парсингу HTML")
+    parser.add_argument("--cards", type=int, default=60, help="Кількість карток на сторінці результатів")
+    parser.add_argument("--padding", type=int, default=2000, help="Кількість блоків-заповнювачів на сторінці товару")
+    parser.add_argument("--iterations", type=int, default=20, help="Кількість повторів")
+    args = parser.parse_args()
+
+    # Помилки екстракторів логуються однаково для обох бекендів і лише шумлять у виводі
+    logging.getLogger().setLevel(logging.CRITICAL)
+    search_html = _search_page(args.cards)
+    product_html = _product_page(args.padding)
+    print(f"Сторінка результатів: {len(search_html) // 1024} КБ, сторінка товару: {len(product_html) // 1024} КБ")
+
+    costs = {}
+    for backend in BACKENDS:
+        search_cost = _measure(lambda: parse_search_results_html(search_html, backend), args.iterations)
+        product_cost = _measure(lambda: parse_product_html(product_html, "N/A", backend), args.iterations)
+        per_field_cost = _measure(lambda: _per_field_cards(search_html, backend), args.iterations)
+        costs[backend] = (search_cost, product_cost)
+        print(f"{backend:>5}: результати {search_cost * 1000:.2f} ms/сторінка "
+              f"(по полях: {per_field_cost * 1000:.2f} ms), товар {product_cost * 1000:.2f} ms/сторінка")
+
+    if "bs4" in costs and "lxml" in costs:
+        print(f"Прискорення lxml: результати x{costs['bs4'][0] / costs['lxml'][0]:.1f}, "
+              f"товар x{costs['bs4'][1] / costs['lxml'][1]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Бенчмарк історії цін: запис спостережень через ProductWriter і запити до price_observations.
+
+Після запису базу доповнено синтетичними інтервалами (--intervals), щоб перевірити, що час
+запитів не залежить від розміру таблиці: вони читають лише діапазони індексів.
+"""
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from app.database import ProductWriter, dispose_engines
+from app.price_history import get_price_series, get_largest_drops, get_price_stats
+
+
+def product(asin, price):
+    return {"asin": asin, "title": f"Product {asin}", "price": price, "original_price": 999.0, "rating": 4.5,
+            "reviews": 100, "delivery": "N/A", "seller": "Amazon.com", "url": f"https://www.amazon.com/dp/{asin}"}
+
+
+def fill_intervals(db_path, count, asins, start_ts):
+    """Додає count інтервалів для asins (по count // asins кожному) напряму в SQLite."""
+    connection = sqlite3.connect(db_path)
+    per_asin = max(count // asins, 1)
+    rows = []
+    for i in range(asins):
+        asin = f"S{i:09d}"
+        price = 500.0
+        for j in range(per_asin):
+            prev, price = price, round(max(price * random.uniform(0.8, 1.2), 1.0), 2)
+            ts = start_ts + j * 3600
+            rows.append((asin, ts, ts + 1800, price, 999.0, 4.5, 100, 2, prev, prev - price if price < prev else None))
+        if len(rows) >= 100000:
+            connection.executemany("INSERT INTO price_observations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            rows.clear()
+    connection.executemany("INSERT INTO price_observations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    connection.commit()
+    connection.close()
+
+
+def timed(function, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк історії цін")
+    parser.add_argument("--products", type=int, default=2000, help="Продуктів на прохід скрапінгу")
+    parser.add_argument("--scrapes", type=int, default=10, help="Кількість проходів скрапінгу")
+    parser.add_argument("--intervals", type=int, default=1000000, help="Синтетичних інтервалів у таблиці")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "bench.db")
+        now = [1.7e9]
+        prices = {f"B{i:09d}": 100.0 for i in range(args.products)}
+        started = time.perf_counter()
+        with ProductWriter(db_path, batch_size=500, clock=lambda: now[0]) as writer:
+            for _ in range(args.scrapes):
+                for asin in prices:
+                    # Більшість цін між проходами не змінюється
+                    if random.random() < 0.1:
+                        prices[asin] = round(prices[asin] * random.uniform(0.7, 1.1), 2)
+                    writer.add(product(asin, prices[asin]))
+                writer.flush()
+                now[0] += 3600
+        write_time = time.perf_counter() - started
+        observations = args.products * args.scrapes
+
+        fill_intervals(db_path, args.intervals, max(args.intervals // 1000, 1), now[0])
+        connection = sqlite3.connect(db_path)
+        intervals = connection.execute("SELECT COUNT(*) FROM price_observations").fetchone()[0]
+        connection.close()
+
+        window = (now[0] + 100 * 3600, now[0] + 110 * 3600)
+        series_time, series = timed(lambda: get_price_series("S000000001", db_path=db_path))
+        drops_time, _ = timed(lambda: get_largest_drops(*window, limit=20, db_path=db_path))
+        stats_time, _ = timed(lambda: get_price_stats([f"S{i:09d}" for i in range(100)], *window, db_path=db_path))
+        dispose_engines()
+
+    print(f"Запис: {observations} спостережень за {write_time:.2f} с "
+          f"({observations / write_time:.0f}/с), інтервалів з прогонів: {intervals - args.intervals}")
+    print(f"Таблиця: {intervals} інтервалів")
+    print(f"Історія ASIN ({len(series)} інтервалів): {series_time:.2f} ms")
+    print(f"Найбільші зниження за 10 годин: {drops_time:.2f} ms")
+    print(f"Мін/макс/середнє для 100 ASIN: {stats_time:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Бенчмарк паралельного завантаження сторінок товарів через локальний сервер-імітацію.
+
+Сервер віддає фікстуру сторінки товару з затримкою --latency секунд (імітація мережі і Amazon),
+а ProductPagePipeline завантажує --products сторінок з різними значеннями concurrency.
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.scraper.fetchers import HttpFetcher
+from app.scraper.parsing_engine import ParsingEngine
+from app.scraper.pipeline import ProductPagePipeline
+from app.scraper.scheduler import RateScheduler
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "app", "tests", "fixtures")
+
+
+def _serve(latency):
+    with open(os.path.join(FIXTURES, "product_page.html"), "rb") as f:
+        payload = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк паралельного завантаження сторінок товарів")
+    parser.add_argument("--products", type=int, default=48, help="Кількість сторінок товарів")
+    parser.add_argument("--latency", type=float, default=0.2, help="Затримка відповіді сервера, с")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Значення concurrency для порівняння")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    server = _serve(args.latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"https://www.amazon.com/Test-Product/dp/B{i:09d}" for i in range(args.products)]
+    try:
+        with ParsingEngine(max_workers=0) as engine:
+            for concurrency in args.concurrency:
+                with HttpFetcher(base_url=base_url, pool_size=max(10, concurrency),
+                                 scheduler=RateScheduler(rate=None)) as fetcher:
+                    def fetch_product(url):
+                        html, _ = fetcher.fetch_product_page(url)
+                        return engine.parse_product_page(html, url)[0]
+
+                    pipeline = ProductPagePipeline(fetch_product, concurrency, resolve=fetcher.resolve)
+                    started = time.perf_counter()
+                    pipeline.run(urls)
+                    elapsed = time.perf_counter() - started
+                print(f"concurrency={concurrency:>3}: {elapsed:.2f} s, {args.products / elapsed:.1f} сторінок/с")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Порівняння трафіку і часу завантаження сторінок у Chromium з політикою блокування ресурсів і без неї.
+
+Потребує встановлених Chromium і chromedriver (як у Docker-образі). Для кожного URL сторінка
+завантажується двома браузерами, а різниця переданих байтів — це заощаджений трафік. Поруч
+виводиться оцінка, яку логує скрапер (log_page_stats), щоб перевірити її точність.
+"""
+import argparse
+import logging
+import time
+
+from app.scraper.driver_pool import launch_driver, quit_driver
+from app.scraper.resources import ResourcePolicy, ResourceSizes, collect_network_stats
+
+DEFAULT_URLS = [
+    "https://www.amazon.com/s?k=laptop",
+    "https://www.amazon.com/dp/B0CX23V2ZK",
+]
+
+
+def _load(driver, url, sizes):
+    driver.get_log("performance")
+    started = time.perf_counter()
+    driver.get(url)
+    elapsed = time.perf_counter() - started
+    return elapsed, collect_network_stats(driver.get_log("performance"), sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк блокування ресурсів у Chromium")
+    parser.add_argument("urls", nargs="*", default=DEFAULT_URLS, help="Сторінки для завантаження")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    policies = {"без блокування": None, "з блокуванням": ResourcePolicy.from_env()}
+    results = {}
+    for label, policy in policies.items():
+        # Окремі розміри для кожного прогону: оцінка не підглядає в завантаження без блокування
+        sizes = ResourceSizes()
+        driver, profile_dir = launch_driver(headless=True, resource_policy=policy)
+        try:
+            results[label] = [_load(driver, url, sizes) for url in args.urls]
+        finally:
+            quit_driver(driver, profile_dir)
+
+    for index, url in enumerate(args.urls):
+        (full_time, full), (lean_time, lean) = (results[label][index] for label in policies)
+        print(f"{url}\n  без блокування: {full['bytes'] / 1024:.0f} КБ, {full['requests']} запитів, {full_time:.2f} s"
+              f"\n  з блокуванням:  {lean['bytes'] / 1024:.0f} КБ, {lean['requests']} запитів "
+              f"(заблоковано {lean['blocked']}), {lean_time:.2f} s"
+              f"\n  заощаджено: {(full['bytes'] - lean['bytes']) / 1024:.0f} КБ "
+              f"(оцінка скрапера: {lean['saved_bytes'] / 1024:.0f} КБ, без оцінки {lean['unestimated']} запитів)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,57 @@
 import argparse
-from app.scraper.amazon_scraper import AmazonScraper
+from app.scraper.amazon_scraper import AmazonScraper, DEFAULT_FRESHNESS_TTL
+from app.scraper.batch import BatchScraper, read_queries_file
+from app.exporters import export_to_file, EXPORT_FORMATS
+from app.scraper.fetchers import FETCHERS, NAVIGATION_MODES
+
+def export(args):
+    output = args.output or f"products.{EXPORT_FORMATS[args.format][1]}"
+    export_to_file(output, args.format, args.db, min_rating=args.min_rating, max_price=args.max_price,
+                   min_reviews=args.min_reviews)
+    print(f"Exported products to {output}")
 
 def main():
     parser = argparse.ArgumentParser(description="Amazon Product Scraper")
     parser.add_argument("--query", default="laptop", help="Search query")
+    parser.add_argument("--queries-file",
+                        help="Scrape a batch of queries, one per line ('query' or 'query | priority', # comments)")
     parser.add_argument("--pages", type=int, default=5, help="Number of pages to scrape")
     parser.add_argument("--db", default="amazon.db", help="Database file")
+    parser.add_argument("--engine", choices=sorted(FETCHERS), default="selenium", help="Page fetch engine")
+    parser.add_argument("--concurrency", type=int, default=1, help="Product pages fetched in parallel (http engine)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the saved crawl frontier and start over")
+    parser.add_argument("--navigation", choices=NAVIGATION_MODES, default="direct",
+                        help="How Selenium reaches results pages: direct search URLs or search box and 'Next' clicks")
+    parser.add_argument("--freshness-ttl", type=int, default=DEFAULT_FRESHNESS_TTL,
+                        help="Seconds a scraped product stays fresh and its page is not refetched (0 disables)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    export_parser = subparsers.add_parser("export", help="Export the products table to a file")
+    export_parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet", help="Output format")
+    export_parser.add_argument("--output", help="Output file (default: products.<ext>)")
+    export_parser.add_argument("--min-rating", type=float, help="Minimum rating filter")
+    export_parser.add_argument("--max-price", type=float, help="Maximum price filter")
+    export_parser.add_argument("--min-reviews", type=int, help="Minimum reviews filter")
     args = parser.parse_args()
 
+    if args.command == "export":
+        export(args)
+        return
+
     if args.pages < 1:
         raise ValueError("Number of pages must be greater than 0")
 
-    scraper = AmazonScraper(args.query, args.pages, args.db)
+    options = {"concurrency": args.concurrency, "resume": not args.fresh, "freshness_ttl": args.freshness_ttl,
+               "navigation": args.navigation}
+    if args.queries_file:
+        results = BatchScraper(read_queries_file(args.queries_file), args.pages, args.db, fetch_engine=args.engine,
+                               **options).run()
+        for query, result in results.items():
+            print(f"{query}: {result}")
+        return
+
+    scraper = AmazonScraper(args.query, args.pages, args.db, fetch_engine=args.engine, **options)
     scraper.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()